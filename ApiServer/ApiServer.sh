@@ -3,6 +3,40 @@
 export MYSQL_HOST="az-a.database-lsh.86099dec56044a43ac3f92a40784929b.mysql.managed-service.kr-central-2.kakaocloud.com"
 echo "MYSQL_HOST set to: $MYSQL_HOST"
 
+# DB 커넥션 풀 설정 (Gunicorn 워커 프로세스마다 하나의 풀)
+export DB_POOL_SIZE="${DB_POOL_SIZE:-8}"                            # 워커당 최대 커넥션 수
+export DB_POOL_TIMEOUT="${DB_POOL_TIMEOUT:-5}"                      # 커넥션 대여 대기 시간 (초)
+export DB_POOL_HEALTH_CHECK_INTERVAL="${DB_POOL_HEALTH_CHECK_INTERVAL:-30}"  # 유휴 커넥션 ping 주기 (초)
+
+# sessions.last_active 지연 쓰기 설정
+export LAST_ACTIVE_FLUSH_INTERVAL_MS="${LAST_ACTIVE_FLUSH_INTERVAL_MS:-500}"  # 반영 주기 (ms)
+export LAST_ACTIVE_FLUSH_MAX_SESSIONS="${LAST_ACTIVE_FLUSH_MAX_SESSIONS:-200}" # 이 개수만큼 쌓이면 즉시 반영
+
+# search_logs 일괄 적재 설정
+export SEARCH_LOG_QUEUE_SIZE="${SEARCH_LOG_QUEUE_SIZE:-10000}"            # 워커당 대기열 최대 크기
+export SEARCH_LOG_BATCH_SIZE="${SEARCH_LOG_BATCH_SIZE:-500}"              # 한 번에 INSERT할 최대 행 수
+export SEARCH_LOG_FLUSH_INTERVAL_MS="${SEARCH_LOG_FLUSH_INTERVAL_MS:-1000}" # 적재 주기 (ms)
+export SEARCH_LOG_QUEUE_POLICY="${SEARCH_LOG_QUEUE_POLICY:-drop}"        # 대기열이 가득 찼을 때: drop 또는 block
+export SEARCH_LOG_BLOCK_TIMEOUT="${SEARCH_LOG_BLOCK_TIMEOUT:-1}"         # block 정책의 최대 대기 시간 (초)
+
+# 상품 카탈로그 캐시 설정
+export CATALOG_CACHE_TTL="${CATALOG_CACHE_TTL:-60}"  # 캐시 갱신 주기 (초)
+
+# /metrics 설정 (Gunicorn 워커 값을 합산하기 위한 워커별 스냅샷 디렉터리, systemd RuntimeDirectory)
+export METRICS_DIR="${METRICS_DIR:-/run/flask_app_metrics}"
+export METRICS_FLUSH_INTERVAL_MS="${METRICS_FLUSH_INTERVAL_MS:-1000}"  # 스냅샷 주기 (ms)
+
+# Push 메시지 수신 설정 (워커별 링 버퍼 -> 워커 공용 sqlite 파일, systemd StateDirectory)
+export PUSH_STORE_PATH="${PUSH_STORE_PATH:-/var/lib/flask_app/push_messages.db}"
+export PUSH_STORE_MAX_MESSAGES="${PUSH_STORE_MAX_MESSAGES:-1000000}"  # 파일에 보관할 최근 메시지 수
+export PUSH_BUFFER_SIZE="${PUSH_BUFFER_SIZE:-10000}"                  # 워커당 미적재 메시지 최대 수
+export PUSH_BUFFER_MAX_BYTES="${PUSH_BUFFER_MAX_BYTES:-67108864}"     # 워커당 미적재 메시지 최대 바이트 (64MiB)
+export PUSH_BUFFER_POLICY="${PUSH_BUFFER_POLICY:-reject}"             # 버퍼가 가득 찼을 때: reject(503) 또는 drop_oldest
+export PUSH_BATCH_SIZE="${PUSH_BATCH_SIZE:-500}"                      # 한 번에 적재할 최대 메시지 수
+export PUSH_FLUSH_INTERVAL_MS="${PUSH_FLUSH_INTERVAL_MS:-200}"        # 적재 주기 (ms)
+export PUSH_MAX_MESSAGE_BYTES="${PUSH_MAX_MESSAGE_BYTES:-1048576}"    # 메시지 하나의 최대 크기 (초과 시 413)
+export PUSH_PAGE_MAX_LIMIT="${PUSH_PAGE_MAX_LIMIT:-1000}"             # /push-messages limit 최대값
+
 
 # 전역 변수 초기화
 LOG_PREFIX="kakaocloud: "
@@ -40,48 +74,1457 @@ log "Setting up Flask application in $APP_DIR..."
 run_command mkdir -p $APP_DIR
 
 cat > $APP_DIR/app.py <<EOL
-from flask import Flask, request, make_response
+from flask import Flask, request, make_response, g, has_request_context
+import os
+import json
+import sqlite3
+import itertools
+import collections
 import uuid
 import time
 import random
+import importlib
+import re
+import bisect
+import queue
+import atexit
+import fcntl
+import signal
+import threading
+from decimal import Decimal
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.errors import PoolError
 from flask import jsonify
 
 app = Flask(__name__)
 
+# 환경변수가 있으면 우선 (로컬 실행 / 벤치마크에서 다른 DB를 가리킬 때)
 DB_CONFIG = {
-    'user': 'admin',
-    'password': 'admin1234',
-    'host': '${MYSQL_HOST}',
-    'database': 'shopdb',
+    'user': os.getenv('MYSQL_USER', 'admin'),
+    'password': os.getenv('MYSQL_PASS', 'admin1234'),
+    'host': os.getenv('MYSQL_HOST', '${MYSQL_HOST}'),
+    'port': int(os.getenv('MYSQL_PORT', '3306')),
+    'database': os.getenv('MYSQL_DB', 'shopdb'),
     'ssl_disabled': True
-    
 }
 
-@app.before_request
-def update_last_active():
-    session_id = request.cookies.get('session_id')
-    if session_id:
+# 커넥션 생성 함수 ("모듈:함수", 비어 있으면 mysql.connector.connect)
+# 예) DB_CONNECT=local_app:sqlite_connect MYSQL_DB=/tmp/shopdb.sqlite (ApiServer/local_app.py 참고)
+DB_CONNECT = os.getenv('DB_CONNECT', '')
+
+DB_POOL_CONFIG = {
+    'size': ${DB_POOL_SIZE},
+    'timeout': ${DB_POOL_TIMEOUT},
+    'health_check_interval': ${DB_POOL_HEALTH_CHECK_INTERVAL}
+}
+
+LAST_ACTIVE_CONFIG = {
+    'flush_interval_ms': ${LAST_ACTIVE_FLUSH_INTERVAL_MS},
+    'max_pending': ${LAST_ACTIVE_FLUSH_MAX_SESSIONS}
+}
+
+SEARCH_LOG_CONFIG = {
+    'queue_size': ${SEARCH_LOG_QUEUE_SIZE},
+    'batch_size': ${SEARCH_LOG_BATCH_SIZE},
+    'flush_interval_ms': ${SEARCH_LOG_FLUSH_INTERVAL_MS},
+    'policy': '${SEARCH_LOG_QUEUE_POLICY}',
+    'block_timeout': ${SEARCH_LOG_BLOCK_TIMEOUT}
+}
+
+CATALOG_CACHE_CONFIG = {
+    'ttl': ${CATALOG_CACHE_TTL}
+}
+
+# 워커 지표 스냅샷 디렉터리 (비우면 워커별 값만 응답), 라우트 지연 히스토그램 구간 (초)
+METRICS_CONFIG = {
+    'multiproc_dir': os.getenv('METRICS_DIR', '${METRICS_DIR}'),
+    'flush_interval_ms': ${METRICS_FLUSH_INTERVAL_MS},
+    'buckets': [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+}
+
+# Push 메시지 수신 (워커별 버퍼 -> 워커 공용 sqlite 파일)
+PUSH_STORE_CONFIG = {
+    'path': os.getenv('PUSH_STORE_PATH', '${PUSH_STORE_PATH}'),
+    'buffer_size': ${PUSH_BUFFER_SIZE},
+    'buffer_max_bytes': ${PUSH_BUFFER_MAX_BYTES},
+    'batch_size': ${PUSH_BATCH_SIZE},
+    'flush_interval_ms': ${PUSH_FLUSH_INTERVAL_MS},
+    'policy': '${PUSH_BUFFER_POLICY}',
+    'max_messages': ${PUSH_STORE_MAX_MESSAGES},
+    'max_message_bytes': ${PUSH_MAX_MESSAGE_BYTES}
+}
+
+# /push-messages 페이지 크기 (기본 / 최대)
+PUSH_PAGE_DEFAULT_LIMIT = 100
+PUSH_PAGE_MAX_LIMIT = ${PUSH_PAGE_MAX_LIMIT}
+
+
+#################################
+# DB 커넥션 풀
+#################################
+def load_db_connect(spec):
+    """
+    DB_CONNECT 값("모듈:함수")을 커넥션 생성 함수로 변환
+    :return: db_config 키워드 인자를 받아 DB-API 커넥션을 반환하는 함수
+    """
+    if not spec:
+        return mysql.connector.connect
+    module_name, _, func_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), func_name or 'connect')
+
+
+class PooledConnection:
+    """
+    풀에서 대여한 커넥션 래퍼
+    close()를 호출하면 실제로 연결을 끊지 않고 풀에 반납한다.
+    (기존 라우트의 conn.close() 코드를 그대로 사용하기 위함)
+    """
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._conn)
+
+
+class DBConnectionPool:
+    """
+    워커 프로세스 단위 MySQL 커넥션 풀
+    - size: 동시에 대여 가능한 최대 커넥션 수
+    - timeout: 풀이 가득 찼을 때 대여 대기 시간 (초), 초과 시 PoolError
+    - health_check_interval: 이 시간(초) 이상 유휴 상태였던 커넥션은 대여 전 ping으로 확인
+    - connect: 커넥션 생성 함수 (기본 mysql.connector.connect)
+    """
+    def __init__(self, db_config, size=8, timeout=5, health_check_interval=30, connect=None):
+        self.db_config = db_config
+        self.connect = connect or mysql.connector.connect
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        # LIFO: 가장 최근에 쓴(따뜻한) 커넥션부터 재사용
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "discarded": 0,
+            "timeouts": 0,
+            "in_use": 0
+        }
+
+    def _count(self, key, delta=1):
+        with self._lock:
+            self._stats[key] += delta
+
+    def _is_healthy(self, conn):
         try:
-            conn = get_db_connection()
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        self._count("discarded")
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def get(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count("timeouts")
+            raise PoolError(f"Failed getting connection; pool exhausted after {self.timeout}s")
+
+        try:
+            conn = None
+            while conn is None:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self.connect(**self.db_config)
+                    self._count("created")
+                    break
+
+                # 오래 쉬었던 커넥션은 끊겼을 수 있으므로 확인
+                if time.time() - last_used > self.health_check_interval and not self._is_healthy(conn):
+                    self._discard(conn)
+                    conn = None
+                else:
+                    self._count("reused")
+        except Exception:
+            self._slots.release()
+            raise
+
+        self._count("in_use")
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        self._count("in_use", -1)
+        try:
+            # 열린 트랜잭션(읽기 스냅샷 포함)을 다음 요청에 넘기지 않음
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put((conn, time.time()))
+        except Exception:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["idle"] = self._idle.qsize()
+        stats["size"] = self.size
+        return stats
+
+
+db_pool = DBConnectionPool(DB_CONFIG, connect=load_db_connect(DB_CONNECT), **DB_POOL_CONFIG)
+
+
+#################################
+# sessions.last_active 지연 쓰기 (write-behind)
+#################################
+class LastActiveWriter:
+    """
+    sessions.last_active 갱신을 요청 경로에서 분리하는 write-behind 버퍼
+    - 요청마다 세션의 마지막 활동 시각만 메모리에 기록 (같은 세션은 하나로 병합)
+    - flush_interval_ms 마다, 또는 max_pending 개 세션이 쌓이면 다중 행 UPDATE 한 번으로 반영
+      (이미 있는 세션만 갱신하며, 모르는/위조된 쿠키로 sessions 행을 만들지 않음)
+    - 연결 끊김/교착 같은 일시적 오류만 다음 주기에 재시도하고, 데이터 오류는 버리고 집계
+    - 워커 종료 시(atexit) 남은 항목을 모두 반영
+    """
+    # sessions.session_id 컬럼 길이 (VARCHAR(36))
+    SESSION_ID_MAX_LENGTH = 36
+    # 재시도할 일시적 오류 (연결 끊김, 풀 고갈, 교착 1213, 잠금 대기 초과 1205)
+    TRANSIENT_ERRORS = (mysql.connector.InterfaceError, mysql.connector.OperationalError, PoolError)
+    TRANSIENT_ERRNOS = (1205, 1213)
+
+    def __init__(self, pool, flush_interval_ms=500, max_pending=200):
+        self.pool = pool
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_pending = max_pending
+        self._pending = {}  # session_id -> 마지막 활동 시각 (time.monotonic)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._stats = {
+            "recorded": 0,
+            "flushes": 0,
+            "rows_written": 0,
+            "rejected": 0,
+            "dropped": 0,
+            "errors": 0
+        }
+        self._last_flush_at = None
+
+    def _ensure_started(self):
+        # Gunicorn fork 이후에도 워커마다 플러시 스레드가 떠 있도록 지연 시작
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="last-active-writer", daemon=True)
+            self._thread.start()
+
+    def record(self, session_id):
+        if len(session_id) > self.SESSION_ID_MAX_LENGTH:
+            # 컬럼에 들어갈 수 없는 쿠키는 어떤 세션과도 일치하지 않으므로 버림
+            with self._lock:
+                self._stats["rejected"] += 1
+            return
+        with self._lock:
+            self._pending[session_id] = time.monotonic()
+            self._stats["recorded"] += 1
+            full = len(self._pending) >= self.max_pending
+            if not self._stopped:
+                self._ensure_started()
+        if full:
+            self._wakeup.set()
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+
+        # 시각은 DB 시계(NOW()) 기준으로, 기록 후 경과한 초만큼 빼서 반영
+        now = time.monotonic()
+        rows = [(session_id, int(now - ts)) for session_id, ts in batch.items()]
+
+        conn = None
+        cursor = None
+        try:
+            conn = self.pool.get()
             cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE sessions SET last_active = NOW() WHERE session_id = %s",
-                (session_id,)
-            )
+            for i in range(0, len(rows), self.max_pending):
+                chunk = rows[i:i + self.max_pending]
+                cases = " ".join(["WHEN %s THEN NOW() - INTERVAL %s SECOND"] * len(chunk))
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(
+                    f"""
+                    UPDATE sessions
+                    SET last_active = CASE session_id {cases} END
+                    WHERE session_id IN ({placeholders})
+                    """,
+                    [value for row in chunk for value in row] + [session_id for session_id, _ in chunk]
+                )
             conn.commit()
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._stats["rows_written"] += len(rows)
+                self._last_flush_at = time.time()
+            return len(rows)
+        except Exception as e:
+            print(f"Failed to flush last_active: {e}")
+            transient = isinstance(e, self.TRANSIENT_ERRORS) or getattr(e, "errno", None) in self.TRANSIENT_ERRNOS
+            with self._lock:
+                self._stats["errors"] += 1
+                if not transient:
+                    # DataError/IntegrityError 등은 재시도해도 같은 결과이므로 버려서 이후 플러시를 막지 않음
+                    self._stats["dropped"] += len(rows)
+                    return 0
+                # 일시적 오류는 다음 주기에 재시도 (그 사이 더 최신 기록이 있으면 그것을 유지)
+                for session_id, ts in batch.items():
+                    if ts > self._pending.get(session_id, 0):
+                        self._pending[session_id] = ts
+            return 0
+        finally:
+            if cursor:
+                cursor.close()
+            if conn:
+                conn.close()
+
+    def lag(self):
+        """가장 오래된 미반영 기록이 대기한 시간 (초)"""
+        with self._lock:
+            if not self._pending:
+                return 0.0
+            return time.monotonic() - min(self._pending.values())
+
+    def stats(self):
+        lag = self.lag()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+            stats["last_flush_at"] = self._last_flush_at
+        stats["lag_seconds"] = round(lag, 3)
+        return stats
+
+    def stop(self, timeout=5):
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+
+last_active_writer = LastActiveWriter(db_pool, **LAST_ACTIVE_CONFIG)
+atexit.register(last_active_writer.stop)
+
+
+#################################
+# search_logs 일괄 적재
+#################################
+class SearchLogWriter:
+    """
+    검색 로그를 요청 경로 밖에서 적재하는 워커별 대기열
+    - record()는 대기열에 넣기만 하고 바로 반환
+    - 백그라운드 스레드가 batch_size 개 또는 flush_interval_ms 단위로 모아 executemany로 INSERT
+    - 대기열이 가득 차면 policy에 따라 버리거나(drop) 최대 block_timeout 초까지 기다린 뒤 버림(block)
+    - 워커 종료 시(atexit) 남은 로그를 모두 적재
+    """
+    POLICIES = ("drop", "block")
+
+    def __init__(self, pool, queue_size=10000, batch_size=500, flush_interval_ms=1000,
+                 policy="drop", block_timeout=1):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown search log queue policy: {policy}")
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._thread = None
+        self._stats = {
+            "enqueued": 0,
+            "dropped": 0,
+            "written": 0,
+            "rejected": 0,
+            "flushes": 0,
+            "errors": 0
+        }
+
+    def _count(self, key, delta=1):
+        with self._lock:
+            self._stats[key] += delta
+
+    def _ensure_started(self):
+        # Gunicorn fork 이후에도 워커마다 적재 스레드가 떠 있도록 지연 시작
+        with self._lock:
+            if self._stopped:
+                return
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="search-log-writer", daemon=True)
+                self._thread.start()
+
+    def record(self, session_id, search_query):
+        self._ensure_started()
+        item = (session_id, search_query, time.monotonic())
+        try:
+            if self.policy == "block":
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("enqueued")
+        return True
+
+    def _collect(self, wait):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=wait) if wait else self._queue.get_nowait())
+        except queue.Empty:
+            return batch
+
+        deadline = time.monotonic() + (wait or 0)
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0 and not self._stopped:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopped:
+            batch = self._collect(self.flush_interval)
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        # 시각은 DB 시계(NOW()) 기준으로, 대기열에서 보낸 초만큼 빼서 기록
+        now = time.monotonic()
+        rows = [(session_id, search_query, int(now - ts)) for session_id, search_query, ts in batch]
+        sql = """
+            INSERT INTO search_logs (session_id, search_query, searched_at)
+            VALUES (%s, %s, NOW() - INTERVAL %s SECOND)
+        """
+
+        conn = None
+        cursor = None
+        try:
+            conn = self.pool.get()
+            cursor = conn.cursor()
+            try:
+                cursor.executemany(sql, rows)
+                conn.commit()
+                written = len(rows)
+            except mysql.connector.IntegrityError:
+                # 한 행(예: 없는 session_id)이 배치 전체를 실패시키지 않도록 행 단위로 재시도
+                conn.rollback()
+                written = 0
+                for row in rows:
+                    try:
+                        cursor.execute(sql, row)
+                        written += 1
+                    except mysql.connector.IntegrityError:
+                        self._count("rejected")
+                conn.commit()
+            with self._lock:
+                self._stats["written"] += written
+                self._stats["flushes"] += 1
+        except Exception as e:
+            self._count("errors")
+            self._count("dropped", len(rows))
+            print(f"Failed to write search logs: {e}")
+        finally:
+            if cursor:
+                cursor.close()
+            if conn:
+                conn.close()
+
+    def flush(self):
+        """대기열에 남은 로그를 호출한 스레드에서 즉시 적재"""
+        while True:
+            batch = self._collect(0)
+            if not batch:
+                return
+            self._write(batch)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+    def stop(self, timeout=5):
+        self._stopped = True
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+
+search_log_writer = SearchLogWriter(db_pool, **SEARCH_LOG_CONFIG)
+atexit.register(search_log_writer.stop)
+
+
+#################################
+# 상품 검색 역색인
+#################################
+class ProductSearchIndex:
+    """
+    상품 이름/카테고리에 대한 메모리 역색인 (CatalogCache가 상품 변경분만 반영)
+    - 토큰화: 소문자 변환 후 단어 단위 분리
+    - 질의 토큰마다 정확 일치 > 접두 일치 > 부분 일치 순으로 색인 용어를 찾고, 없으면 오타 허용으로 찾음
+      (접두/부분 일치는 정렬된 접미사 목록 이분 탐색, 오타 허용은 삭제 변형 색인 + 편집 거리 검증)
+    - 모든 질의 토큰에 매칭된 상품만 점수 순으로 반환
+    """
+    FIELD_WEIGHTS = {"name": 1.0, "category": 0.5}
+    MATCH_WEIGHTS = {"exact": 3.0, "prefix": 2.0, "substring": 1.5, "fuzzy": 1.0}
+    # 부분 일치를 허용하는 최소 질의 토큰 길이
+    MIN_SUBSTRING_LENGTH = 3
+    # 색인 용어에 미리 만들어 두는 삭제 변형의 최대 거리
+    MAX_EDIT_DISTANCE = 2
+
+    def __init__(self):
+        self._postings = {}    # 용어 -> {product_id: 필드 가중치}
+        self._doc_terms = {}   # product_id -> {용어, ...}
+        self._names = {}       # product_id -> 상품 이름
+        self._suffixes = []    # 정렬된 (접미사, 용어) 목록
+        self._deletes = {}     # 삭제 변형 -> {용어, ...}
+
+    @staticmethod
+    def tokenize(text):
+        return re.findall(r"\w+", (text or "").lower())
+
+    @staticmethod
+    def max_distance(token):
+        # 짧은 단어일수록 오타 허용 범위를 좁힘
+        if len(token) <= 3:
+            return 0
+        if len(token) <= 7:
+            return 1
+        return 2
+
+    @staticmethod
+    def _delete_variants(word, distance):
+        variants = {word}
+        frontier = {word}
+        for _ in range(distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+            variants |= frontier
+        return variants
+
+    @staticmethod
+    def edit_distance(a, b):
+        # Damerau-Levenshtein (인접 문자 교환 포함, optimal string alignment)
+        prev2 = None
+        prev = list(range(len(b) + 1))
+        for i in range(1, len(a) + 1):
+            cur = [i] + [0] * len(b)
+            for j in range(1, len(b) + 1):
+                cost = 0 if a[i - 1] == b[j - 1] else 1
+                cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+                if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                    cur[j] = min(cur[j], prev2[j - 2] + 1)
+            prev2, prev = prev, cur
+        return prev[len(b)]
+
+    def _add_term(self, term):
+        for i in range(len(term)):
+            bisect.insort(self._suffixes, (term[i:], term))
+        for variant in self._delete_variants(term, self.MAX_EDIT_DISTANCE):
+            self._deletes.setdefault(variant, set()).add(term)
+
+    def _remove_term(self, term):
+        for i in range(len(term)):
+            entry = (term[i:], term)
+            pos = bisect.bisect_left(self._suffixes, entry)
+            if pos < len(self._suffixes) and self._suffixes[pos] == entry:
+                self._suffixes.pop(pos)
+        for variant in self._delete_variants(term, self.MAX_EDIT_DISTANCE):
+            terms = self._deletes.get(variant)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._deletes[variant]
+
+    def update_product(self, product):
+        product_id = product['id']
+        self.remove_product(product_id)
+
+        weights = {}
+        for field, weight in self.FIELD_WEIGHTS.items():
+            for term in self.tokenize(product.get(field)):
+                weights[term] = max(weights.get(term, 0), weight)
+
+        for term, weight in weights.items():
+            if term not in self._postings:
+                self._postings[term] = {}
+                self._add_term(term)
+            self._postings[term][product_id] = weight
+        self._doc_terms[product_id] = set(weights)
+        self._names[product_id] = product['name']
+
+    def remove_product(self, product_id):
+        for term in self._doc_terms.pop(product_id, ()):
+            posting = self._postings[term]
+            posting.pop(product_id, None)
+            if not posting:
+                del self._postings[term]
+                self._remove_term(term)
+        self._names.pop(product_id, None)
+
+    def _match_terms(self, token):
+        matches = {}
+        if token in self._postings:
+            matches[token] = "exact"
+
+        pos = bisect.bisect_left(self._suffixes, (token,))
+        while pos < len(self._suffixes) and self._suffixes[pos][0].startswith(token):
+            suffix, term = self._suffixes[pos]
+            pos += 1
+            if term in matches:
+                continue
+            if suffix == term:
+                matches[term] = "prefix"
+            elif len(token) >= self.MIN_SUBSTRING_LENGTH:
+                matches[term] = "substring"
+
+        # 오타 허용은 정확/접두/부분 일치가 하나도 없을 때만 사용
+        distance = self.max_distance(token)
+        if distance and not matches:
+            for variant in self._delete_variants(token, distance):
+                for term in self._deletes.get(variant, ()):
+                    if term not in matches and self.edit_distance(token, term) <= distance:
+                        matches[term] = "fuzzy"
+        return matches
+
+    def search(self, query, limit=None):
+        scores = None
+        for token in self.tokenize(query):
+            token_scores = {}
+            for term, kind in self._match_terms(token).items():
+                for product_id, field_weight in self._postings[term].items():
+                    score = self.MATCH_WEIGHTS[kind] * field_weight
+                    if score > token_scores.get(product_id, 0):
+                        token_scores[product_id] = score
+
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {
+                    product_id: scores[product_id] + score
+                    for product_id, score in token_scores.items() if product_id in scores
+                }
+            if not scores:
+                return []
+
+        if not scores:
+            return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [{"id": product_id, "name": self._names[product_id]} for product_id, _ in ranked]
+
+    def stats(self):
+        return {
+            "products": len(self._doc_terms),
+            "terms": len(self._postings)
+        }
+
+
+#################################
+# 상품 카탈로그 캐시
+#################################
+class CatalogCache:
+    """
+    products 테이블과 상품별 평점 집계를 워커 메모리에 보관하는 캐시
+    - id / 카테고리 인덱스로 조회 (정상 상태에서는 MySQL 조회 없음)
+    - ttl 초가 지나면 다음 조회 시 다시 적재 (적재 중에는 기존 데이터로 응답)
+    - invalidate()로 즉시 무효화 가능 (다음 조회 시 다시 적재)
+      POST /internal/catalog/invalidate: 요청을 받은 워커, SIGHUP: 시그널을 받은 워커
+    - 이 워커에서 작성된 리뷰는 record_review()로 해당 상품의 평점 집계를 다시 읽어 바로 반영,
+      다른 워커의 리뷰는 ttl 주기로 반영
+    - 적재 시 바뀐 상품만 검색 색인(search_index)에 반영
+    """
+    # 없는 상품 id 조회 시 재적재 최소 간격 (초)
+    MISS_RELOAD_INTERVAL = 5
+
+    def __init__(self, pool, ttl=60):
+        self.pool = pool
+        self.ttl = ttl
+        self._products = {}      # id -> {"id", "name", "price", "category"}
+        self._by_category = {}   # 소문자 카테고리 -> [상품, ...] (MySQL 비교와 동일하게 대소문자 무시)
+        self._categories = []    # DISTINCT category (id 순서 기준 첫 등장 순)
+        self._ratings = {}       # id -> [평점 합계, 리뷰 수]
+        self._reviewed = {}      # 적재 시작 이후 record_review()가 다시 읽은 평점 (적재 결과보다 새 값)
+        self.search_index = ProductSearchIndex()
+        self._loaded_at = None
+        self._stale = True
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "load_errors": 0,
+            "invalidations": 0
+        }
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def load(self):
+        with self._lock:
+            self._reviewed = {}
+        conn = None
+        cursor = None
+        try:
+            conn = self.pool.get()
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT id, name, price, category FROM products ORDER BY id")
+            rows = cursor.fetchall()
+            cursor.execute("""
+                SELECT product_id, SUM(rating) AS rating_sum, COUNT(*) AS rating_count
+                FROM reviews
+                GROUP BY product_id
+            """)
+            ratings = {
+                row['product_id']: [int(row['rating_sum']), row['rating_count']]
+                for row in cursor.fetchall()
+            }
         except Exception as e:
-            print(f"Failed to update last_active: {e}")
+            self._count("load_errors")
+            print(f"Failed to load product catalog: {e}")
+            raise
         finally:
             if cursor:
                 cursor.close()
             if conn:
                 conn.close()
 
+        products = {}
+        by_category = {}
+        categories = []
+        for row in rows:
+            product = {
+                "id": row['id'],
+                "name": row['name'],
+                "price": row['price'],
+                "category": row['category']
+            }
+            products[product['id']] = product
+            key = (product['category'] or "").lower()
+            if key not in by_category:
+                by_category[key] = []
+                categories.append(product['category'])
+            by_category[key].append(product)
+
+        with self._lock:
+            # 검색 색인은 추가/변경/삭제된 상품만 갱신
+            for product_id in self._products:
+                if product_id not in products:
+                    self.search_index.remove_product(product_id)
+            for product_id, product in products.items():
+                if self._products.get(product_id) != product:
+                    self.search_index.update_product(product)
+
+            self._products = products
+            self._by_category = by_category
+            self._categories = categories
+            # 적재 중에 작성된 리뷰는 적재 쿼리가 못 봤을 수 있으므로 record_review()가 읽은 값을 유지
+            ratings.update(self._reviewed)
+            self._ratings = ratings
+            self._loaded_at = time.monotonic()
+            self._stale = False
+            self._stats["loads"] += 1
+        return len(products)
+
+    def _ensure_fresh(self):
+        """캐시가 유효하면 True, 적재/갱신이 필요했으면 False"""
+        if not self._stale and time.monotonic() - self._loaded_at < self.ttl:
+            return True
+
+        if self._loaded_at is None:
+            # 최초 적재는 완료될 때까지 대기
+            with self._refresh_lock:
+                if self._loaded_at is None:
+                    self.load()
+            return False
+
+        # 갱신은 한 스레드만 수행, 나머지는 기존 데이터로 응답
+        if self._refresh_lock.acquire(blocking=False):
+            try:
+                self.load()
+            except Exception:
+                pass
+            finally:
+                self._refresh_lock.release()
+        return False
+
+    def _read(self):
+        self._count("hits" if self._ensure_fresh() else "misses")
+
+    def invalidate(self):
+        with self._lock:
+            self._stale = True
+            self._stats["invalidations"] += 1
+
+    def _avg_rating(self, product_id):
+        rating = self._ratings.get(product_id)
+        if not rating or not rating[1]:
+            return None
+        # MySQL AVG(INT)와 같은 소수점 4자리 Decimal
+        return (Decimal(rating[0]) / rating[1]).quantize(Decimal("0.0001"))
+
+    def list_products(self):
+        self._read()
+        with self._lock:
+            return [
+                {
+                    "id": product['id'],
+                    "name": product['name'],
+                    "category": product['category'],
+                    "avg_rating": self._avg_rating(product['id'])
+                } for product in self._products.values()
+            ]
+
+    def get_product(self, product_id):
+        fresh = self._ensure_fresh()
+        with self._lock:
+            product = self._products.get(product_id)
+            loaded_at = self._loaded_at
+        self._count("hits" if fresh and product is not None else "misses")
+
+        if product is None and time.monotonic() - loaded_at >= self.MISS_RELOAD_INTERVAL:
+            # 캐시 적재 이후 추가된 상품일 수 있으므로 재적재 후 한 번 더 확인
+            with self._refresh_lock:
+                if self._loaded_at == loaded_at:
+                    self.load()
+            with self._lock:
+                product = self._products.get(product_id)
+
+        if product is None:
+            return None
+        with self._lock:
+            return dict(product, avg_rating=self._avg_rating(product_id))
+
+    def categories(self):
+        self._read()
+        with self._lock:
+            return list(self._categories)
+
+    def products_in_category(self, category_name):
+        self._read()
+        with self._lock:
+            return [
+                {"id": product['id'], "name": product['name']}
+                for product in self._by_category.get(category_name.lower(), [])
+            ]
+
+    def search(self, query):
+        self._read()
+        with self._lock:
+            return self.search_index.search(query)
+
+    def record_review(self, cursor, product_id):
+        """
+        리뷰 commit 후 해당 상품의 평점 집계를 다시 읽어 절댓값으로 반영
+        (더하기로 반영하면 동시에 도는 load()와 겹쳐 두 번 세거나 빠뜨릴 수 있음)
+        :param cursor: dictionary=True 커서
+        """
+        cursor.execute("""
+            SELECT COALESCE(SUM(rating), 0) AS rating_sum, COUNT(*) AS rating_count
+            FROM reviews
+            WHERE product_id = %s
+        """, (product_id,))
+        row = cursor.fetchone()
+        rating = [int(row['rating_sum']), row['rating_count']]
+        with self._lock:
+            self._ratings[product_id] = rating
+            self._reviewed[product_id] = rating
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["products"] = len(self._products)
+            stats["search_index"] = self.search_index.stats()
+            stats["age_seconds"] = (
+                None if self._loaded_at is None
+                else round(time.monotonic() - self._loaded_at, 3)
+            )
+        return stats
+
+
+catalog_cache = CatalogCache(db_pool, **CATALOG_CACHE_CONFIG)
+
+# 워커 시작 시 미리 적재 (실패하면 첫 조회 시 다시 시도)
+try:
+    catalog_cache.load()
+except Exception:
+    pass
+
+# 워커가 SIGHUP을 받으면 카탈로그 캐시 무효화 (Gunicorn 마스터의 SIGHUP은 워커 재시작)
+# 모든 워커: pkill -HUP --parent <마스터 PID>
+# 핸들러는 메인 스레드에서 실행되므로 락을 잡는 invalidate()는 별도 스레드로 넘김
+def invalidate_catalog_on_signal(signum, frame):
+    threading.Thread(target=catalog_cache.invalidate, name="catalog-invalidate", daemon=True).start()
+
+if threading.current_thread() is threading.main_thread():
+    signal.signal(signal.SIGHUP, invalidate_catalog_on_signal)
+
+
+#################################
+# 요청별 DB 사용량 계측
+#################################
+class InstrumentedCursor:
+    """
+    커서 래퍼: execute / executemany 횟수, 실행 + fetch 시간, fetch로 받은 행 수를 요청 통계에 더함
+    """
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def _timed(self, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._stats['db_time'] += time.perf_counter() - start
+
+    def execute(self, *args, **kwargs):
+        self._stats['queries'] += 1
+        return self._timed(self._cursor.execute, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._stats['queries'] += 1
+        return self._timed(self._cursor.executemany, *args, **kwargs)
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is not None:
+            self._stats['rows'] += 1
+        return row
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._stats['rows'] += len(rows)
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """
+    대여한 커넥션 래퍼: 커서를 InstrumentedCursor로 감싸고 commit / rollback 시간도 DB 시간에 더함
+    """
+    def __init__(self, conn, stats):
+        self._conn = conn
+        self._stats = stats
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._stats)
+
+    def _timed(self, func):
+        start = time.perf_counter()
+        try:
+            return func()
+        finally:
+            self._stats['db_time'] += time.perf_counter() - start
+
+    def commit(self):
+        return self._timed(self._conn.commit)
+
+    def rollback(self):
+        return self._timed(self._conn.rollback)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class DBRequestMetrics:
+    """
+    라우트별 요청당 DB 사용량 누적 (워커 프로세스 단위)
+    - queries: SQL 실행 수, db_time: 실행 + fetch + commit 시간, rows: 받은 행 수, acquire_time: 풀 대여 대기 시간
+    """
+    FIELDS = ("queries", "db_time", "rows", "acquire_time")
+
+    @classmethod
+    def empty(cls):
+        return {"queries": 0, "db_time": 0.0, "rows": 0, "acquire_time": 0.0}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, stats):
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self.empty()
+                entry.update(requests=0, max_queries=0, max_db_time=0.0)
+                self._routes[route] = entry
+            entry['requests'] += 1
+            for key in self.FIELDS:
+                entry[key] += stats[key]
+            entry['max_queries'] = max(entry['max_queries'], stats['queries'])
+            entry['max_db_time'] = max(entry['max_db_time'], stats['db_time'])
+
+    def stats(self):
+        """
+        :return: {route: {...}} 누적 DB 시간이 큰 라우트부터
+        """
+        with self._lock:
+            routes = {route: dict(entry) for route, entry in self._routes.items()}
+        result = {}
+        for route, entry in sorted(routes.items(), key=lambda item: item[1]['db_time'], reverse=True):
+            requests = entry['requests']
+            result[route] = {
+                "requests": requests,
+                "queries": entry['queries'],
+                "queries_per_request": round(entry['queries'] / requests, 2),
+                "max_queries": entry['max_queries'],
+                "rows_per_request": round(entry['rows'] / requests, 2),
+                "db_time_ms": round(entry['db_time'] * 1000, 3),
+                "db_ms_per_request": round(entry['db_time'] * 1000 / requests, 3),
+                "max_db_ms": round(entry['max_db_time'] * 1000, 3),
+                "acquire_ms_per_request": round(entry['acquire_time'] * 1000 / requests, 3)
+            }
+        return result
+
+
+db_request_metrics = DBRequestMetrics()
+
+
+def request_route():
+    """지표 라벨용 라우트 (URL 규칙, 없으면 unmatched)"""
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+def request_db_stats():
+    """현재 요청의 DB 사용량 (요청마다 새로 만듦)"""
+    if 'db_stats' not in g:
+        g.db_stats = DBRequestMetrics.empty()
+    return g.db_stats
+
+
+@app.after_request
+def add_db_stats_headers(response):
+    # Nginx가 upstream_http_x_db_* 로 custom_json 로그에 남김
+    stats = request_db_stats()
+    response.headers['X-DB-Queries'] = str(stats['queries'])
+    response.headers['X-DB-Time-Ms'] = f"{stats['db_time'] * 1000:.3f}"
+    response.headers['X-DB-Rows'] = str(stats['rows'])
+    response.headers['X-DB-Acquire-Ms'] = f"{stats['acquire_time'] * 1000:.3f}"
+    db_request_metrics.record(request_route(), stats)
+    return response
+
+
+#################################
+# Prometheus 지표 (워커 간 합산)
+#################################
+class MetricsRegistry:
+    """
+    Prometheus 텍스트 형식 지표 저장소
+    - counter / gauge / histogram 값을 (이름, 라벨) 단위로 워커 메모리에 보관
+    - collector: 스냅샷 시점에 읽는 값 (커넥션 풀 상태 등), (종류, 이름, 라벨, 값) 목록을 반환하는 함수
+    - multiproc_dir가 있으면 워커마다 flush_interval_ms 주기로 스냅샷을 pid 파일(JSON)에 쓰고,
+      /metrics를 받은 워커가 자기 스냅샷을 쓴 뒤 디렉터리의 파일을 모두 합쳐서 응답
+      (counter / histogram은 종료된 워커 값도 합산, gauge는 살아 있는 워커만 합산)
+    - 종료된 워커의 파일은 /metrics 때 counter / histogram만 archive.json에 합치고 지움
+      (같은 pid를 받은 새 워커도 첫 스냅샷 전에 남은 파일을 archive.json으로 옮겨 합계가 줄지 않게 함,
+       archive.json은 디렉터리 락(archive.lock, fcntl)을 잡고 고침)
+    - multiproc_dir가 없거나 만들 수 없으면 이 워커 값만 응답
+    """
+    def __init__(self, metadata, buckets, multiproc_dir='', flush_interval_ms=1000):
+        self.metadata = metadata  # 이름 -> (종류, 설명), 출력 순서
+        self.buckets = tuple(buckets)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.multiproc_dir = multiproc_dir or None
+        if self.multiproc_dir:
+            try:
+                os.makedirs(self.multiproc_dir, exist_ok=True)
+            except OSError as e:
+                print(f"Metrics directory {self.multiproc_dir} unavailable, serving per-worker metrics: {e}")
+                self.multiproc_dir = None
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}  # key -> [버킷별 개수(+Inf 포함), 합계]
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+        # 마지막으로 스냅샷을 쓴 프로세스 (fork 후 첫 flush에서 같은 pid의 이전 파일을 정리)
+        self._pid = None
+
+    def _ensure_started(self):
+        # Gunicorn fork 이후에도 워커마다 스냅샷 스레드가 떠 있도록 지연 시작
+        if self.multiproc_dir and not self._stopped and (self._thread is None or not self._thread.is_alive()):
+            self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def inc(self, name, labels=(), amount=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            self._ensure_started()
+
+    def add_gauge(self, name, labels=(), amount=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(labels))
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    def snapshot(self):
+        """
+        이 워커의 현재 값 (JSON으로 저장 가능한 형태)
+        """
+        with self._lock:
+            counters = [[name, list(labels), value] for (name, labels), value in self._counters.items()]
+            gauges = [[name, list(labels), value] for (name, labels), value in self._gauges.items()]
+            histograms = [[name, list(labels), list(entry[0]), entry[1]]
+                          for (name, labels), entry in self._histograms.items()]
+        for collector in self._collectors:
+            try:
+                for kind, name, labels, value in collector():
+                    (counters if kind == "counter" else gauges).append([name, list(labels), value])
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+        return {"pid": os.getpid(), "counters": counters, "gauges": gauges, "histograms": histograms}
+
+    def _path(self, pid):
+        return os.path.join(self.multiproc_dir, f"worker-{pid}.json")
+
+    def _archive_path(self):
+        return os.path.join(self.multiproc_dir, "archive.json")
+
+    def _lock_dir(self):
+        fd = os.open(os.path.join(self.multiproc_dir, "archive.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    @staticmethod
+    def _unlock_dir(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write(path, data):
+        # 다른 워커가 반쯤 쓴 파일을 읽지 않도록 임시 파일 후 이름 변경
+        with open(path + ".tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def _add(snapshot, counters, histograms, gauges=None):
+        """스냅샷 값을 (이름, 라벨 튜플) 키의 dict에 더함 (gauges가 None이면 gauge는 건너뜀)"""
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        if gauges is not None:
+            for name, labels, value in snapshot["gauges"]:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                gauges[key] = gauges.get(key, 0) + value
+        for name, labels, counts, total in snapshot["histograms"]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            entry = histograms.setdefault(key, [[0] * len(counts), 0.0])
+            entry[0] = [a + b for a, b in zip(entry[0], counts)]
+            entry[1] += total
+
+    def _archive(self, paths):
+        """
+        종료된 워커 스냅샷의 counter / histogram을 archive.json에 합치고 파일을 지움 (디렉터리 락을 잡은 상태에서 호출)
+        """
+        counters, histograms = {}, {}
+        for path in [self._archive_path()] + paths:
+            snapshot = self._read(path)
+            if snapshot:
+                self._add(snapshot, counters, histograms)
+        self._write(self._archive_path(), {
+            "pid": None,
+            "counters": [[name, [list(pair) for pair in labels], value] for (name, labels), value in counters.items()],
+            "gauges": [],
+            "histograms": [[name, [list(pair) for pair in labels], entry[0], entry[1]]
+                           for (name, labels), entry in histograms.items()]
+        })
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def flush(self):
+        """이 워커의 스냅샷을 파일로 씀"""
+        if not self.multiproc_dir:
+            return
+        try:
+            pid = os.getpid()
+            path = self._path(pid)
+            if self._pid != pid:
+                # 새 워커: 같은 pid를 쓰던 종료된 워커의 파일은 덮어쓰기 전에 archive.json으로 옮김
+                self._pid = pid
+                if os.path.exists(path):
+                    fd = self._lock_dir()
+                    try:
+                        if os.path.exists(path):
+                            self._archive([path])
+                    finally:
+                        self._unlock_dir(fd)
+            self._write(path, self.snapshot())
+        except OSError as e:
+            print(f"Failed to write metrics snapshot: {e}")
+
+    def _snapshots(self):
+        """
+        :return: (살아 있는 워커 스냅샷 목록, archive.json 스냅샷 또는 None)
+        """
+        if not self.multiproc_dir:
+            return [self.snapshot()], None
+        self.flush()
+        snapshots = []
+        # 목록 읽기 / 종료된 워커 정리 / archive 읽기를 한 락 안에서 (다른 워커의 정리와 겹쳐 두 번 세지 않도록)
+        fd = self._lock_dir()
+        try:
+            dead = []
+            for name in os.listdir(self.multiproc_dir):
+                if not (name.startswith("worker-") and name.endswith(".json")):
+                    continue
+                path = os.path.join(self.multiproc_dir, name)
+                snapshot = self._read(path)
+                if snapshot is None:
+                    continue
+                if self._alive(snapshot["pid"]):
+                    snapshots.append(snapshot)
+                else:
+                    dead.append(path)
+            if dead:
+                self._archive(dead)
+            archive = self._read(self._archive_path())
+        finally:
+            self._unlock_dir(fd)
+        return snapshots, archive
+
+    @staticmethod
+    def _alive(pid):
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+
+    def collect(self):
+        """
+        모든 워커 스냅샷 합산
+        :return: (counters, gauges, histograms, 살아 있는 워커 수) 각 dict의 키는 (이름, 라벨 튜플)
+        """
+        counters, gauges, histograms = {}, {}, {}
+        snapshots, archive = self._snapshots()
+        for snapshot in snapshots:
+            self._add(snapshot, counters, histograms, gauges)
+        if archive:
+            # 종료된 워커: counter / histogram만
+            self._add(archive, counters, histograms)
+        return counters, gauges, histograms, len(snapshots)
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{str(value).replace(chr(34), chr(39))}"' for key, value in pairs) + "}"
+
+    @staticmethod
+    def _value(value):
+        return str(value) if isinstance(value, int) else repr(float(value))
+
+    def render(self):
+        """
+        Prometheus 텍스트 형식 (version 0.0.4)
+        """
+        counters, gauges, histograms, workers = self.collect()
+        gauges[("flask_worker_processes", ())] = workers
+        by_name = {}
+        for source in (counters, gauges, histograms):
+            for (name, labels), value in source.items():
+                by_name.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, (kind, help_text) in self.metadata.items():
+            samples = sorted(by_name.get(name, []), key=lambda sample: sample[0])
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if kind != "histogram":
+                    lines.append(f"{name}{self._labels(labels)} {self._value(value)}")
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{self._labels(labels)} {self._value(total)}")
+                lines.append(f"{name}_count{self._labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def stop(self):
+        self._stopped = True
+        # 종료 직전 값을 남겨 두어 counter가 줄어들지 않게 함
+        self.flush()
+
+
+METRICS = {
+    "flask_http_requests_total": ("counter", "HTTP requests by route, method and status"),
+    "flask_http_request_duration_seconds": ("histogram", "Request latency inside the Flask app"),
+    "flask_http_requests_in_progress": ("gauge", "Requests currently being handled"),
+    "flask_http_exceptions_total": ("counter", "Unhandled exceptions by route and type"),
+    "flask_db_queries_total": ("counter", "SQL statements executed by request handlers"),
+    "flask_db_rows_total": ("counter", "Rows fetched by request handlers"),
+    "flask_db_time_seconds_total": ("counter", "Time spent in execute / fetch / commit by request handlers"),
+    "flask_db_acquire_seconds_total": ("counter", "Time spent waiting for a pooled DB connection"),
+    "flask_db_pool_connections": ("gauge", "Pooled DB connections by state"),
+    "flask_db_pool_size": ("gauge", "Maximum pooled DB connections"),
+    "flask_db_pool_events_total": ("counter", "DB pool events (created / reused / discarded / timeouts)"),
+    "flask_push_buffer_messages": ("gauge", "Pushed messages waiting in worker buffers"),
+    "flask_push_buffer_bytes": ("gauge", "Bytes of pushed messages waiting in worker buffers"),
+    "flask_push_messages_total": ("counter", "Pushed messages (accepted / rejected / dropped / spilled / trimmed)"),
+    "flask_worker_processes": ("gauge", "Live worker processes reporting metrics")
+}
+
+metrics = MetricsRegistry(METRICS, **METRICS_CONFIG)
+atexit.register(metrics.stop)
+
+
+def collect_db_pool():
+    stats = db_pool.stats()
+    samples = [
+        ("gauge", "flask_db_pool_connections", [("state", "in_use")], stats["in_use"]),
+        ("gauge", "flask_db_pool_connections", [("state", "idle")], stats["idle"]),
+        ("gauge", "flask_db_pool_size", [], stats["size"])
+    ]
+    for event in ("created", "reused", "discarded", "timeouts"):
+        samples.append(("counter", "flask_db_pool_events_total", [("event", event)], stats[event]))
+    return samples
+
+
+metrics.add_collector(collect_db_pool)
+
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_start = time.perf_counter()
+    g.metrics_route = request_route()
+    metrics.add_gauge("flask_http_requests_in_progress", [("route", g.metrics_route)], 1)
+
+
+@app.after_request
+def remember_response_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def record_request_metrics(exc):
+    # 처리되지 않은 예외(/error의 ZeroDivisionError 등)도 teardown은 실행됨
+    if 'metrics_start' not in g:
+        return
+    route = g.metrics_route
+    method = request.method
+    elapsed = time.perf_counter() - g.metrics_start
+    metrics.add_gauge("flask_http_requests_in_progress", [("route", route)], -1)
+    status = g.get('metrics_status', 500)
+    metrics.inc("flask_http_requests_total", [("route", route), ("method", method), ("status", str(status))])
+    metrics.observe("flask_http_request_duration_seconds", [("route", route), ("method", method)], elapsed)
+    if exc is not None:
+        metrics.inc("flask_http_exceptions_total", [("route", route), ("type", type(exc).__name__)])
+
+    stats = g.get('db_stats')
+    if stats and stats['queries']:
+        labels = [("route", route)]
+        metrics.inc("flask_db_queries_total", labels, stats['queries'])
+        metrics.inc("flask_db_rows_total", labels, stats['rows'])
+        metrics.inc("flask_db_time_seconds_total", labels, stats['db_time'])
+        metrics.inc("flask_db_acquire_seconds_total", labels, stats['acquire_time'])
+
+
+@app.teardown_request
+def release_db_connections(exc):
+    # 라우트에서 반납하지 못한 커넥션(예외 경로 등)을 요청 종료 시 풀에 반납
+    for conn in g.pop('db_connections', []):
+        conn.close()
+
+
+@app.before_request
+def update_last_active():
+    # DB 반영은 last_active_writer가 주기적으로 일괄 처리
+    session_id = request.cookies.get('session_id')
+    if session_id:
+        last_active_writer.record(session_id)
+
 
 def get_db_connection():
-    return mysql.connector.connect(**DB_CONFIG)
+    if not has_request_context():
+        return db_pool.get()
+
+    stats = request_db_stats()
+    start = time.perf_counter()
+    conn = db_pool.get()
+    stats['acquire_time'] += time.perf_counter() - start
+    g.setdefault('db_connections', []).append(conn)
+    return InstrumentedConnection(conn, stats)
     
 
 
@@ -108,6 +1551,8 @@ def get_or_create_session_id():
     if not session_id:
         session_id = str(uuid.uuid4())
         # 세션을 DB에 저장
+        conn = None
+        cursor = None
         try:
             conn = get_db_connection()
             cursor = conn.cursor()
@@ -128,6 +1573,8 @@ def get_or_create_session_id():
 def create_session_id():
     session_id = str(uuid.uuid4())
     # 세션을 DB에 저장
+    conn = None
+    cursor = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -365,20 +1812,9 @@ def delete_user():
 
 @app.route('/products')
 def products():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT p.id, p.name, p.category, 
-               CASE WHEN COUNT(r.review_id) = 0 THEN NULL ELSE AVG(r.rating) END AS avg_rating
-        FROM products p
-        LEFT JOIN reviews r ON p.id = r.product_id
-        GROUP BY p.id
-    """)
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    rows = catalog_cache.list_products()
 
-    # rows는 DB 조회 결과 (list[dict]) 형태
+    # rows는 카탈로그 캐시 조회 결과 (list[dict]) 형태
 
     # 1) HTML을 렌더링하는 콜백 함수 정의
     def render_products_html(data):
@@ -401,20 +1837,12 @@ def product_detail():
     user_id = request.cookies.get('user_id')  # 현재 로그인된 사용자 확인
     session_id = get_or_create_session_id()  # 세션 ID 가져오기
 
+    # 상품 정보 가져오기 (카탈로그 캐시)
+    product = catalog_cache.get_product(product_id)
+
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
 
-    # 상품 정보 가져오기
-    cursor.execute("""
-        SELECT p.id, p.name, p.price, p.category, 
-               CASE WHEN COUNT(r.review_id) = 0 THEN NULL ELSE AVG(r.rating) END AS avg_rating
-        FROM products p
-        LEFT JOIN reviews r ON p.id = r.product_id
-        WHERE p.id = %s
-        GROUP BY p.id
-    """, (product_id,))
-    product = cursor.fetchone()
-
     # 리뷰 목록 가져오기
     cursor.execute("""
         SELECT r.rating, r.review_time, u.name AS reviewer_name
@@ -596,14 +2024,9 @@ def login():
 @app.route('/categories')
 def categories():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT DISTINCT category FROM products")
-        rows = cursor.fetchall()
-
-        # 데이터 구성: JSON 응답을 위한 데이터
+        # 데이터 구성: JSON 응답을 위한 데이터 (카탈로그 캐시)
         data_for_json = {
-            "categories": [row['category'] for row in rows]
+            "categories": catalog_cache.categories()
         }
 
         # HTML 렌더링을 위한 콜백 함수 정의
@@ -623,12 +2046,6 @@ def categories():
 
     except Exception as e:
         return f"An error occurred: {e}. <a href='/'>[Home]</a>", 500
-
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
             
             
 
@@ -639,20 +2056,10 @@ def category():
         return "Category name is required. <a href='/'>[Home]</a>", 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id, name FROM products WHERE category = %s", (category_name,))
-        rows = cursor.fetchall()
-
-        # 데이터 구성: JSON 응답을 위한 데이터
+        # 데이터 구성: JSON 응답을 위한 데이터 (카탈로그 캐시)
         data_for_json = {
             "category": category_name,
-            "products": [
-                {
-                    "id": row['id'],
-                    "name": row['name']
-                } for row in rows
-            ]
+            "products": catalog_cache.products_in_category(category_name)
         }
 
         # HTML 렌더링을 위한 콜백 함수 정의
@@ -674,12 +2081,6 @@ def category():
 
     except Exception as e:
         return f"An error occurred: {e}. <a href='/'>[Home]</a>", 500
-
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
             
             
 
@@ -736,16 +2137,11 @@ def search():
         if not session_exists:
             return "Invalid session. Please visit the homepage to create a session. <a href='/'>[Home]</a>", 400
 
-        # Perform the search
-        cursor.execute("SELECT id, name FROM products WHERE name LIKE %s OR category LIKE %s", (f"%{query}%", f"%{query}%"))
-        rows = cursor.fetchall()
+        # Perform the search (catalog search index)
+        rows = catalog_cache.search(query)
 
-        # Log the search query
-        cursor.execute(
-            "INSERT INTO search_logs (session_id, search_query, searched_at) VALUES (%s, %s, NOW())",
-            (session_id, query)
-        )
-        conn.commit()
+        # Log the search query (search_log_writer가 백그라운드에서 일괄 적재)
+        search_log_writer.record(session_id, query)
 
         # 데이터 구성: JSON 응답을 위한 데이터
         data_for_json = {
@@ -796,19 +2192,16 @@ def add_to_cart():
         return "Product ID, User ID, and Session ID are required. <a href='/'>[Home]</a>", 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # Check if the product exists and fetch its price
-        cursor.execute("SELECT id, price FROM products WHERE id = %s", (product_id,))
-        product = cursor.fetchone()
+        # Check if the product exists and fetch its price (catalog cache)
+        product = catalog_cache.get_product(product_id)
         if not product:
-            cursor.close()
-            conn.close()
             return "Invalid product. <a href='/'>[Home]</a>", 404
 
         product_price = product['price']
 
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
         # Check if the product is already in the cart for this session
         cursor.execute(
             "SELECT cart_id, quantity FROM cart WHERE session_id = %s AND product_id = %s",
@@ -1031,42 +2424,35 @@ def checkout():
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
-        # Fetch all cart items for the current session
+        # Lock the cart rows of the current session (blocks concurrent cart changes until commit)
+        cursor.execute(
+            "SELECT COUNT(*) AS item_count FROM cart WHERE session_id = %s FOR UPDATE",
+            (session_id,)
+        )
+        if not cursor.fetchone()['item_count']:
+            return "Your cart is empty. <a href='/'>[Home]</a>"
+
+        # Process all cart items as orders in one statement (장바구니 크기와 무관하게 일정한 왕복 수)
         cursor.execute("""
-            SELECT c.cart_id, c.product_id, c.price, c.quantity, p.name
+            INSERT INTO orders (order_id, user_id, session_id, product_id, price, quantity, order_time)
+            SELECT UUID(), %s, c.session_id, c.product_id, c.price, c.quantity, NOW()
             FROM cart c
             JOIN products p ON c.product_id = p.id
             WHERE c.session_id = %s
-        """, (session_id,))
-        cart_items = cursor.fetchall()
-
-        if not cart_items:
-            return "Your cart is empty. <a href='/'>[Home]</a>"
+        """, (user_id, session_id))
 
-        # Process each cart item as an order
-        for item in cart_items:
-            order_id = str(uuid.uuid4())
-            cursor.execute(
-                """
-                INSERT INTO orders (order_id, user_id, session_id, product_id, price, quantity, order_time)
-                VALUES (%s, %s, %s, %s, %s, %s, NOW())
-                """,
-                (order_id, user_id, session_id, item['product_id'], item['price'], item['quantity'])
+        # cart_logs: CHECKED_OUT
+        cursor.execute("""
+            INSERT INTO cart_logs (
+                cart_id, session_id, user_id, product_id,
+                old_quantity, new_quantity, price, event_type, event_time
             )
-
-            # cart_logs: CHECKED_OUT
-            old_quantity = item['quantity']
-            new_quantity = 0
-            cursor.execute("""
-                INSERT INTO cart_logs (
-                    cart_id, session_id, user_id, product_id,
-                    old_quantity, new_quantity, price, event_type, event_time
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, 'CHECKED_OUT', NOW())
-            """, (
-                item['cart_id'], session_id, user_id, item['product_id'],
-                old_quantity, new_quantity, item['price']
-            ))
+            SELECT c.cart_id, c.session_id, %s, c.product_id,
+                   c.quantity, 0, c.price, 'CHECKED_OUT', NOW()
+            FROM cart c
+            JOIN products p ON c.product_id = p.id
+            WHERE c.session_id = %s
+        """, (user_id, session_id))
 
         # Clear the cart after checkout
         cursor.execute("DELETE FROM cart WHERE session_id = %s", (session_id,))
@@ -1162,10 +2548,8 @@ def add_review():
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
-        # Check if the product exists
-        cursor.execute("SELECT id FROM products WHERE id = %s", (product_id,))
-        product_exists = cursor.fetchone()
-        if not product_exists:
+        # Check if the product exists (catalog cache)
+        if not catalog_cache.get_product(product_id):
             return "Invalid Product ID. <a href='/'>[Home]</a>", 404
 
         # Check if the session exists
@@ -1187,6 +2571,7 @@ def add_review():
             (review_id, product_id, rating, user_id, session_id)
         )
         conn.commit()
+        catalog_cache.record_review(cursor, product_id)
         return f"Review added for Product {product_id} with rating {rating} by User {user_id}, Session ID: {session_id}. <a href='/'>[Home]</a>"
     except Exception as e:
         return f"An error occurred: {e}. <a href='/'>[Home]</a>", 500
@@ -1202,30 +2587,281 @@ def error():
     return 1/0
 
 
+#################################
+# 워커 내부 상태 조회 Endpoint
+#################################
+@app.route('/internal/stats')
+def internal_stats():
+    """
+    현재 워커 프로세스의 커넥션 풀 / 지연 쓰기 / 검색 로그 대기열 / 카탈로그 캐시 / Push 버퍼 상태를 JSON으로 반환
+    (Gunicorn 워커마다 값이 다름)
+    """
+    return jsonify({
+        "db_pool": db_pool.stats(),
+        "last_active_writer": last_active_writer.stats(),
+        "search_log_writer": search_log_writer.stats(),
+        "catalog_cache": catalog_cache.stats(),
+        "push_store": push_store.stats()
+    })
+
+@app.route('/internal/catalog/invalidate', methods=['POST'])
+def internal_catalog_invalidate():
+    """
+    이 워커의 카탈로그 캐시를 무효화 (products / reviews를 직접 바꾼 뒤 호출, 다음 조회 시 다시 적재)
+    모든 워커를 무효화하려면 워커 프로세스에 SIGHUP
+    """
+    catalog_cache.invalidate()
+    return jsonify({"catalog_cache": catalog_cache.stats()})
+
 
 #################################
-# 메시지 저장 Endpoint
+# 지표 Endpoint
+#################################
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    Prometheus 텍스트 형식 지표 (모든 Gunicorn 워커 합산)
+    ?format=json: 이 워커의 라우트별 요청당 쿼리 수 / DB 시간 / 행 수 / 커넥션 대여 대기 시간 (누적 DB 시간이 큰 라우트부터)
+    """
+    if request.args.get('format') == 'json':
+        return jsonify({
+            "routes": db_request_metrics.stats(),
+            "db_pool": db_pool.stats()
+        })
+    response = make_response(metrics.render())
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return response
+
+
+#################################
+# Push 메시지 저장소
 #################################
-messages_storage = []
+class PushMessageStore:
+    """
+    Push Subscription으로 받은 메시지를 제한된 메모리로 받아 워커 공용 sqlite 파일에 적재
+    - append(): 워커별 링 버퍼에 넣고 바로 반환 (메시지 수 buffer_size, 바이트 buffer_max_bytes 상한)
+      버퍼가 가득 차면 policy에 따라 거절(reject: 503을 돌려 Push 서비스가 재전송)하거나 가장 오래된 메시지를 버림(drop_oldest)
+    - 백그라운드 스레드가 batch_size 개 또는 flush_interval_ms 단위로 sqlite(WAL)에 INSERT
+      적재에 실패한 메시지는 버퍼에 남아 다음 주기에 다시 시도
+    - id는 모든 워커에 걸쳐 증가하므로 read(after, limit)로 어느 워커에서든 같은 순서로 이어서 읽을 수 있음
+    - 파일에는 최근 max_messages 개만 유지 (오래된 메시지부터 삭제)
+    - 워커 종료 시(atexit) 버퍼에 남은 메시지를 모두 적재
+    """
+    POLICIES = ("reject", "drop_oldest")
+    # 보관 개수 초과분 삭제 주기 (초)
+    TRIM_INTERVAL = 10
+
+    def __init__(self, path, buffer_size=10000, buffer_max_bytes=67108864, batch_size=500,
+                 flush_interval_ms=200, policy="reject", max_messages=1000000, max_message_bytes=1048576):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown push buffer policy: {policy}")
+        self.path = path
+        self.buffer_size = buffer_size
+        self.buffer_max_bytes = buffer_max_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.policy = policy
+        self.max_messages = max_messages
+        self.max_message_bytes = max_message_bytes
+        self._buffer = collections.deque()  # (순번, 수신 시각, JSON 문자열)
+        self._buffer_bytes = 0
+        self._seq = 0
+        self._writing_upto = 0  # 적재 중인 배치의 마지막 순번 (버려도 이미 파일에 쓰는 중)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._local = threading.local()
+        self._stopped = False
+        self._thread = None
+        self._last_trim = 0.0
+        self._stats = {
+            "accepted": 0,
+            "rejected": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "trimmed": 0,
+            "flushes": 0,
+            "errors": 0
+        }
+
+    def _ensure_started(self):
+        # Gunicorn fork 이후에도 워커마다 적재 스레드가 떠 있도록 지연 시작
+        if not self._stopped and (self._thread is None or not self._thread.is_alive()):
+            self._thread = threading.Thread(target=self._run, name="push-store-writer", daemon=True)
+            self._thread.start()
+
+    def _connection(self):
+        # sqlite 커넥션은 스레드마다 하나 (적재 스레드 / 요청 스레드)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # AUTOINCREMENT: 삭제된 id를 다시 쓰지 않으므로 after 커서가 항상 앞으로만 감
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS push_messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    received_at REAL NOT NULL,
+                    data TEXT NOT NULL
+                )
+            """)
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def append(self, data):
+        """
+        :return: 받았으면 True, 버퍼가 가득 차 거절했으면 False
+        """
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        size = len(payload)
+        with self._lock:
+            while self._buffer and (len(self._buffer) >= self.buffer_size
+                                    or self._buffer_bytes + size > self.buffer_max_bytes):
+                if self.policy == "reject":
+                    self._stats["rejected"] += 1
+                    return False
+                seq, _, dropped = self._buffer.popleft()
+                self._buffer_bytes -= len(dropped)
+                if seq > self._writing_upto:
+                    self._stats["dropped"] += 1
+            self._seq += 1
+            self._buffer.append((self._seq, time.time(), payload))
+            self._buffer_bytes += size
+            self._stats["accepted"] += 1
+            full = len(self._buffer) >= self.batch_size
+            self._ensure_started()
+        if full:
+            self._wakeup.set()
+        return True
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """버퍼의 메시지를 적재 (호출한 스레드에서, 실패하면 남겨 두고 반환)"""
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = list(itertools.islice(self._buffer, self.batch_size))
+                    self._writing_upto = batch[-1][0] if batch else 0
+                if not batch:
+                    return
+                try:
+                    conn = self._connection()
+                    conn.executemany(
+                        "INSERT INTO push_messages (received_at, data) VALUES (?, ?)",
+                        [(received_at, payload) for _, received_at, payload in batch]
+                    )
+                    conn.commit()
+                except Exception as e:
+                    print(f"Failed to spill push messages: {e}")
+                    with self._lock:
+                        self._writing_upto = 0
+                        self._stats["errors"] += 1
+                    return
+
+                # 적재하는 동안 drop_oldest로 이미 빠진 메시지가 있을 수 있으므로 순번으로 제거
+                last_seq = batch[-1][0]
+                with self._lock:
+                    while self._buffer and self._buffer[0][0] <= last_seq:
+                        _, _, payload = self._buffer.popleft()
+                        self._buffer_bytes -= len(payload)
+                    self._writing_upto = 0
+                    self._stats["spilled"] += len(batch)
+                    self._stats["flushes"] += 1
+                self._trim(conn)
+                if len(batch) < self.batch_size:
+                    return
+
+    def _trim(self, conn):
+        if time.monotonic() - self._last_trim < self.TRIM_INTERVAL:
+            return
+        self._last_trim = time.monotonic()
+        try:
+            cursor = conn.execute(
+                "DELETE FROM push_messages WHERE id <= (SELECT MAX(id) FROM push_messages) - ?",
+                (self.max_messages,)
+            )
+            conn.commit()
+            with self._lock:
+                self._stats["trimmed"] += cursor.rowcount
+        except Exception as e:
+            print(f"Failed to trim push messages: {e}")
+
+    def read(self, after=0, limit=100):
+        """
+        id가 after보다 큰 메시지를 limit개까지 (적재된 메시지만, 버퍼에 있는 메시지는 다음 적재 후 보임)
+        :return: ([(id, JSON 문자열), ...], 뒤에 더 있는지)
+        """
+        rows = self._connection().execute(
+            "SELECT id, data FROM push_messages WHERE id > ? ORDER BY id LIMIT ?",
+            (after, limit + 1)
+        ).fetchall()
+        return rows[:limit], len(rows) > limit
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["buffered"] = len(self._buffer)
+            stats["buffered_bytes"] = self._buffer_bytes
+        return stats
 
+    def stop(self, timeout=5):
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+
+push_store = PushMessageStore(**PUSH_STORE_CONFIG)
+atexit.register(push_store.stop)
+
+
+def collect_push_store():
+    stats = push_store.stats()
+    samples = [
+        ("gauge", "flask_push_buffer_messages", [], stats["buffered"]),
+        ("gauge", "flask_push_buffer_bytes", [], stats["buffered_bytes"])
+    ]
+    for event in ("accepted", "rejected", "dropped", "spilled", "trimmed"):
+        samples.append(("counter", "flask_push_messages_total", [("event", event)], stats[event]))
+    return samples
+
+
+metrics.add_collector(collect_push_store)
+
+
+#################################
+# 메시지 저장 Endpoint
+#################################
 @app.route('/push-subscription', methods=['POST'])
 def push_subscription():
     """
     외부 Push Subscription 서비스가 메시지를 POST 방식으로 보낼 수 있음
-    수신된 메시지는 JSON 형식으로 처리되며, 메모리에 저장
+    수신된 메시지는 JSON 형식으로 처리되며, 워커 버퍼를 거쳐 push_store 파일에 저장
+    버퍼가 가득 차면 503을 돌려 Push 서비스가 나중에 다시 보내게 함 (PUSH_BUFFER_POLICY=reject)
     """
     try:
-        # Parse the incoming JSON payload
-        data = request.get_json()
+        if request.content_length and request.content_length > push_store.max_message_bytes:
+            return "Message too large.", 413
+
+        # Parse the incoming JSON payload (잘못된 JSON이면 None -> 400)
+        data = request.get_json(silent=True)
 
         if not data:
             return "Invalid data format. Expected JSON payload.", 400
 
-        # Save the message into the in-memory storage
-        messages_storage.append(data)
-
-        # Log the received message
-        print(f"Received message: {data}")
+        # Save the message (bounded per-worker buffer, spilled to the shared store)
+        if not push_store.append(data):
+            return "Message buffer is full. Retry later.", 503
 
         return "Message received and stored successfully.", 200
 
@@ -1237,26 +2873,32 @@ def push_subscription():
 #################################
 # 메시지 조회 Endpoint
 #################################
-
-
 @app.route('/push-messages', methods=['GET'])
 def get_push_messages():
     """
-    GET 방식으로 저장된 데이터를 JSON 형식으로 반환
-    브라우저 또는 API 클라이언트에서 데이터를 확인
+    GET 방식으로 저장된 메시지를 id 순서로 나눠서 반환
+    - after: 이 id 다음부터 (이전 응답의 next_after), limit: 한 번에 받을 개수 (최대 PUSH_PAGE_MAX_LIMIT)
+    - 응답: {"messages": [...], "next_after": 마지막 id, "has_more": true/false}
     """
     try:
-        # Respond with all stored messages as JSON
-        return jsonify({"messages": messages_storage}), 200
+        after = max(request.args.get('after', 0, type=int), 0)
+        limit = min(max(request.args.get('limit', PUSH_PAGE_DEFAULT_LIMIT, type=int), 1), PUSH_PAGE_MAX_LIMIT)
+        rows, has_more = push_store.read(after, limit)
+
+        # 저장된 JSON 문자열을 다시 파싱하지 않고 그대로 이어 붙임
+        next_after = rows[-1][0] if rows else after
+        more = "true" if has_more else "false"
+        body = ('{"messages": [' + ",".join(payload for _, payload in rows) + '], '
+                f'"next_after": {next_after}, "has_more": {more}}}')
+        response = make_response(body, 200)
+        response.headers['Content-Type'] = 'application/json'
+        return response
 
     except Exception as e:
         print(f"Error while retrieving messages: {e}")
         return f"An error occurred: {e}", 500
 
-    
 
-    
-            
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8080)
 EOL
@@ -1285,6 +2927,10 @@ After=network.target
 User=ubuntu
 Group=www-data
 WorkingDirectory=$APP_DIR
+# 워커별 지표 스냅샷 디렉터리 (서비스 시작 시 새로 만들고 중지 시 삭제)
+RuntimeDirectory=$(basename $METRICS_DIR)
+# Push 메시지 파일 디렉터리 (/var/lib/flask_app, 재시작 후에도 유지)
+StateDirectory=$(basename $(dirname $PUSH_STORE_PATH))
 ExecStart=/usr/bin/gunicorn --workers $WORKERS --threads $THREADS -b 127.0.0.1:8080 app:app
 
 [Install]
@@ -1312,6 +2958,10 @@ if ! grep -q "log_format $LOG_FORMAT_NAME" $NGINX_CONF_MAIN; then
             \"user_id\":\"\$cookie_user_id\",\\n\
             \"request_time\":\"\$request_time\",\\n\
             \"upstream_response_time\":\"\$upstream_response_time\",\\n\
+            \"db_queries\":\"\$upstream_http_x_db_queries\",\\n\
+            \"db_time_ms\":\"\$upstream_http_x_db_time_ms\",\\n\
+            \"db_rows\":\"\$upstream_http_x_db_rows\",\\n\
+            \"db_acquire_ms\":\"\$upstream_http_x_db_acquire_ms\",\\n\
             \"endpoint\":\"\$uri\",\\n\
             \"method\":\"\$request_method\",\\n\
             \"query_params\":\"\$args\",\\n\
@@ -1353,3 +3003,4 @@ run_command systemctl restart nginx
 
 log "Setup complete. Flask application is running with Gunicorn and Nginx."
 echo "You can access your application at http://<your_server_ip>/"
+echo "To reload the product catalog in every worker: sudo pkill -HUP --parent \$(systemctl show -p MainPID --value flask_app)"
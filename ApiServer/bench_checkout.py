@@ -0,0 +1,227 @@
+# bench_checkout.py
+# pip install mysql-connector-python 필요
+#
+# /checkout 처리 방식 비교 벤치마크
+#   - loop: 장바구니 항목마다 orders / cart_logs INSERT (기존 방식, 2N+2 왕복)
+#   - set:  INSERT ... SELECT 기반 (ApiServer.sh의 현재 방식, 장바구니 크기와 무관하게 4 왕복)
+#
+# DataBase.sh로 만든 shopdb에 임시 세션을 만들어 측정하고, 측정 후 생성한 행은 모두 삭제한다.
+# 사용 예: MYSQL_HOST=127.0.0.1 python3 bench_checkout.py --sizes 1 10 100 --rounds 20
+
+import argparse
+import json
+import os
+import statistics
+import time
+import uuid
+
+import mysql.connector
+
+#################################
+# 설정 (DataBase.sh와 같은 환경변수 사용)
+#################################
+DB_CONFIG = {
+    'user': os.getenv("MYSQL_USER", "admin"),
+    'password': os.getenv("MYSQL_PASS", "admin1234"),
+    'host': os.getenv("MYSQL_HOST", "127.0.0.1"),
+    'port': int(os.getenv("MYSQL_PORT", "3306")),
+    'database': os.getenv("MYSQL_DB", "shopdb"),
+    'ssl_disabled': True
+}
+
+# DataBase.sh가 넣어두는 테스트 사용자
+BENCH_USER_ID = "u1"
+
+#################################
+# checkout 구현 (측정 대상)
+#################################
+def checkout_loop(cursor, user_id, session_id):
+    """
+    기존 /checkout 구현: 항목마다 INSERT 두 번
+    :return: 실행한 SQL 문 수
+    """
+    cursor.execute("""
+        SELECT c.cart_id, c.product_id, c.price, c.quantity, p.name
+        FROM cart c
+        JOIN products p ON c.product_id = p.id
+        WHERE c.session_id = %s
+    """, (session_id,))
+    cart_items = cursor.fetchall()
+    statements = 1
+
+    for item in cart_items:
+        cursor.execute(
+            """
+            INSERT INTO orders (order_id, user_id, session_id, product_id, price, quantity, order_time)
+            VALUES (%s, %s, %s, %s, %s, %s, NOW())
+            """,
+            (str(uuid.uuid4()), user_id, session_id, item['product_id'], item['price'], item['quantity'])
+        )
+        cursor.execute("""
+            INSERT INTO cart_logs (
+                cart_id, session_id, user_id, product_id,
+                old_quantity, new_quantity, price, event_type, event_time
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s, 'CHECKED_OUT', NOW())
+        """, (
+            item['cart_id'], session_id, user_id, item['product_id'],
+            item['quantity'], 0, item['price']
+        ))
+        statements += 2
+
+    cursor.execute("DELETE FROM cart WHERE session_id = %s", (session_id,))
+    return statements + 1
+
+
+def checkout_set(cursor, user_id, session_id):
+    """
+    현재 /checkout 구현: 잠금 + INSERT ... SELECT 두 번 + DELETE
+    :return: 실행한 SQL 문 수
+    """
+    cursor.execute(
+        "SELECT COUNT(*) AS item_count FROM cart WHERE session_id = %s FOR UPDATE",
+        (session_id,)
+    )
+    if not cursor.fetchone()['item_count']:
+        return 1
+
+    cursor.execute("""
+        INSERT INTO orders (order_id, user_id, session_id, product_id, price, quantity, order_time)
+        SELECT UUID(), %s, c.session_id, c.product_id, c.price, c.quantity, NOW()
+        FROM cart c
+        JOIN products p ON c.product_id = p.id
+        WHERE c.session_id = %s
+    """, (user_id, session_id))
+    cursor.execute("""
+        INSERT INTO cart_logs (
+            cart_id, session_id, user_id, product_id,
+            old_quantity, new_quantity, price, event_type, event_time
+        )
+        SELECT c.cart_id, c.session_id, %s, c.product_id,
+               c.quantity, 0, c.price, 'CHECKED_OUT', NOW()
+        FROM cart c
+        JOIN products p ON c.product_id = p.id
+        WHERE c.session_id = %s
+    """, (user_id, session_id))
+    cursor.execute("DELETE FROM cart WHERE session_id = %s", (session_id,))
+    return 4
+
+
+VARIANTS = {
+    "loop": checkout_loop,
+    "set": checkout_set
+}
+
+#################################
+# 준비 / 정리
+#################################
+def prepare_cart(conn, product_ids, size):
+    """
+    임시 세션을 만들고 장바구니에 size개 항목을 넣음
+    :return: session_id
+    """
+    session_id = str(uuid.uuid4())
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO sessions (session_id, user_id) VALUES (%s, %s)",
+        (session_id, BENCH_USER_ID)
+    )
+    # 상품 수보다 큰 장바구니는 같은 상품을 여러 행으로 넣음 (cart에는 (session, product) 유일 제약이 없음)
+    cursor.executemany(
+        """
+        INSERT INTO cart (session_id, user_id, product_id, quantity, price, added_at)
+        SELECT %s, %s, id, %s, price, NOW() FROM products WHERE id = %s
+        """,
+        [
+            (session_id, BENCH_USER_ID, (i % 3) + 1, product_ids[i % len(product_ids)])
+            for i in range(size)
+        ]
+    )
+    conn.commit()
+    cursor.close()
+    return session_id
+
+
+def cleanup(conn, session_ids):
+    cursor = conn.cursor()
+    for session_id in session_ids:
+        cursor.execute("DELETE FROM orders WHERE session_id = %s", (session_id,))
+        cursor.execute("DELETE FROM cart_logs WHERE session_id = %s", (session_id,))
+        cursor.execute("DELETE FROM cart WHERE session_id = %s", (session_id,))
+        cursor.execute("DELETE FROM sessions WHERE session_id = %s", (session_id,))
+    conn.commit()
+    cursor.close()
+
+#################################
+# 측정
+#################################
+def run_variant(conn, variant, product_ids, size, rounds):
+    """
+    한 가지 구현을 size 크기 장바구니로 rounds번 실행
+    :return: 결과 dict (트랜잭션 시간 = 첫 SQL부터 commit까지, 즉 잠금 유지 시간)
+    """
+    checkout = VARIANTS[variant]
+    durations = []
+    statements = 0
+    session_ids = []
+    try:
+        for _ in range(rounds):
+            session_id = prepare_cart(conn, product_ids, size)
+            session_ids.append(session_id)
+
+            cursor = conn.cursor(dictionary=True)
+            start = time.perf_counter()
+            statements = checkout(cursor, BENCH_USER_ID, session_id)
+            conn.commit()
+            durations.append((time.perf_counter() - start) * 1000)
+            cursor.close()
+    finally:
+        cleanup(conn, session_ids)
+
+    durations.sort()
+    return {
+        "variant": variant,
+        "cart_size": size,
+        "rounds": rounds,
+        "statements": statements,
+        "p50_ms": round(statistics.median(durations), 3),
+        "p90_ms": round(durations[min(len(durations) - 1, int(len(durations) * 0.9))], 3),
+        "mean_ms": round(statistics.fmean(durations), 3),
+        "max_ms": round(durations[-1], 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare loop vs set-based /checkout")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="장바구니 크기 목록")
+    parser.add_argument("--rounds", type=int, default=20, help="크기별 반복 횟수")
+    parser.add_argument("--json", dest="json_path", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM products ORDER BY id")
+    product_ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    if not product_ids:
+        raise SystemExit("products 테이블이 비어 있습니다. DataBase.sh로 먼저 스키마를 만드세요.")
+
+    results = []
+    print(f"{'variant':<8}{'size':>6}{'stmts':>8}{'p50 ms':>10}{'p90 ms':>10}{'mean ms':>10}{'max ms':>10}")
+    for size in args.sizes:
+        for variant in VARIANTS:
+            result = run_variant(conn, variant, product_ids, size, args.rounds)
+            results.append(result)
+            print(f"{variant:<8}{size:>6}{result['statements']:>8}{result['p50_ms']:>10.2f}"
+                  f"{result['p90_ms']:>10.2f}{result['mean_ms']:>10.2f}{result['max_ms']:>10.2f}")
+
+    conn.close()
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+# bench_routes.py
+#
+# ApiServer.sh의 Flask 라우트 벤치마크 (VM / 관리형 MySQL 없이 로컬에서)
+# - local_app.py로 app.py를 꺼내 이 프로세스에 불러오고, DataBase.sh 스키마로 만든 일회용 DB에 연결
+#     --backend sqlite (기본): 임시 sqlite 파일
+#     --backend mysql: 로컬 MySQL(MYSQL_HOST 등)에 shopdb_bench_xxxx 데이터베이스를 만들고 끝나면 삭제
+# - 라우트마다 고정 동시성(--concurrency 스레드, 스레드마다 사용자 / 세션 하나)으로 Flask 테스트 클라이언트 요청을 보냄
+#   (HTTP 서버 / Nginx를 거치지 않으므로 app 코드 + DB 시간만 측정)
+# - 결과: 초당 요청 수, 지연 p50/p90/p99/max, 요청당 DB 쿼리 수 / DB 시간 / 행 수 (app.py의 X-DB-* 응답 헤더)
+# - --save-baseline으로 JSON 기준선을 저장하고, --baseline으로 비교해 회귀가 있으면 종료 코드 1
+#
+# 라우트는 아래 순서로 실행되고 DB 상태가 이어진다 (/cart/view는 /cart/add가 담은 장바구니, /checkout_history는 /checkout의 주문)
+# 사용 예: python3 bench_routes.py --requests 2000 --concurrency 8 --save-baseline baseline.json
+#          python3 bench_routes.py --requests 2000 --concurrency 8 --baseline baseline.json
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+
+import local_app
+
+JSON_HEADERS = {"Accept": "application/json"}
+
+# 검색어 (ProductSearchIndex 정확 / 접두 / 오타 / 다중 토큰 / 결과 없음 경로)
+SEARCH_TERMS = ["Bluetooth", "gaming", "gam", "nov", "Cofee", "coffee machine", "sneakers", "zzz"]
+
+# 요청별 DB 사용량 응답 헤더 (app.py add_db_stats_headers)
+DB_HEADERS = ("X-DB-Queries", "X-DB-Time-Ms", "X-DB-Rows", "X-DB-Acquire-Ms")
+
+# /checkout 한 번에 장바구니에 담는 상품 수 (측정 전 준비 단계)
+CHECKOUT_CART_SIZE = 3
+
+#################################
+# 라우트별 요청
+#################################
+class VirtualUser:
+    """
+    벤치 스레드 하나의 사용자 (users / sessions 행, 쿠키를 가진 테스트 클라이언트)
+    """
+    def __init__(self, app_module, user_id, product_ids, seed):
+        self.user_id = user_id
+        self.session_id = str(uuid.uuid4())
+        self.product_ids = product_ids
+        self.rng = random.Random(seed)
+
+        conn = app_module.get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO users (user_id, name, email, gender, age) VALUES (%s, %s, %s, %s, %s)",
+            (user_id, user_id, f"{user_id}@bench.local", "F", 30)
+        )
+        cursor.execute("INSERT INTO sessions (session_id, user_id) VALUES (%s, %s)", (self.session_id, user_id))
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+        self.client = app_module.app.test_client()
+        self.client.set_cookie("user_id", user_id)
+        self.client.set_cookie("session_id", self.session_id)
+
+    def product_id(self):
+        return self.rng.choice(self.product_ids)
+
+
+def get_products(user):
+    return user.client.get("/products", headers=JSON_HEADERS)
+
+
+def get_product(user):
+    return user.client.get("/product", query_string={"id": user.product_id()}, headers=JSON_HEADERS)
+
+
+def get_search(user):
+    return user.client.get("/search", query_string={"query": user.rng.choice(SEARCH_TERMS)}, headers=JSON_HEADERS)
+
+
+def post_cart_add(user):
+    return user.client.post("/cart/add", data={"id": user.product_id(), "quantity": 1})
+
+
+def get_cart_view(user):
+    return user.client.get("/cart/view", headers=JSON_HEADERS)
+
+
+def prepare_checkout(user):
+    for _ in range(CHECKOUT_CART_SIZE):
+        post_cart_add(user)
+
+
+def post_checkout(user):
+    return user.client.post("/checkout")
+
+
+def get_checkout_history(user):
+    return user.client.get("/checkout_history", headers=JSON_HEADERS)
+
+
+def post_add_review(user):
+    return user.client.post("/add_review", data={"product_id": user.product_id(),
+                                                 "rating": user.rng.randint(1, 5)})
+
+
+# 라우트 -> (측정할 요청, 요청마다 측정 전에 실행할 준비 작업 또는 None)
+ROUTES = {
+    "/products": (get_products, None),
+    "/product": (get_product, None),
+    "/search": (get_search, None),
+    "/cart/add": (post_cart_add, None),
+    "/cart/view": (get_cart_view, None),
+    "/checkout": (post_checkout, prepare_checkout),
+    "/checkout_history": (get_checkout_history, None),
+    "/add_review": (post_add_review, None),
+}
+
+#################################
+# 측정
+#################################
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def run_route(route, users, requests_per_user, warmup):
+    """
+    사용자(스레드)마다 requests_per_user번 요청을 보냄 (각 스레드 warmup번은 측정 제외)
+    :return: 결과 dict
+    """
+    request_fn, prepare_fn = ROUTES[route]
+    latencies = [[] for _ in users]
+    db_stats = [[] for _ in users]
+    errors = [0] * len(users)
+    barrier = threading.Barrier(len(users) + 1)
+
+    def worker(idx, user):
+        for _ in range(warmup):
+            if prepare_fn:
+                prepare_fn(user)
+            request_fn(user)
+        barrier.wait()
+        for _ in range(requests_per_user):
+            if prepare_fn:
+                prepare_fn(user)
+            start = time.perf_counter()
+            resp = request_fn(user)
+            latencies[idx].append((time.perf_counter() - start) * 1000)
+            db_stats[idx].append(tuple(float(resp.headers.get(header, 0)) for header in DB_HEADERS))
+            if resp.status_code >= 400:
+                errors[idx] += 1
+
+    threads = [threading.Thread(target=worker, args=(idx, user), name=f"bench-{idx}")
+               for idx, user in enumerate(users)]
+    for t in threads:
+        t.start()
+    # 모든 스레드가 예열을 마친 뒤 동시에 시작
+    barrier.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    durations = sorted(value for values in latencies for value in values)
+    db_rows = [row for rows in db_stats for row in rows]
+    queries, db_ms, rows, acquire_ms = (list(column) for column in zip(*db_rows)) if db_rows else ([], [], [], [])
+    return {
+        "route": route,
+        "requests": len(durations),
+        "errors": sum(errors),
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(durations) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(durations, 0.5), 3),
+        "p90_ms": round(percentile(durations, 0.9), 3),
+        "p99_ms": round(percentile(durations, 0.99), 3),
+        "max_ms": round(durations[-1], 3) if durations else 0.0,
+        "mean_ms": round(statistics.fmean(durations), 3) if durations else 0.0,
+        "queries_per_request": round(statistics.fmean(queries), 2) if queries else 0.0,
+        "max_queries": int(max(queries)) if queries else 0,
+        "db_ms_per_request": round(statistics.fmean(db_ms), 3) if db_ms else 0.0,
+        "rows_per_request": round(statistics.fmean(rows), 2) if rows else 0.0,
+        "acquire_ms_per_request": round(statistics.fmean(acquire_ms), 3) if acquire_ms else 0.0
+    }
+
+
+def run(backend="sqlite", routes=None, requests=1000, concurrency=8, warmup=5, seed=0):
+    """
+    일회용 DB를 만들어 라우트 벤치마크를 실행
+    :param requests: 라우트별 측정 요청 수 (concurrency로 나눠 스레드마다 같은 수)
+    :return: {"meta": {...}, "routes": {route: 결과}}
+    """
+    routes = routes or list(ROUTES)
+    tag = uuid.uuid4().hex[:8]
+    work_dir = tempfile.mkdtemp(prefix="bench_routes_")
+    if backend == "sqlite":
+        database = local_app.create_sqlite_db(os.path.join(work_dir, "shopdb.sqlite"))
+    else:
+        database = local_app.create_mysql_db(f"shopdb_bench_{tag}")
+
+    try:
+        # 풀이 동시 요청 스레드 수보다 작으면 풀 대기 시간까지 측정되므로 맞춰 늘림 (DB_POOL_SIZE로 직접 지정 가능)
+        pool_size = int(os.getenv("DB_POOL_SIZE") or max(concurrency, 8))
+        app_module = local_app.load_app(backend, database, app_dir=work_dir, DB_POOL_SIZE=str(pool_size))
+
+        product_ids = [product["id"] for product in app_module.catalog_cache.list_products()]
+        users = [VirtualUser(app_module, f"bench_{tag}_{i}", product_ids, seed * 1000 + i)
+                 for i in range(concurrency)]
+        requests_per_user = max(1, requests // concurrency)
+
+        results = {}
+        background_before = local_app.queries.total
+        for route in routes:
+            results[route] = run_route(route, users, requests_per_user, warmup)
+            print(format_row(results[route]), flush=True)
+
+        # 남은 지연 쓰기 / 검색 로그를 반영 (백그라운드 쿼리 수에 포함)
+        app_module.last_active_writer.flush()
+        app_module.search_log_writer.flush()
+        measured = sum(r["queries_per_request"] * r["requests"] for r in results.values())
+        meta = {
+            "backend": backend,
+            "concurrency": concurrency,
+            "requests_per_route": requests_per_user * concurrency,
+            "warmup_per_thread": warmup,
+            "db_pool_size": app_module.db_pool.size,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            # 준비 단계 + 백그라운드 쓰기 스레드가 실행한 쿼리 수 (측정한 요청 제외)
+            "other_queries": int(local_app.queries.total - background_before - measured)
+        }
+        return {"meta": meta, "routes": results}
+    finally:
+        if backend == "mysql":
+            local_app.drop_mysql_db(database)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+#################################
+# 기준선 비교
+#################################
+def compare(results, baseline, tolerance):
+    """
+    기준선 대비 회귀 목록
+    - rps가 tolerance 비율 이상 감소, p90이 tolerance 비율 이상 증가
+    - 요청당 쿼리 수 증가 / 오류 발생 (환경과 무관하므로 허용치 없음)
+    :return: [(라우트, 설명), ...]
+    """
+    regressions = []
+    for route, current in results["routes"].items():
+        base = baseline["routes"].get(route)
+        if base is None:
+            continue
+        if base["rps"] and current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append((route, f"rps {base['rps']} -> {current['rps']}"))
+        if base["p90_ms"] and current["p90_ms"] > base["p90_ms"] * (1 + tolerance):
+            regressions.append((route, f"p90 {base['p90_ms']}ms -> {current['p90_ms']}ms"))
+        if current["queries_per_request"] > base["queries_per_request"] + 0.01:
+            regressions.append((route, f"queries/request {base['queries_per_request']} -> "
+                                       f"{current['queries_per_request']}"))
+        if current["errors"] > base["errors"]:
+            regressions.append((route, f"errors {base['errors']} -> {current['errors']}"))
+    return regressions
+
+
+def format_row(result):
+    return (f"{result['route']:<20}{result['requests']:>8}{result['errors']:>7}{result['rps']:>10.1f}"
+            f"{result['p50_ms']:>9.2f}{result['p90_ms']:>9.2f}{result['p99_ms']:>9.2f}{result['max_ms']:>9.2f}"
+            f"{result['queries_per_request']:>9.2f}{result['db_ms_per_request']:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ApiServer.sh Flask routes against a throwaway local DB")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite",
+                        help="일회용 DB 종류 (mysql은 MYSQL_HOST 등의 로컬 MySQL)")
+    parser.add_argument("--routes", nargs="+", choices=list(ROUTES), help="측정할 라우트 (기본: 전체, 순서대로)")
+    parser.add_argument("--requests", type=int, default=1000, help="라우트별 측정 요청 수")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 스레드 수")
+    parser.add_argument("--warmup", type=int, default=5, help="스레드별 예열 요청 수 (측정 제외)")
+    parser.add_argument("--seed", type=int, default=0, help="상품 / 검색어 선택 난수 시드")
+    parser.add_argument("--save-baseline", metavar="PATH", help="결과를 기준선 JSON으로 저장")
+    parser.add_argument("--baseline", metavar="PATH", help="비교할 기준선 JSON (회귀가 있으면 종료 코드 1)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="rps / p90 허용 변화율 (기본 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    print(f"{'route':<20}{'reqs':>8}{'errs':>7}{'req/s':>10}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}"
+          f"{'max ms':>9}{'q/req':>9}{'db ms':>9}")
+    results = run(args.backend, args.routes, args.requests, args.concurrency, args.warmup, args.seed)
+    print(f"other queries (setup + background writers): {results['meta']['other_queries']}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in ("backend", "concurrency", "requests_per_route"):
+            if baseline["meta"].get(key) != results["meta"][key]:
+                print(f"warning: baseline {key}={baseline['meta'].get(key)} differs from this run "
+                      f"({results['meta'][key]})")
+        regressions = compare(results, baseline, args.tolerance)
+        for route, message in regressions:
+            print(f"REGRESSION {route}: {message}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+# local_app.py
+#
+# ApiServer.sh에 내장된 app.py를 VM 배포 없이 로컬에서 실행하기 위한 도구
+# - ApiServer.sh의 app.py heredoc을 셸과 같은 방식으로 변수 치환해서 꺼냄 (ApiServer.sh의 export 기본값 + 환경변수)
+# - DataBase.sh의 DDL / 초기 데이터로 일회용 DB를 만듦
+#     sqlite: 파일 하나 (python 표준 sqlite3, MySQL 전용 구문은 CompatConnection이 변환)
+#     mysql:  로컬 MySQL에 shopdb_local_xxxx 같은 임시 데이터베이스 (mysql-connector-python 필요)
+# - app.py는 DB_CONNECT 환경변수로 이 모듈의 sqlite_connect / mysql_connect를 커넥션 생성 함수로 사용
+#   두 함수 모두 cursor.execute 횟수를 queries에 집계 (요청당 값은 app.py의 X-DB-* 응답 헤더)
+#
+# 사용 예
+#   python3 local_app.py --sqlite /tmp/shopdb.sqlite --port 8080        # 로컬 개발 서버
+#   MYSQL_HOST=127.0.0.1 python3 local_app.py --mysql --port 8080      # 로컬 MySQL의 임시 데이터베이스
+#   DB_CONNECT=local_app:sqlite_connect MYSQL_DB=/tmp/shopdb.sqlite METRICS_DIR=/tmp/metrics gunicorn -w 3 app:app   # (app.py를 꺼낸 디렉터리에서)
+#
+# sqlite 모드의 차이: 외래 키 미검사, 쓰기는 DB 전체 잠금(WAL + busy_timeout), NOW()는 로컬 시각 문자열
+
+import argparse
+import datetime
+import functools
+import importlib
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import uuid
+from decimal import Decimal
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+API_SERVER_SH = os.path.join(BASE_DIR, "ApiServer.sh")
+DATABASE_SH = os.path.join(BASE_DIR, "DataBase.sh")
+
+# 로컬 MySQL 접속 정보 (bench_checkout.py와 같은 환경변수)
+MYSQL_CONFIG = {
+    'user': os.getenv("MYSQL_USER", "admin"),
+    'password': os.getenv("MYSQL_PASS", "admin1234"),
+    'host': os.getenv("MYSQL_HOST", "127.0.0.1"),
+    'port': int(os.getenv("MYSQL_PORT", "3306")),
+    'ssl_disabled': True
+}
+
+#################################
+# 셸 스크립트에서 app.py / DDL 꺼내기
+#################################
+def heredoc(text, opener):
+    """
+    opener 줄 다음부터 종료 표식 줄 전까지의 본문
+    :param opener: heredoc 시작 줄 (예: "cat > $APP_DIR/app.py <<EOL")
+    """
+    marker = re.search(r"<<'?(\w+)'?\s*$", opener).group(1)
+    start = text.index(opener + "\n") + len(opener) + 1
+    end = text.index("\n" + marker + "\n", start - 1)
+    return text[start:end + 1]
+
+
+def script_defaults(text):
+    """
+    ApiServer.sh 상단의 export 값 (export X="${X:-기본값}" 이면 기본값, export X="값" 이면 값)
+    """
+    defaults = {}
+    for name, value in re.findall(r'^export (\w+)="([^"]*)"', text, re.MULTILINE):
+        fallback = re.fullmatch(r"\$\{\w+:-(.*)\}", value)
+        defaults[name] = fallback.group(1) if fallback else value
+    return defaults
+
+
+def render_app(env=None):
+    """
+    ApiServer.sh가 쓰는 것과 같은 app.py 소스 (따옴표 없는 heredoc이므로 ${VAR}를 치환)
+    :param env: 치환 값 (없으면 os.environ, 둘 다 없으면 ApiServer.sh의 기본값)
+    """
+    with open(API_SERVER_SH, encoding="utf-8") as f:
+        text = f.read()
+    values = dict(script_defaults(text), **(os.environ if env is None else env))
+    body = heredoc(text, "cat > $APP_DIR/app.py <<EOL")
+    return re.sub(r"\$\{(\w+)\}", lambda m: values.get(m.group(1), ""), body)
+
+
+def write_app(out_dir, env=None):
+    """
+    out_dir/app.py로 저장 (gunicorn app:app 으로 띄울 수 있게)
+    :return: 저장한 경로
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, "app.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(render_app(env))
+    return path
+
+
+def schema_sql():
+    """
+    DataBase.sh의 초기 스키마 / 데이터 SQL
+    """
+    with open(DATABASE_SH, encoding="utf-8") as f:
+        return heredoc(f.read(), "SQL_COMMANDS=$(cat <<'EOF'")
+
+
+def split_statements(sql):
+    return [stmt.strip() for stmt in sql.split(";\n") if stmt.strip()]
+
+#################################
+# 쿼리 수 집계
+#################################
+class QueryCounter:
+    """
+    cursor.execute / executemany 호출 수 (요청 처리 + 백그라운드 쓰기 스레드 + 준비 작업 전체)
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def add(self):
+        with self._lock:
+            self.total += 1
+
+
+queries = QueryCounter()
+
+#################################
+# sqlite 호환 커넥션
+#################################
+# MySQL 전용 구문 -> sqlite
+SQL_REWRITES = [
+    (re.compile(r"NOW\(\)\s*-\s*INTERVAL\s+%s\s+SECOND", re.I), "datetime('now', 'localtime', -%s || ' seconds')"),
+    (re.compile(r"\s+FOR\s+UPDATE\b", re.I), ""),
+    (re.compile(r"ON\s+DUPLICATE\s+KEY\s+UPDATE", re.I), "ON CONFLICT DO UPDATE SET"),
+    (re.compile(r"\bVALUES\((\w+)\)", re.I), r"excluded.\1"),
+    (re.compile(r"%s"), "?"),
+]
+
+# DataBase.sh DDL -> sqlite
+DDL_REWRITES = [
+    (re.compile(r"\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY", re.I), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bENUM\([^)]*\)", re.I), "TEXT"),
+    (re.compile(r"\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP", re.I), ""),
+    (re.compile(r"DEFAULT\s+CURRENT_TIMESTAMP", re.I), "DEFAULT (datetime('now', 'localtime'))"),
+]
+
+# sqlite 스키마에서 건너뛰는 문장 (데이터베이스 생성 / 선택, 완료 메시지)
+SKIPPED_DDL = re.compile(r"^(DROP DATABASE|CREATE DATABASE|USE|SELECT)\b", re.I)
+
+
+@functools.lru_cache(maxsize=512)
+def translate(sql):
+    for pattern, replacement in SQL_REWRITES:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+# DECIMAL은 문자열로 넣고 Decimal로 읽음, DATETIME은 datetime으로 읽음 (mysql.connector와 같은 타입)
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter("DECIMAL", lambda value: Decimal(value.decode()))
+sqlite3.register_converter("DATETIME", lambda value: datetime.datetime.fromisoformat(value.decode()))
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class CompatCursor:
+    """
+    mysql.connector 커서처럼 쓰는 sqlite 커서 (%s 자리표시자, dictionary=True)
+    """
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        if dictionary:
+            self._cursor.row_factory = _dict_row
+
+    def execute(self, sql, params=()):
+        queries.add()
+        self._cursor.execute(translate(sql), params or ())
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        queries.add()
+        self._cursor.executemany(translate(sql), seq_of_params)
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        # rowcount, lastrowid, description, close ...
+        return getattr(self._cursor, name)
+
+
+class CompatConnection:
+    """
+    DBConnectionPool이 쓰는 mysql.connector 커넥션 메서드(cursor, commit, rollback, ping, in_transaction, close)를 sqlite로 제공
+    """
+    def __init__(self, path, timeout=30):
+        # 커넥션은 풀을 거쳐 여러 요청 스레드가 번갈아 사용
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False,
+                                     detect_types=sqlite3.PARSE_DECLTYPES)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.create_function("NOW", 0, _now)
+        self._conn.create_function("UUID", 0, lambda: str(uuid.uuid4()))
+        self._conn.create_function("GREATEST", -1, lambda *args: max(args))
+
+    def cursor(self, dictionary=False, **kwargs):
+        return CompatCursor(self._conn.cursor(), dictionary=dictionary)
+
+    def ping(self, reconnect=False, **kwargs):
+        self._conn.execute("SELECT 1")
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def sqlite_connect(database, **kwargs):
+    """
+    app.py DB_CONNECT용: DB_CONFIG의 database(MYSQL_DB)를 sqlite 파일 경로로 사용, 나머지 접속 정보는 무시
+    """
+    return CompatConnection(database)
+
+
+def sqlite_schema():
+    """
+    DataBase.sh SQL을 sqlite 문장 목록으로 변환
+    """
+    statements = []
+    for stmt in split_statements(schema_sql()):
+        if SKIPPED_DDL.match(stmt):
+            continue
+        for pattern, replacement in DDL_REWRITES:
+            stmt = pattern.sub(replacement, stmt)
+        statements.append(stmt)
+    return statements
+
+
+def create_sqlite_db(path):
+    """
+    path에 DataBase.sh 스키마 / 초기 데이터로 새 sqlite DB를 만듦 (있으면 지우고 다시 만듦)
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    conn = sqlite3.connect(path)
+    conn.executescript(";\n".join(sqlite_schema()) + ";")
+    conn.close()
+    return path
+
+#################################
+# 로컬 MySQL
+#################################
+class CountingConnection:
+    """
+    mysql.connector 커넥션 래퍼 (커서 execute 횟수를 queries에 집계)
+    """
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class CountingCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        queries.add()
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        queries.add()
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def mysql_connect(**db_config):
+    """
+    app.py DB_CONNECT용: mysql.connector.connect + 쿼리 수 집계
+    """
+    import mysql.connector
+    return CountingConnection(mysql.connector.connect(**db_config))
+
+
+def create_mysql_db(name):
+    """
+    로컬 MySQL에 DataBase.sh 스키마로 name 데이터베이스를 만듦 (DataBase.sh의 shopdb 대신 name 사용)
+    """
+    import mysql.connector
+    conn = mysql.connector.connect(**MYSQL_CONFIG)
+    cursor = conn.cursor()
+    for stmt in split_statements(schema_sql()):
+        cursor.execute(re.sub(r"\bshopdb\b", name, stmt))
+        if cursor.with_rows:
+            cursor.fetchall()
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return name
+
+
+def drop_mysql_db(name):
+    import mysql.connector
+    conn = mysql.connector.connect(**MYSQL_CONFIG)
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS {name}")
+    cursor.close()
+    conn.close()
+
+#################################
+# app 불러오기
+#################################
+def app_env(backend, database):
+    """
+    app.py가 로컬 DB를 쓰도록 하는 환경변수
+    :param backend: "sqlite" 또는 "mysql"
+    :param database: sqlite 파일 경로 또는 MySQL 데이터베이스 이름
+    """
+    # /metrics 워커 합산 디렉터리는 지정한 경우만 (기본 /run/flask_app_metrics에 이전 실행 값이 섞이지 않도록)
+    env = {"DB_CONNECT": f"local_app:{backend}_connect", "MYSQL_DB": database,
+           "METRICS_DIR": os.getenv("METRICS_DIR", "")}
+    if backend == "mysql":
+        env.update(MYSQL_USER=MYSQL_CONFIG['user'], MYSQL_PASS=MYSQL_CONFIG['password'],
+                   MYSQL_HOST=MYSQL_CONFIG['host'], MYSQL_PORT=str(MYSQL_CONFIG['port']))
+    return env
+
+
+def load_app(backend, database, app_dir=None, **settings):
+    """
+    app.py를 꺼내 이 프로세스에 불러옴 (불러오는 시점에 커넥션 풀 / 캐시 / 백그라운드 쓰기 스레드가 만들어짐)
+    :param settings: app.py에 치환할 ApiServer.sh 설정 (예: DB_POOL_SIZE="16")
+    :return: app 모듈 (app.app이 Flask 객체)
+    """
+    os.environ.update(app_env(backend, database))
+    app_dir = app_dir or tempfile.mkdtemp(prefix="flask_app_")
+    # Push 메시지 파일은 지정하지 않으면 app.py 옆에 (기본 /var/lib/flask_app 대신)
+    os.environ.setdefault("PUSH_STORE_PATH", os.path.join(app_dir, "push_messages.db"))
+    write_app(app_dir, env=dict(os.environ, **settings))
+    # app.py의 DB_CONNECT가 "local_app"을 불러올 때 이 모듈을 다시 만들지 않도록 등록 (python3 local_app.py 실행 시)
+    sys.modules.setdefault("local_app", sys.modules[__name__])
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    sys.path.insert(0, app_dir)
+    try:
+        sys.modules.pop("app", None)
+        return importlib.import_module("app")
+    finally:
+        sys.path.remove(app_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ApiServer.sh Flask app against a throwaway local database")
+    backend = parser.add_mutually_exclusive_group(required=True)
+    backend.add_argument("--sqlite", metavar="PATH", help="sqlite 파일로 실행 (매번 새로 만듦)")
+    backend.add_argument("--mysql", action="store_true", help="로컬 MySQL(MYSQL_HOST 등)에 임시 데이터베이스를 만들어 실행")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--keep", action="store_true", help="종료 후 MySQL 임시 데이터베이스를 지우지 않음")
+    parser.add_argument("--write-app", metavar="DIR", help="app.py만 DIR에 꺼내고 종료")
+    args = parser.parse_args()
+
+    if args.write_app:
+        print(write_app(args.write_app))
+        return
+
+    if args.sqlite:
+        app_module = load_app("sqlite", create_sqlite_db(args.sqlite))
+        args.keep = True
+    else:
+        name = create_mysql_db(f"shopdb_local_{uuid.uuid4().hex[:8]}")
+        print(f"Created database {name}")
+        app_module = load_app("mysql", name)
+    try:
+        app_module.app.run(host="127.0.0.1", port=args.port, threaded=True)
+    finally:
+        if not args.keep:
+            drop_mysql_db(app_module.DB_CONFIG['database'])
+
+
+if __name__ == "__main__":
+    main()
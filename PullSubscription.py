@@ -1,10 +1,17 @@
 # pull_subscription.py
 
 import requests
+import argparse
 import base64
 import json
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+from message_sink import FSYNC_POLICIES, SinkStage, create_sink
+# 트래픽 생성기 이벤트 스키마 (TrafficGenerator.py와 공용)
+import event_schema
 
 # config.py의 모든 변수 임포트
 from config import *
@@ -104,8 +111,10 @@ def ack_messages(subscription_name, ack_ids, retries=3):
             logging.error(f"Exception while acknowledging messages (Attempt {attempt}): {e}")
             print(f"Exception occurred while acknowledging messages (Attempt {attempt}): {e}")
         
-        # 재시도 간 대기 시간 (Exponential Backoff)
-        time.sleep(2 ** attempt)
+        # 재시도 간 대기 시간 (Exponential Backoff, 최대 2초)
+        # 대기가 길어지면 ack deadline이 지나 메시지가 다시 배달되므로 짧게 제한하고, 마지막 시도 후에는 기다리지 않음
+        if attempt < retries:
+            time.sleep(min(0.5 * 2 ** (attempt - 1), 2))
     
     logging.error(f"All {retries} attempts to acknowledge messages failed.")
     print(f"All {retries} attempts to acknowledge messages failed.")
@@ -116,15 +125,21 @@ def ack_messages(subscription_name, ack_ids, retries=3):
 def decode_message(message):
     """
     Pub/Sub 메시지 데이터를 디코딩하는 함수
+    event_schema 형식(encoding 속성이 있는 메시지)이면 data는 이벤트 dict, 아니면 문자열
     :param message: PubsubMessage 객체
     :return: 디코딩된 메시지 데이터와 속성
     """
+    attributes = message.get('attributes', {})
+    encoding = attributes.get('encoding')
     try:
-        data = base64.b64decode(message.get('data', '')).decode('utf-8')
+        raw = base64.b64decode(message.get('data', ''))
+        if encoding:
+            data = event_schema.decode_event(raw, encoding).to_dict()
+        else:
+            data = raw.decode('utf-8')
     except Exception as e:
         data = f"Failed to decode data: {e}"
     
-    attributes = message.get('attributes', {})
     message_id = message.get('messageId', 'N/A')
     publish_time = message.get('publishTime', 'N/A')
     
@@ -138,12 +153,13 @@ def decode_message(message):
 #################################
 # 메시지 Pull 및 Ack 처리 함수
 #################################
-def receive_and_ack_messages(subscription_name, max_messages=10, wait_time="3s"):
+def receive_and_ack_messages(subscription_name, max_messages=10, wait_time="3s", sink_stage=None):
     """
     메시지를 Pull하고, 콘솔에 출력한 후 Ack 처리하는 함수
     :param subscription_name: Pull Subscription 이름
     :param max_messages: 한 번에 Pull할 메시지 수
     :param wait_time: 메시지 fetch 대기 시간
+    :param sink_stage: 있으면 메시지를 싱크에 넘기고, Ack은 싱크가 기록 완료를 알린 뒤 SinkStage가 보냄
     """
     received_messages = pull_messages(subscription_name, max_messages, wait_time)
     
@@ -165,24 +181,549 @@ def receive_and_ack_messages(subscription_name, max_messages=10, wait_time="3s")
         print(f"  Publish Time: {decoded['publish_time']}")
         print("-" * 40)
         
-        ack_ids.append(ack_id)
+        if sink_stage is not None:
+            sink_stage.put(decoded, ack_id)
+        else:
+            ack_ids.append(ack_id)
     
     # Ack 처리
     ack_messages(subscription_name, ack_ids)
 
+#################################
+# 스트리밍 소비자 (연속 Pull + 워커 풀 + 비동기 배치 Ack)
+#################################
+# Pull 요청 하나로 받을 수 있는 최대 메시지 수 (서비스 제한)
+MAX_PULL_MESSAGES = 100
+
+def subscription_url(subscription_name, action):
+    """
+    :param action: "pull" / "acknowledge" 등
+    """
+    return f"{PUBSUB_ENDPOINT_URL}/v1/domains/{PUBSUB_DOMAIN_ID}/projects/{PUBSUB_PROJECT_ID}/subscriptions/{subscription_name}/{action}"
+
+def auth_headers():
+    return {
+        "Credential-ID": PUBSUB_CREDENTIAL_ID,
+        "Credential-Secret": PUBSUB_CREDENTIAL_SECRET,
+        "Content-Type": "application/json"
+    }
+
+def log_message(decoded):
+    """
+    스트리밍 모드 기본 처리 함수: 메시지 한 줄을 로그에 남김
+    """
+    logging.info(f"Message {decoded['message_id']} attributes={decoded['attributes']} data={decoded['data']}")
+
+def print_message(decoded):
+    """
+    기존 main()과 같은 형식으로 콘솔에 출력
+    """
+    print(f"Message ID: {decoded['message_id']}")
+    print(f"  Data: {decoded['data']}")
+    print(f"  Attributes: {decoded['attributes']}")
+    print(f"  Publish Time: {decoded['publish_time']}")
+    print("-" * 40)
+
+
+def received_size(received_msg):
+    """
+    Pull 응답 메시지 하나의 대략적인 크기 (흐름 제어용 바이트 수)
+    """
+    message = received_msg.get('message', {})
+    size = len(message.get('data', ''))
+    for key, value in message.get('attributes', {}).items():
+        size += len(key) + len(str(value))
+    return size
+
+
+class AckBatcher:
+    """
+    처리 끝난 메시지의 ackId를 모아 별도 스레드에서 한 번에 Ack / Nack
+    (max_batch개가 모이거나 interval초가 지나면 전송, 처리 스레드는 기다리지 않음)
+    - Nack은 ackDeadlineSeconds=0으로 modifyAckDeadline을 보내 바로 재전송되게 함
+    """
+    def __init__(self, subscription_name, max_batch=MAX_PULL_MESSAGES, interval=0.1, retries=3):
+        self.url = subscription_url(subscription_name, "acknowledge")
+        self.modify_url = subscription_url(subscription_name, "modifyAckDeadline")
+        self.max_batch = max_batch
+        self.interval = interval
+        self.retries = retries
+        self._ack_ids = []
+        self._nack_ids = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._session = requests.Session()
+        self.counters = {"acked": 0, "ack_failed": 0, "ack_requests": 0, "nacked": 0, "nack_failed": 0}
+        self._thread = threading.Thread(target=self._run, name="ack-batcher", daemon=True)
+        self._thread.start()
+
+    def ack(self, ack_id):
+        with self._cond:
+            self._ack_ids.append(ack_id)
+            if len(self._ack_ids) >= self.max_batch:
+                self._cond.notify()
+
+    def nack(self, ack_id):
+        with self._cond:
+            self._nack_ids.append(ack_id)
+            if len(self._nack_ids) >= self.max_batch:
+                self._cond.notify()
+
+    def close(self, timeout=None):
+        # 남은 ackId를 보내고 스레드 종료
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        self._session.close()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # max_batch개가 모이거나 interval초가 지나면 그때까지 모인 만큼 전송
+                self._cond.wait_for(lambda: len(self._ack_ids) >= self.max_batch
+                                    or len(self._nack_ids) >= self.max_batch or self._closed, self.interval)
+                batch = self._ack_ids[:self.max_batch]
+                del self._ack_ids[:self.max_batch]
+                nack_batch = self._nack_ids[:self.max_batch]
+                del self._nack_ids[:self.max_batch]
+                done = self._closed and not self._ack_ids and not self._nack_ids
+            if batch:
+                self._send(batch)
+            if nack_batch:
+                self._send_nack(nack_batch)
+            if done:
+                return
+
+    def _post(self, url, payload):
+        """
+        짧은 백오프로 재시도 (재시도 대기가 ack deadline을 넘지 않도록 0.1s, 0.2s ...)
+        :return: 성공한 응답, 모두 실패하면 None
+        """
+        for attempt in range(self.retries):
+            if attempt:
+                time.sleep(0.1 * (2 ** (attempt - 1)))
+            try:
+                response = self._session.post(url, headers=auth_headers(), data=payload)
+                self.counters["ack_requests"] += 1
+                if response.status_code in [200, 201]:
+                    return response
+                logging.error(f"Failed to call {url.rsplit('/', 1)[-1]}. Status Code: {response.status_code}, Response: {response.text}")
+            except Exception as e:
+                logging.error(f"Exception while calling {url.rsplit('/', 1)[-1]} (Attempt {attempt + 1}): {e}")
+        return None
+
+    def _send(self, ack_ids):
+        response = self._post(self.url, json.dumps({"ackIds": ack_ids}))
+        if response is None:
+            # Ack 못 한 메시지는 ack deadline 이후 재전송됨
+            self.counters["ack_failed"] += len(ack_ids)
+            return
+        failures = response.json().get('failure', [])
+        for failure in failures:
+            logging.error(f"Failed to ack message with ackID: {failure.get('ackID')}, Error: {failure.get('error', {})}")
+        self.counters["acked"] += len(ack_ids) - len(failures)
+        self.counters["ack_failed"] += len(failures)
+
+    def _send_nack(self, ack_ids):
+        response = self._post(self.modify_url, json.dumps({"ackIds": ack_ids, "ackDeadlineSeconds": 0}))
+        # Nack이 실패해도 ack deadline이 지나면 재전송되므로 세기만 함
+        self.counters["nacked" if response is not None else "nack_failed"] += len(ack_ids)
+
+
+class LeaseManager:
+    """
+    처리 중인 메시지의 ack deadline을 별도 스레드에서 주기적으로 연장
+    - 남은 시간이 ack_deadline의 절반 아래로 내려간 lease를 모아 modifyAckDeadline 한 번으로 연장
+    - 처리 시간이 느려져도 deadline이 지나 같은 메시지가 다시 배달되지 않게 함
+    - Pull 후 max_lease초가 지난 메시지는 더 연장하지 않음 (멈춘 핸들러가 메시지를 영원히 붙잡지 않도록)
+    """
+    def __init__(self, subscription_name, ack_deadline=10, max_lease=600, max_batch=MAX_PULL_MESSAGES):
+        """
+        :param ack_deadline: 연장할 때마다 새로 잡는 deadline (초, Subscription의 ackDeadlineSeconds와 맞춤)
+        :param max_lease: 메시지 하나를 연장해 줄 최대 시간 (초)
+        """
+        self.url = subscription_url(subscription_name, "modifyAckDeadline")
+        self.ack_deadline = ack_deadline
+        self.max_lease = max_lease
+        self.max_batch = max_batch
+        # deadline 절반이 지나기 전에 한 번은 확인하도록 주기를 잡음
+        self.tick = max(ack_deadline / 4, 0.1)
+        # ackId -> [Pull 시각, deadline 예상 시각]
+        self._leases = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._session = requests.Session()
+        self.counters = {"extended": 0, "extend_failed": 0, "extend_requests": 0, "lease_expired": 0}
+        self._thread = threading.Thread(target=self._run, name="lease-manager", daemon=True)
+        self._thread.start()
+
+    def add(self, ack_ids):
+        now = time.monotonic()
+        with self._lock:
+            for ack_id in ack_ids:
+                self._leases[ack_id] = [now, now + self.ack_deadline]
+
+    def remove(self, ack_id):
+        with self._lock:
+            self._leases.pop(ack_id, None)
+
+    def leased(self):
+        with self._lock:
+            return len(self._leases)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self._session.close()
+
+    def _run(self):
+        while not self._stop.wait(self.tick):
+            now = time.monotonic()
+            due = []
+            with self._lock:
+                for ack_id, lease in list(self._leases.items()):
+                    if now - lease[0] >= self.max_lease:
+                        # 연장을 멈추면 deadline 이후 재전송됨
+                        del self._leases[ack_id]
+                        self.counters["lease_expired"] += 1
+                    elif lease[1] - now <= self.ack_deadline / 2:
+                        due.append(ack_id)
+                        lease[1] = now + self.ack_deadline
+            for i in range(0, len(due), self.max_batch):
+                self._extend(due[i:i + self.max_batch])
+
+    def _extend(self, ack_ids):
+        payload = json.dumps({"ackIds": ack_ids, "ackDeadlineSeconds": self.ack_deadline})
+        try:
+            response = self._session.post(self.url, headers=auth_headers(), data=payload)
+            self.counters["extend_requests"] += 1
+            if response.status_code in [200, 201]:
+                self.counters["extended"] += len(ack_ids)
+                return
+            logging.error(f"Failed to extend ack deadline. Status Code: {response.status_code}, Response: {response.text}")
+        except Exception as e:
+            logging.error(f"Exception while extending ack deadline: {e}")
+        # 다음 주기에 다시 시도하도록 deadline 예상 시각을 되돌림
+        self.counters["extend_failed"] += len(ack_ids)
+        with self._lock:
+            for ack_id in ack_ids:
+                lease = self._leases.get(ack_id)
+                if lease:
+                    lease[1] = time.monotonic()
+
+
+class StreamingConsumer:
+    """
+    여러 Pull 루프가 쉬지 않고 메시지를 받아 워커 풀에 넘기고, 처리 끝난 메시지는 AckBatcher가 모아서 Ack
+    - Pull 크기(maxMessages)는 루프마다 조절: 꽉 차서 오면 2배(최대 100), 절반도 안 차면 절반
+    - 흐름 제어: 처리 중이거나 대기 중인 메시지가 max_outstanding개 또는 max_outstanding_bytes를 넘으면 Pull을 멈춤
+    - 처리 중인 메시지는 LeaseManager가 ack deadline을 연장, 핸들러가 실패한 메시지는 Nack (바로 재전송)
+    - sink가 있으면 처리한 메시지를 SinkStage로 넘기고, 싱크가 기록 완료를 알린 뒤에 Ack
+      (그때까지 lease 연장과 흐름 제어 카운트를 유지, 쓰기에 실패하면 Nack)
+    """
+    def __init__(self, subscription_name, handler=log_message, pullers=4, workers=8,
+                 wait_time="1s", max_outstanding=1000, max_outstanding_bytes=100 * 1024 * 1024,
+                 ack_deadline=10, max_lease=600, report_interval=10,
+                 sink=None, sink_max_records=1000, sink_flush_interval=1.0):
+        """
+        :param handler: 디코딩된 메시지(dict)를 처리하는 함수, 예외 없이 끝나면 Ack, 예외가 나면 Nack (None이면 건너뜀)
+        :param pullers: 동시에 도는 Pull 루프 수
+        :param workers: 메시지 처리 스레드 수
+        :param wait_time: Pull 요청의 waitTime (메시지가 없을 때 서버에서 기다리는 시간)
+        :param max_outstanding: Pull 했지만 아직 처리가 끝나지 않은 메시지 상한
+        :param max_outstanding_bytes: Pull 했지만 아직 처리가 끝나지 않은 메시지 크기 합 상한
+        :param ack_deadline: Subscription의 ackDeadlineSeconds (lease 연장 단위)
+        :param max_lease: 메시지 하나의 ack deadline을 연장해 줄 최대 시간 (초)
+        :param report_interval: 처리율(drain rate) 리포트 간격 (초, 0이면 끔)
+        :param sink: message_sink.RotatingFileSink (create_sink()로 생성), 없으면 처리 후 바로 Ack
+        :param sink_max_records: 싱크에 한 번에 쓰는 최대 메시지 수
+        :param sink_flush_interval: 메시지가 싱크에 쓰이기 전 기다리는 최대 시간 (초)
+        """
+        self.subscription_name = subscription_name
+        self.handler = handler
+        self.pullers = pullers
+        self.wait_time = wait_time
+        self.max_outstanding = max_outstanding
+        self.max_outstanding_bytes = max_outstanding_bytes
+        self.report_interval = report_interval
+        self.pull_url = subscription_url(subscription_name, "pull")
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="consumer-worker")
+        self._acker = AckBatcher(subscription_name)
+        self._leases = LeaseManager(subscription_name, ack_deadline=ack_deadline, max_lease=max_lease)
+        self._stop = threading.Event()
+        self._outstanding = 0
+        self._outstanding_bytes = 0
+        # 싱크 기록 완료를 기다리는 메시지의 크기 (흐름 제어 해제용)
+        self._awaiting_sink = {}
+        self._cond = threading.Condition()
+        self._threads = []
+        self.counters = {"pull_requests": 0, "empty_pulls": 0, "pulled": 0, "processed": 0, "handler_errors": 0,
+                         "flow_paused": 0}
+        self.started_at = None
+        self._sink_stage = None
+        if sink is not None:
+            # Parquet / fsync="rotate"는 파일을 닫아야 Ack 할 수 있으므로, 보류가 흐름 제어 상한의 절반이나
+            # lease 연장 한도의 절반에 이르면 교체 주기를 기다리지 않고 파일을 닫음
+            self._sink_stage = SinkStage(sink, self._on_durable, on_failed=self._on_sink_failed,
+                                         max_records=sink_max_records, flush_interval=sink_flush_interval,
+                                         max_uncommitted=max(max_outstanding // 2, 1),
+                                         max_uncommitted_age=max_lease / 2)
+
+    #################################
+    # Pull 루프
+    #################################
+    def _pull(self, session, max_messages):
+        payload = json.dumps({"maxMessages": max_messages, "waitTime": self.wait_time})
+        try:
+            response = session.post(self.pull_url, headers=auth_headers(), data=payload)
+        except Exception as e:
+            logging.error(f"Exception while pulling messages: {e}")
+            return None
+        if response.status_code not in [200, 201]:
+            logging.error(f"Failed to pull messages. Status Code: {response.status_code}, Response: {response.text}")
+            return None
+        return response.json().get('receivedMessages', [])
+
+    def _flow_blocked(self):
+        return (self._outstanding >= self.max_outstanding
+                or self._outstanding_bytes >= self.max_outstanding_bytes)
+
+    def _pull_loop(self):
+        session = requests.Session()
+        max_messages = 10
+        backoff = 0.1
+        while not self._stop.is_set():
+            # 처리 대기 중인 메시지 수 / 크기가 상한이면 자리가 날 때까지 Pull을 멈춤
+            with self._cond:
+                if self._flow_blocked():
+                    self.counters["flow_paused"] += 1
+                while self._flow_blocked() and not self._stop.is_set():
+                    self._cond.wait(0.5)
+                request_size = min(max_messages, self.max_outstanding - self._outstanding)
+            if self._stop.is_set():
+                break
+            if request_size <= 0:
+                continue
+
+            received = self._pull(session, request_size)
+            if received is None:
+                # 오류일 때만 잠깐 쉬었다 재시도
+                with self._cond:
+                    self.counters["pull_requests"] += 1
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 5)
+                continue
+            backoff = 0.1
+
+            if len(received) >= request_size:
+                max_messages = min(max_messages * 2, MAX_PULL_MESSAGES)
+            elif len(received) < request_size // 2:
+                max_messages = max(max_messages // 2, 1)
+
+            # 워커에 넘기기 전에 lease부터 등록 (큐에서 기다리는 동안에도 deadline 연장)
+            self._leases.add([received_msg.get('ackId') for received_msg in received])
+            sizes = [received_size(received_msg) for received_msg in received]
+            with self._cond:
+                self._outstanding += len(received)
+                self._outstanding_bytes += sum(sizes)
+                self.counters["pull_requests"] += 1
+                self.counters["pulled"] += len(received)
+                if not received:
+                    self.counters["empty_pulls"] += 1
+            for received_msg, size in zip(received, sizes):
+                self._executor.submit(self._process, received_msg, size)
+        session.close()
+
+    def _process(self, received_msg, size):
+        ack_id = received_msg.get('ackId')
+        try:
+            decoded = decode_message(received_msg.get('message', {}))
+            if self.handler is not None:
+                self.handler(decoded)
+            if self._sink_stage is not None:
+                # Ack / lease 해제 / 흐름 제어 해제는 싱크 기록 완료 후 _on_durable()에서
+                with self._cond:
+                    self._awaiting_sink[ack_id] = size
+                    self.counters["processed"] += 1
+                self._sink_stage.put(decoded, ack_id)
+                return
+            self._acker.ack(ack_id)
+            result = "processed"
+        except Exception as e:
+            # 실패한 메시지는 deadline을 기다리지 않고 Nack 해서 바로 재전송 받음
+            self._acker.nack(ack_id)
+            result = "handler_errors"
+            logging.error(f"Handler failed for message {received_msg.get('message', {}).get('messageId')}: {e}")
+        self._release([ack_id], size)
+        with self._cond:
+            self.counters[result] += 1
+
+    def _on_durable(self, ack_ids):
+        """
+        SinkStage 콜백: 기록이 끝난 메시지를 Ack
+        """
+        for ack_id in ack_ids:
+            self._acker.ack(ack_id)
+        with self._cond:
+            size = sum(self._awaiting_sink.pop(ack_id, 0) for ack_id in ack_ids)
+        self._release(ack_ids, size)
+
+    def _on_sink_failed(self, ack_ids):
+        """
+        SinkStage 콜백: 기록하지 못한 메시지를 Nack 해서 바로 재전송 받고, lease / 흐름 제어 카운트를 해제
+        """
+        for ack_id in ack_ids:
+            self._acker.nack(ack_id)
+        with self._cond:
+            size = sum(self._awaiting_sink.pop(ack_id, 0) for ack_id in ack_ids)
+        self._release(ack_ids, size)
+
+    def _release(self, ack_ids, size):
+        for ack_id in ack_ids:
+            self._leases.remove(ack_id)
+        with self._cond:
+            self._outstanding -= len(ack_ids)
+            self._outstanding_bytes -= size
+            self._cond.notify_all()
+
+    #################################
+    # 실행 / 리포트
+    #################################
+    def start(self):
+        self.started_at = time.monotonic()
+        for i in range(self.pullers):
+            t = threading.Thread(target=self._pull_loop, name=f"puller-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        if self.report_interval:
+            t = threading.Thread(target=self._report_loop, name="consumer-report", daemon=True)
+            t.start()
+            self._threads.append(t)
+        logging.info(f"Streaming consumer started: subscription={self.subscription_name}, "
+                     f"pullers={self.pullers}, max_outstanding={self.max_outstanding}, "
+                     f"max_outstanding_bytes={self.max_outstanding_bytes}, ack_deadline={self._leases.ack_deadline}")
+
+    def stop(self, timeout=30):
+        """
+        Pull을 멈추고, 받아 둔 메시지를 처리해 Ack 까지 끝낸 뒤 종료
+        """
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._executor.shutdown(wait=True)
+        if self._sink_stage is not None:
+            # 남은 메시지를 쓰고 파일을 닫아야 Ack 할 수 있음
+            self._sink_stage.close(timeout)
+        self._leases.close()
+        self._acker.close(timeout)
+        logging.info(f"Streaming consumer stopped: {self.stats()}")
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        stats = dict(self.counters, **self._acker.counters, **self._leases.counters,
+                     outstanding=self._outstanding, outstanding_bytes=self._outstanding_bytes,
+                     leased=self._leases.leased(), elapsed=elapsed)
+        if self._sink_stage is not None:
+            stats.update(self._sink_stage.counters, **self._sink_stage.sink.counters,
+                         awaiting_sink=self._sink_stage.pending())
+        stats["ack_rate"] = stats["acked"] / elapsed if elapsed > 0 else 0.0
+        return stats
+
+    def _report_loop(self):
+        previous = self.stats()
+        while not self._stop.wait(self.report_interval):
+            current = self.stats()
+            interval = current["elapsed"] - previous["elapsed"]
+            pulled_rate = (current["pulled"] - previous["pulled"]) / interval
+            drain_rate = (current["acked"] - previous["acked"]) / interval
+            line = (f"[consumer] pulled {pulled_rate:.1f} msg/s, drained(acked) {drain_rate:.1f} msg/s, "
+                    f"outstanding {current['outstanding']} ({current['outstanding_bytes']} bytes), "
+                    f"errors {current['handler_errors']}, nacked {current['nacked']}, "
+                    f"extended {current['extended']}, total acked {current['acked']}")
+            logging.info(line)
+            print(line)
+            previous = current
+
+    def run_forever(self):
+        self.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("Stopping consumer...")
+        finally:
+            self.stop()
+
 #################################
 # 메인 함수
 #################################
 def main():
+    parser = argparse.ArgumentParser(description="Pub/Sub pull subscription consumer")
     # Pull Subscription 이름 설정
-    subscription_name = 'PullSubscription'  # 실제 Subscription 이름으로 변경
-    
-    while True:
-        # 메시지 수신 및 Ack 처리
-        receive_and_ack_messages(subscription_name, max_messages=10, wait_time="3s")
-        
-        # 일정 시간 대기 후 다시 Pull (예: 5초)
-        time.sleep(5)
+    parser.add_argument("--subscription", default='PullSubscription', help="실제 Subscription 이름")
+    parser.add_argument("--stream", action="store_true", help="스트리밍 소비자 모드 (연속 Pull + 워커 풀 + 배치 Ack)")
+    parser.add_argument("--pullers", type=int, default=4, help="스트리밍 모드 동시 Pull 루프 수")
+    parser.add_argument("--workers", type=int, default=8, help="스트리밍 모드 메시지 처리 스레드 수")
+    parser.add_argument("--max-outstanding", type=int, default=1000, help="스트리밍 모드 처리 대기 메시지 상한")
+    parser.add_argument("--max-outstanding-bytes", type=int, default=100 * 1024 * 1024, help="스트리밍 모드 처리 대기 메시지 크기 합 상한 (바이트)")
+    parser.add_argument("--ack-deadline", type=int, default=10, help="Subscription의 ackDeadlineSeconds (lease 연장 단위, 초)")
+    parser.add_argument("--max-lease", type=float, default=600, help="메시지 하나의 ack deadline을 연장해 줄 최대 시간 (초)")
+    parser.add_argument("--report-interval", type=float, default=10, help="스트리밍 모드 처리율 리포트 간격 (초)")
+    parser.add_argument("--sink", choices=["jsonl", "parquet"], help="메시지를 로컬 파일로 저장 (기록 완료 후 Ack)")
+    parser.add_argument("--sink-dir", default="./messages", help="싱크 파일 디렉터리")
+    parser.add_argument("--sink-compression", help="jsonl: gzip, parquet: snappy(기본) / zstd / gzip / none")
+    parser.add_argument("--sink-fsync", choices=FSYNC_POLICIES, default="batch", help="fsync 정책 (batch: 쓸 때마다, rotate: 파일을 닫을 때만, none: 안 함)")
+    parser.add_argument("--rotate-bytes", type=int, default=64 * 1024 * 1024, help="싱크 파일 하나의 최대 크기 (바이트)")
+    parser.add_argument("--rotate-seconds", type=float, default=300, help="싱크 파일 하나를 열어 두는 최대 시간 (초)")
+    parser.add_argument("--print", dest="print_messages", action="store_true", help="스트리밍 모드에서 메시지를 콘솔에 출력")
+    args = parser.parse_args()
+
+    sink = None
+    if args.sink:
+        sink = create_sink(args.sink, args.sink_dir, compression=args.sink_compression, fsync=args.sink_fsync,
+                           prefix=args.subscription, rotate_bytes=args.rotate_bytes,
+                           rotate_seconds=args.rotate_seconds)
+
+    if args.stream:
+        if args.print_messages:
+            handler = print_message
+        else:
+            # 싱크에 저장할 때는 메시지마다 로그를 남기지 않음
+            handler = None if sink else log_message
+        consumer = StreamingConsumer(
+            args.subscription,
+            handler=handler,
+            pullers=args.pullers,
+            workers=args.workers,
+            max_outstanding=args.max_outstanding,
+            max_outstanding_bytes=args.max_outstanding_bytes,
+            ack_deadline=args.ack_deadline,
+            max_lease=args.max_lease,
+            report_interval=args.report_interval,
+            sink=sink
+        )
+        consumer.run_forever()
+        return
+
+    # 싱크 모드: 기록 완료된 메시지만 Ack
+    # (이 루프는 lease를 연장하지 않으므로 Parquet / fsync=rotate도 ack deadline의 절반 안에 파일을 닫아 Ack)
+    sink_stage = None
+    if sink:
+        sink_stage = SinkStage(sink, lambda ack_ids: ack_messages(args.subscription, ack_ids),
+                               max_uncommitted_age=args.ack_deadline / 2)
+
+    try:
+        while True:
+            # 메시지 수신 및 Ack 처리
+            receive_and_ack_messages(args.subscription, max_messages=10, wait_time="3s", sink_stage=sink_stage)
+            
+            # 일정 시간 대기 후 다시 Pull (예: 5초)
+            time.sleep(5)
+    finally:
+        if sink_stage:
+            sink_stage.close()
 
 if __name__ == "__main__":
     main()
@@ -7,73 +7,115 @@ import random
 import uuid
 import logging
 import base64
-import json  # Ensure json is imported
+import atexit
+from bisect import bisect
 
 # config.py 불러오기
 from config import *
 
+# 요청 통계 (엔드포인트별 요청 수 / 지연 시간 / 오류)
+import run_stats
+# Pub/Sub 배치 게시기
+from pubsub_publisher import BatchPublisher
+# 이벤트 스키마 (PullSubscription.py와 공용)
+import event_schema
+# 요청 기록 (config.yaml: record.file)
+import traffic_replay
+# 공용 HTTP 커넥션 풀 (config.yaml: http)
+import http_transport
+
 #################################
 # Pub/Sub 메시지 게시 함수
 #################################
+_publisher = None
+_publisher_lock = threading.Lock()
+
+def get_publisher():
+    """
+    프로세스 공용 배치 게시기 (처음 호출할 때 생성, 샤드 프로세스에서는 프로세스마다 하나)
+    """
+    global _publisher
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None:
+                url = f"{PUBSUB_ENDPOINT_URL}/v1/domains/{PUBSUB_DOMAIN_ID}/projects/{PUBSUB_PROJECT_ID}/topics/{PUBSUB_TOPIC_NAME}/publish"
+                _publisher = BatchPublisher(
+                    url, PUBSUB_CREDENTIAL_ID, PUBSUB_CREDENTIAL_SECRET,
+                    max_messages=PUBLISH_MAX_MESSAGES,
+                    max_bytes=PUBLISH_MAX_BYTES,
+                    linger=PUBLISH_LINGER_MS / 1000,
+                    buffer_size=PUBLISH_BUFFER_SIZE,
+                    block_timeout=PUBLISH_BLOCK_TIMEOUT,
+                    max_retries=PUBLISH_MAX_RETRIES,
+                    backoff=PUBLISH_BACKOFF_MS / 1000,
+                    adapter=http_transport.pubsub_adapter()
+                )
+                atexit.register(close_publisher)
+    return _publisher
+
+def flush_publisher():
+    """
+    지금까지 게시한 메시지를 모두 보낼 때까지 대기 (최대 PUBLISH_FLUSH_TIMEOUT초)
+    """
+    if _publisher is not None and not _publisher.flush(PUBLISH_FLUSH_TIMEOUT):
+        logging.warning(f"Publisher flush timed out: {_publisher.stats()}")
+
+def close_publisher():
+    if _publisher is not None:
+        _publisher.close(PUBLISH_FLUSH_TIMEOUT)
+        logging.info(f"Publisher closed: {_publisher.stats()}")
+
+def publisher_stats():
+    return _publisher.stats() if _publisher is not None else {}
+
 def publish_messages(messages):
     """
     Pub/Sub 토픽에 메시지를 게시하는 함수
-    :param messages: 게시할 메시지 리스트 (dict 형식)
+    메시지는 배치 게시기 버퍼에 들어가고, 백그라운드 스레드가 모아서 보냄
+    :param messages: 게시할 메시지 리스트 (dict 형식, data는 문자열 또는 bytes)
     """
-    url = f"{PUBSUB_ENDPOINT_URL}/v1/domains/{PUBSUB_DOMAIN_ID}/projects/{PUBSUB_PROJECT_ID}/topics/{PUBSUB_TOPIC_NAME}/publish"
-    
-    headers = {
-        "Credential-ID": PUBSUB_CREDENTIAL_ID,
-        "Credential-Secret": PUBSUB_CREDENTIAL_SECRET,
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "messages": []
-    }
-    
+    publisher = get_publisher()
     for msg in messages:
-        # 메시지 데이터는 Base64로 인코딩되어야 함
-        encoded_data = base64.b64encode(msg["data"].encode('utf-8')).decode('utf-8')
-        message = {
-            "data": encoded_data
-        }
-        if "attributes" in msg:
-            message["attributes"] = msg["attributes"]
-        payload["messages"].append(message)
-    
-    try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
-        if response.status_code in [200, 201]:
-            response_json = response.json()
-            logging.info(f"Published messages successfully. Message IDs: {response_json.get('messageIds')}")
-        else:
-            logging.error(f"Failed to publish messages: {response.status_code}, Response: {response.text}")
-    except Exception as e:
-        logging.error(f"Exception while publishing messages: {e}")
+        publisher.publish(publish_request_message(msg))
 
-def publish_event_message(user_id, event_type, details):
+def publish_request_message(msg):
     """
-    특정 이벤트를 메시지로 Pub/Sub 토픽에 게시
+    게시할 메시지를 publish 요청 형식으로 변환
+    :param msg: dict 형식 메시지 (data는 문자열 또는 bytes)
+    :return: {"data": base64 문자열, "attributes": {...}}
+    """
+    # 메시지 데이터는 Base64로 인코딩되어야 함
+    data = msg["data"]
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    encoded_data = base64.b64encode(data).decode('utf-8')
+    message = {
+        "data": encoded_data
+    }
+    if "attributes" in msg:
+        message["attributes"] = msg["attributes"]
+    return message
+
+def event_message(user_id, event_type, details):
+    """
+    이벤트 하나를 게시할 메시지로 만듦
     :param user_id: 이벤트를 발생시킨 사용자 ID
     :param event_type: 이벤트 유형 (예: 'login', 'logout', 'purchase')
     :param details: 이벤트에 대한 상세 정보 (dict)
     """
-    message_data = json.dumps({
-        "user_id": user_id,
-        "event_type": event_type,
-        "details": details
-    })
+    # 본문은 event_schema 형식 (인코딩은 PUBLISH_EVENT_ENCODING, 속성에 schema / encoding 표시)
+    encoded = event_schema.encode_event(user_id, event_type, details, PUBLISH_EVENT_ENCODING)
     
-    message = {
-        "data": message_data,
-        "attributes": {
-            "user_id": user_id,
-            "event_type": event_type
-        }
+    return {
+        "data": encoded.data,
+        "attributes": encoded.attributes
     }
-    
-    publish_messages([message])
+
+def publish_event_message(user_id, event_type, details):
+    """
+    특정 이벤트를 메시지로 Pub/Sub 토픽에 게시 (인자는 event_message()와 같음)
+    """
+    publish_messages([event_message(user_id, event_type, details)])
 
 #################################
 # 전역 상품/카테고리 캐시
@@ -90,6 +132,32 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+#################################
+# 요청 통계를 기록하는 HTTP 세션
+#################################
+class TrackedSession(requests.Session):
+    """
+    요청마다 지연 시간과 상태 코드(또는 예외)를 run_stats에 기록하는 requests.Session
+    기록 중(config.yaml: record.file)이면 요청도 traffic_replay 기록 파일에 남김
+    API 서버 연결은 모든 세션이 http_transport의 공용 커넥션 풀을 씀 (쿠키는 세션마다 따로)
+    """
+    def __init__(self):
+        super().__init__()
+        http_transport.mount(self)
+
+    def request(self, method, url, *args, **kwargs):
+        endpoint = run_stats.endpoint_key(method, url)
+        start = time.perf_counter()
+        try:
+            resp = super().request(method, url, *args, **kwargs)
+        except Exception as e:
+            run_stats.stats.record(endpoint, time.perf_counter() - start, exc=e)
+            traffic_replay.record_request(self, method, url, kwargs.get("data"), start, None)
+            raise
+        run_stats.stats.record(endpoint, time.perf_counter() - start, status=resp.status_code)
+        traffic_replay.record_request(self, method, url, kwargs.get("data"), start, resp.status_code)
+        return resp
+
 #################################
 # 나이 구간 판단 함수
 #################################
@@ -109,7 +177,8 @@ def fetch_products(api_base_url: str):
     headers = {"Accept": "application/json"}
     try:
         url = api_base_url + API_ENDPOINTS["PRODUCTS"]
-        resp = requests.get(url, headers=headers)
+        with TrackedSession() as session:
+            resp = session.get(url, headers=headers)
         if resp.status_code == 200:
             data = resp.json()
             if isinstance(data, list):
@@ -119,6 +188,7 @@ def fetch_products(api_base_url: str):
             else:
                 products_cache = []
             logging.info(f"Fetched {len(products_cache)} products.")
+            build_product_pools()
         else:
             logging.error(f"Failed to fetch products: {resp.status_code}, content={resp.text}")
     except Exception as e:
@@ -129,7 +199,8 @@ def fetch_categories(api_base_url: str):
     headers = {"Accept": "application/json"}
     try:
         url = api_base_url + API_ENDPOINTS["CATEGORIES"]
-        resp = requests.get(url, headers=headers)
+        with TrackedSession() as session:
+            resp = session.get(url, headers=headers)
         if resp.status_code == 200:
             data = resp.json()
             if isinstance(data, list):
@@ -144,28 +215,125 @@ def fetch_categories(api_base_url: str):
     except Exception as e:
         logging.error(f"Exception while fetching categories: {e}")
 
+#################################
+# FSM 단계 사이 대기
+#################################
+# open-loop steps 모드에서 open_loop가 설정 (None이면 closed-loop)
+step_pacer = None
+
+def think():
+    """
+    FSM 단계 사이 대기
+    - closed-loop: TIME_SLEEP_RANGE 범위에서 임의로 쉼
+    - open-loop steps 모드: 다음 단계 예정 시각까지 대기 (스케줄이 끝나면 open_loop.ScheduleExhausted)
+    """
+    if step_pacer is not None:
+        step_pacer.wait()
+    else:
+        time.sleep(random.uniform(*TIME_SLEEP_RANGE))
+
+#################################
+# 확률 전이표 (config.py의 FSM을 시작할 때 한 번 컴파일)
+#################################
+# 한 행의 확률 합이 1에서 이만큼 넘게 벗어나면 경고 (표본 추출은 합으로 나눠 정규화하므로 동작은 같음)
+WEIGHT_SUM_TOLERANCE = 1e-6
+
+class TransitionTable:
+    """
+    상태 하나의 다음 상태 후보와 누적 가중치 (매 전이마다 리스트를 만들지 않고 bisect로 추출)
+    """
+    __slots__ = ("states", "cum_weights", "total")
+
+    def __init__(self, states, cum_weights):
+        self.states = states
+        self.cum_weights = cum_weights
+        self.total = cum_weights[-1] if cum_weights else 0.0
+
+    def __len__(self):
+        return len(self.states)
+
+    def sample(self):
+        return self.states[bisect(self.cum_weights, random.random() * self.total)]
+
+
+def compile_transitions(machine: dict, name: str) -> dict:
+    """
+    FSM 정의(상태 -> {다음 상태: 확률})를 상태 -> TransitionTable로 변환하고 검증
+    - 음수 / 숫자가 아닌 확률, 정의되지 않은 다음 상태, 확률이 모두 0인 행은 ValueError
+    - 확률 합이 1이 아닌 행은 경고만 남김
+    :param name: 오류 메시지에 쓸 FSM 이름 (예: "STATE_TRANSITIONS")
+    """
+    tables = {}
+    for state, prob_dict in machine.items():
+        states = []
+        cum_weights = []
+        total = 0.0
+        for next_state, weight in prob_dict.items():
+            if next_state not in machine:
+                raise ValueError(f"{name}[{state!r}]: unknown next state {next_state!r}")
+            if not isinstance(weight, (int, float)) or weight < 0:
+                raise ValueError(f"{name}[{state!r}][{next_state!r}]: invalid weight {weight!r}")
+            # 확률 0인 후보는 뽑힐 일이 없으므로 표에서 뺌
+            if weight == 0:
+                continue
+            total += weight
+            states.append(next_state)
+            cum_weights.append(total)
+        if prob_dict and not states:
+            raise ValueError(f"{name}[{state!r}]: all weights are zero")
+        if prob_dict and abs(total - 1.0) > WEIGHT_SUM_TOLERANCE:
+            logging.warning(f"{name}[{state!r}]: weights sum to {total:.6f}, not 1 (normalized)")
+        tables[state] = TransitionTable(states, cum_weights)
+    return tables
+
+
+STATE_TABLES = compile_transitions(STATE_TRANSITIONS, "STATE_TRANSITIONS")
+ANON_SUB_TABLES = compile_transitions(ANON_SUB_TRANSITIONS, "ANON_SUB_TRANSITIONS")
+LOGGED_SUB_TABLES = compile_transitions(LOGGED_SUB_TRANSITIONS, "LOGGED_SUB_TRANSITIONS")
+
 #################################
 # 확률 전이 공통 함수
 #################################
-def pick_next_state(prob_dict: dict) -> str:
-    states = list(prob_dict.keys())
-    probs = list(prob_dict.values())
+def pick_next_state(transitions) -> str:
+    """
+    :param transitions: TransitionTable (또는 컴파일하지 않은 {다음 상태: 확률} dict)
+    """
+    if isinstance(transitions, TransitionTable):
+        return transitions.sample()
+    states = list(transitions.keys())
+    probs = list(transitions.values())
     return random.choices(states, weights=probs, k=1)[0]
 
 #################################
 # 선호 카테고리 상품 선택
 #################################
+# (gender, age_segment) -> 선호 카테고리 상품 ID 목록 (없으면 전체 상품 ID)
+# products_cache가 바뀌면(다른 리스트 객체가 되면) 다음 호출에서 다시 만듦
+_product_pools = {}
+_product_pools_source = None
+
+def build_product_pools():
+    global _product_pools, _product_pools_source
+    all_ids = [p.get("id", "101") for p in products_cache]
+    pools = {}
+    for gender, segments in CATEGORY_PREFERENCE.items():
+        for age_segment, cat_list in segments.items():
+            cats = set(cat_list)
+            pool = [p.get("id", "101") for p in products_cache if p.get("category", "") in cats]
+            pools[(gender, age_segment)] = pool or all_ids
+    _product_pools = pools
+    _product_pools_source = products_cache
+
 def pick_preferred_product_id(gender: str, age_segment: str) -> str:
     if not products_cache:
         return "101"  # fallback
-    cat_list = CATEGORY_PREFERENCE.get(gender, {}).get(age_segment, [])
-    filtered = [p for p in products_cache if p.get("category", "") in cat_list]
-    if filtered:
-        chosen = random.choice(filtered)
-        return chosen.get("id", "101")
-    else:
-        chosen = random.choice(products_cache)
-        return chosen.get("id", "101")
+    if _product_pools_source is not products_cache:
+        build_product_pools()
+    pool = _product_pools.get((gender, age_segment))
+    if pool is None:
+        # CATEGORY_PREFERENCE에 없는 조합은 전체 상품에서 선택
+        return random.choice(products_cache).get("id", "101")
+    return random.choice(pool)
 
 #################################
 # 실제 회원가입/로그인/로그아웃/탈퇴 시도
@@ -264,11 +432,11 @@ def do_anon_sub_fsm(session: requests.Session, user_unique_id: str):
         logging.info(f"[{user_unique_id}] Anon Sub-FSM state = {sub_state}")
         perform_anon_sub_action(session, user_unique_id, sub_state)
 
-        if sub_state not in ANON_SUB_TRANSITIONS:
+        if sub_state not in ANON_SUB_TABLES:
             logging.warning(f"[{user_unique_id}] {sub_state} not in ANON_SUB_TRANSITIONS => break")
             break
 
-        transitions = ANON_SUB_TRANSITIONS[sub_state]
+        transitions = ANON_SUB_TABLES[sub_state]
         if not transitions:
             logging.warning(f"[{user_unique_id}] No next transitions => break")
             break
@@ -280,7 +448,7 @@ def do_anon_sub_fsm(session: requests.Session, user_unique_id: str):
         # 예: 각 상태 전환 후 이벤트 게시
         publish_event_message(user_unique_id, "anon_sub_state_transition", {"current_state": sub_state})
 
-        time.sleep(random.uniform(*TIME_SLEEP_RANGE))
+        think()
 
 def perform_anon_sub_action(session: requests.Session, user_unique_id: str, sub_state: str):
     headers = {"Accept": "application/json"}
@@ -381,11 +549,11 @@ def do_logged_sub_fsm(session: requests.Session,
         logging.info(f"[{user_unique_id}] Logged Sub-FSM state = {sub_state}")
         perform_logged_sub_action(session, user_unique_id, sub_state, gender, age_segment)
 
-        if sub_state not in LOGGED_SUB_TRANSITIONS:
+        if sub_state not in LOGGED_SUB_TABLES:
             logging.warning(f"[{user_unique_id}] {sub_state} not in LOGGED_SUB_TRANSITIONS => break")
             break
 
-        transitions = LOGGED_SUB_TRANSITIONS[sub_state]
+        transitions = LOGGED_SUB_TABLES[sub_state]
         if not transitions:
             logging.warning(f"[{user_unique_id}] No next transitions => break")
             break
@@ -397,7 +565,7 @@ def do_logged_sub_fsm(session: requests.Session,
         # 예: 각 상태 전환 후 이벤트 게시
         publish_event_message(user_unique_id, "logged_sub_state_transition", {"current_state": sub_state})
 
-        time.sleep(random.uniform(*TIME_SLEEP_RANGE))
+        think()
 
 def perform_logged_sub_action(session: requests.Session,
                               user_unique_id: str,
@@ -575,14 +743,15 @@ def do_top_level_action_and_confirm(
 #################################
 # 사용자 전체 로직
 #################################
-def run_user_simulation(user_idx: int):
-    session = requests.Session()
+def run_user_simulation(user_idx: int, user_unique_id: str = None):
+    session = TrackedSession()
 
     gender = random.choice(["F", "M"])
     age = random.randint(18,70)
     age_segment = get_age_segment(age)
 
-    user_unique_id = f"user_{uuid.uuid4().hex[:6]}"
+    if not user_unique_id:
+        user_unique_id = f"user_{uuid.uuid4().hex[:6]}"
     logging.info(f"[{user_unique_id}] Start simulation. gender={gender}, age={age}")
 
     current_state = "Anon_NotRegistered"
@@ -600,12 +769,12 @@ def run_user_simulation(user_idx: int):
             break
 
         # 상위 전이 후보
-        if current_state not in STATE_TRANSITIONS:
+        if current_state not in STATE_TABLES:
             logging.error(f"[{user_unique_id}] no transitions from {current_state} => end.")
             publish_event_message(user_unique_id, "simulation", {"status": "invalid_state", "current_state": current_state})
             break
 
-        possible_next = STATE_TRANSITIONS[current_state]
+        possible_next = STATE_TABLES[current_state]
         if not possible_next:
             logging.warning(f"[{user_unique_id}] next_candidates empty => end.")
             publish_event_message(user_unique_id, "simulation", {"status": "no_next_candidates", "current_state": current_state})
@@ -646,7 +815,7 @@ def run_user_simulation(user_idx: int):
             current_state = "Done"
 
         transition_count += 1
-        time.sleep(random.uniform(*TIME_SLEEP_RANGE))
+        think()
 
     logging.info(f"[{user_unique_id}] Simulation ended. final={current_state}")
 
@@ -676,39 +845,81 @@ def publish_test_messages():
 #################################
 semaphore = threading.Semaphore(MAX_THREADS)
 
-def user_thread(idx: int):
-    with semaphore:
-        run_user_simulation(idx)
-        # 각 사용자 시뮬레이션 후 메시지 게시 (예: 로그 적재)
-        log_message = f"User {idx} simulation completed."
-        messages = [
-            {
-                "data": log_message,
-                "attributes": {
-                    "user_id": f"user_{idx}",
-                    "event": "simulation_complete"
-                }
-            }
-        ]
-        publish_messages(messages)
+def simulation_complete_message(idx: int):
+    # 각 사용자 시뮬레이션 후 게시하는 메시지 (예: 로그 적재)
+    log_message = f"User {idx} simulation completed."
+    return {
+        "data": log_message,
+        "attributes": {
+            "user_id": f"user_{idx}",
+            "event": "simulation_complete"
+        }
+    }
 
-def main():
-    # 초기 데이터
-    fetch_products(API_BASE_URL)
-    fetch_categories(API_BASE_URL)
+def publish_simulation_complete(idx: int):
+    publish_messages([simulation_complete_message(idx)])
 
+def user_thread(idx: int, user_unique_id: str = None):
+    with semaphore:
+        run_user_simulation(idx, user_unique_id)
+        publish_simulation_complete(idx)
+
+def run_users(user_indices, user_id_prefix: str = None):
+    """
+    주어진 인덱스의 사용자들을 스레드로 실행하고 모두 끝날 때까지 대기
+    :param user_indices: 실행할 사용자 인덱스 (예: range(NUM_USERS))
+    :param user_id_prefix: 지정하면 사용자 ID를 f"{prefix}{idx}"로 고정 (샤드 실행용)
+    """
     threads = []
-    for i in range(NUM_USERS):
-        t = threading.Thread(target=user_thread, args=(i,))
+    for i in user_indices:
+        user_unique_id = f"{user_id_prefix}{i}" if user_id_prefix else None
+        t = threading.Thread(target=user_thread, args=(i, user_unique_id))
         threads.append(t)
         t.start()
-        time.sleep(0.05)
+        time.sleep(SPAWN_INTERVAL)
 
     for t in threads:
         t.join()
 
+    flush_publisher()
     logging.info("All user threads finished.")
 
+def main():
+    # 멀티 프로세스 샤드 실행 (threads.processes, 요청 기록은 샤드마다 따로)
+    if PROCESSES != 1:
+        import shard_launcher
+        shard_launcher.main()
+        return
+
+    # 요청 기록 (config.yaml: record.file)
+    if RECORD_FILE:
+        traffic_replay.start_recording(RECORD_FILE)
+
+    # open-loop 모드 (load.mode: open)
+    if LOAD_MODE == "open":
+        import open_loop
+        open_loop.main()
+        return
+
+    # asyncio 엔진 (threads.engine: asyncio)
+    if ENGINE == "asyncio":
+        import async_engine
+        async_engine.main()
+        return
+
+    # 초기 데이터
+    fetch_products(API_BASE_URL)
+    fetch_categories(API_BASE_URL)
+
+    reporter = run_stats.PeriodicReporter(run_stats.stats, REPORT_INTERVAL).start()
+    started = time.monotonic()
+    run_users(range(NUM_USERS))
+    elapsed = time.monotonic() - started
+    reporter.stop()
+
+    print(run_stats.emit_report("Traffic run", run_stats.stats.snapshot(), elapsed, REPORT_FILE,
+                                extra={"publisher": publisher_stats(), "http": http_transport.stats()}))
+
 if __name__ == "__main__":
     main()
     print("Traffic generation completed. Check the log file for details.")
@@ -0,0 +1,492 @@
+# async_engine.py
+# pip install aiohttp 필요
+#
+# asyncio 기반 트래픽 생성 엔진 (config.yaml: threads.engine = "asyncio")
+# TrafficGenerator.py와 같은 STATE_TRANSITIONS / ANON_SUB_TRANSITIONS / LOGGED_SUB_TRANSITIONS(컴파일된 전이표)를
+# 사용자당 OS 스레드 대신 코루틴으로 실행하고, 모든 사용자가 하나의 커넥션 풀(aiohttp)을 공유한다.
+# 사용자별 쿠키(session_id, user_id)는 사용자마다 별도의 cookie jar로 분리한다.
+
+import asyncio
+import logging
+import random
+import time
+import uuid
+
+import aiohttp
+
+# config.py 불러오기
+from config import *
+
+# 요청 통계 (스레드 엔진과 같은 집계 사용)
+import run_stats
+
+# 상품 캐시, 상태 전이, Pub/Sub 게시 함수는 스레드 엔진과 공유
+import TrafficGenerator as tg
+# 요청 기록 (config.yaml: record.file)
+import traffic_replay
+
+JSON_HEADERS = {"Accept": "application/json"}
+
+#################################
+# 공통 함수
+#################################
+# 게시기 버퍼가 가득 찼을 때 다시 확인하는 간격 (초, 최소 / 최대)
+PUBLISH_RETRY_DELAY = (0.001, 0.05)
+
+
+async def publish(msg):
+    """
+    메시지를 배치 게시기 버퍼에 넣고 반환 (전송은 게시기 스레드가 담당)
+    버퍼가 가득 차면 이벤트 루프는 멈추지 않고 이 코루틴만 최대 PUBLISH_BLOCK_TIMEOUT초 동안
+    자리가 날 때까지 쉬었다가 넣음 (backpressure), 그래도 가득 차 있으면 버림 (게시기 dropped로 셈)
+    :param msg: 게시할 메시지 (tg.publish_messages()와 같은 형식)
+    """
+    message = tg.publish_request_message(msg)
+    publisher = tg.get_publisher()
+    if publisher.overflow == "block" and publisher.full():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + PUBLISH_BLOCK_TIMEOUT
+        delay = PUBLISH_RETRY_DELAY[0]
+        while publisher.full() and loop.time() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, PUBLISH_RETRY_DELAY[1])
+    # 이벤트 루프 스레드에서는 기다리지 않고 넣거나 버림
+    publisher.publish(message, timeout=0)
+
+
+async def publish_event_message(user_id, event_type, details):
+    """
+    이벤트 게시 (tg.publish_event_message의 코루틴 버전)
+    """
+    await publish(tg.event_message(user_id, event_type, details))
+
+
+async def publish_simulation_complete(idx):
+    """
+    사용자 시뮬레이션 종료 메시지 게시 (tg.publish_simulation_complete의 코루틴 버전)
+    """
+    await publish(tg.simulation_complete_message(idx))
+
+
+# open-loop steps 모드에서 open_loop가 설정 (None이면 closed-loop)
+step_pacer = None
+
+
+async def think():
+    """
+    FSM 단계 사이 대기 (TrafficGenerator.think의 코루틴 버전)
+    """
+    if step_pacer is not None:
+        await step_pacer.wait_async()
+    else:
+        await asyncio.sleep(random.uniform(*TIME_SLEEP_RANGE))
+
+
+async def request(http, method, url, data=None):
+    """
+    HTTP 요청 후 (상태 코드, 응답 JSON 또는 None) 반환
+    응답 본문은 끝까지 읽어 커넥션이 풀로 돌아가게 함
+    """
+    endpoint = run_stats.endpoint_key(method, url)
+    start = time.perf_counter()
+    try:
+        async with http.request(method, url, data=data, headers=JSON_HEADERS) as resp:
+            body = await resp.read()
+            status = resp.status
+            payload = None
+            if resp.content_type == "application/json" and body:
+                try:
+                    payload = await resp.json()
+                except Exception:
+                    payload = None
+    except Exception as e:
+        run_stats.stats.record(endpoint, time.perf_counter() - start, exc=e)
+        traffic_replay.record_request(http, method, url, data, start, None)
+        raise
+    run_stats.stats.record(endpoint, time.perf_counter() - start, status=status)
+    traffic_replay.record_request(http, method, url, data, start, status)
+    return status, payload
+
+
+async def report_action(http, user_id, event_type, method, url, label, details, data=None, judged=False):
+    """
+    하위 FSM 액션 하나를 실행하고 결과 이벤트를 게시
+    :param label: 로그에 남길 요청 표기 (예: "GET /products")
+    :param details: 이벤트 상세 정보 기본값 (action, product_id 등)
+    :param judged: True면 2xx 여부로 success/failed를 기록, False면 상태 코드만 기록
+    :return: 상태 코드 (예외 시 None)
+    """
+    try:
+        status, _ = await request(http, method, url, data=data)
+        logging.info(f"[{user_id}] {label} => {status}")
+        if not judged:
+            await publish_event_message(user_id, event_type, {**details, "status_code": status})
+        elif 200 <= status < 300:
+            await publish_event_message(user_id, event_type, {**details, "status": "success"})
+        else:
+            await publish_event_message(user_id, event_type, {**details, "status": "failed", "status_code": status})
+        return status
+    except Exception as e:
+        logging.error(f"[{user_id}] {label} error: {e}")
+        await publish_event_message(user_id, event_type, {**details, "status": "exception", "error": str(e)})
+        return None
+
+#################################
+# 실제 회원가입/로그인/로그아웃/탈퇴 시도
+#################################
+async def try_account_action(http, user_id, event_type, endpoint, data=None, success_status=None):
+    """
+    상위 상태 전이용 API 호출 (성공 여부 반환)
+    :param success_status: 성공으로 볼 상태 코드 (None이면 2xx)
+    """
+    url = API_BASE_URL + API_ENDPOINTS[endpoint]
+    try:
+        status, _ = await request(http, "POST", url, data=data)
+        logging.info(f"[{user_id}] POST /{API_ENDPOINTS[endpoint]} => {status}")
+        ok = status == success_status if success_status else 200 <= status < 300
+        if ok:
+            await publish_event_message(user_id, event_type, {"status": "success"})
+        else:
+            await publish_event_message(user_id, event_type, {"status": "failed", "status_code": status})
+        return ok
+    except Exception as e:
+        logging.error(f"[{user_id}] {event_type} exception: {e}")
+        await publish_event_message(user_id, event_type, {"status": "exception", "error": str(e)})
+        return False
+
+
+async def try_register(http, user_id, gender, age_segment):
+    payload = {
+        "user_id": user_id,
+        "name": f"TestUser_{user_id}",
+        "email": f"{user_id}@example.com",
+        "gender": gender,
+        "age": str(random.randint(18, 70))
+    }
+    return await try_account_action(http, user_id, "register", "ADD_USER", payload, success_status=201)
+
+
+async def try_login(http, user_id):
+    return await try_account_action(http, user_id, "login", "LOGIN", {"user_id": user_id})
+
+
+async def try_logout(http, user_id):
+    return await try_account_action(http, user_id, "logout", "LOGOUT")
+
+
+async def try_delete_user(http, user_id):
+    return await try_account_action(http, user_id, "delete_user", "DELETE_USER", {"user_id": user_id})
+
+#################################
+# 비로그인 하위 FSM
+#################################
+async def perform_anon_sub_action(http, user_id, sub_state):
+    event_type = "anon_sub_action"
+
+    if sub_state == "Anon_Sub_Main":
+        await report_action(http, user_id, event_type, "GET", API_BASE_URL,
+                            "GET /", {"action": "access_main_page"})
+
+    elif sub_state == "Anon_Sub_Products":
+        await report_action(http, user_id, event_type, "GET", API_BASE_URL + API_ENDPOINTS["PRODUCTS"],
+                            "GET /products", {"action": "view_products"})
+
+    elif sub_state == "Anon_Sub_ViewProduct":
+        if tg.products_cache:
+            pid = random.choice(tg.products_cache).get("id", "101")
+            await report_action(http, user_id, event_type, "GET",
+                                f"{API_BASE_URL}{API_ENDPOINTS['PRODUCT_DETAIL']}?id={pid}",
+                                f"GET /product?id={pid}", {"action": "view_product_detail", "product_id": pid})
+
+    elif sub_state == "Anon_Sub_Categories":
+        await report_action(http, user_id, event_type, "GET", API_BASE_URL + API_ENDPOINTS["CATEGORIES"],
+                            "GET /categories", {"action": "view_categories"})
+
+    elif sub_state == "Anon_Sub_CategoryList":
+        if tg.categories_cache:
+            chosen_cat = random.choice(tg.categories_cache)
+            await report_action(http, user_id, event_type, "GET",
+                                f"{API_BASE_URL}{API_ENDPOINTS['CATEGORY']}?name={chosen_cat}",
+                                f"GET /category?name={chosen_cat}",
+                                {"action": "view_category", "category_name": chosen_cat})
+
+    elif sub_state == "Anon_Sub_Search":
+        q = random.choice(SEARCH_KEYWORDS)
+        await report_action(http, user_id, event_type, "GET",
+                            f"{API_BASE_URL}{API_ENDPOINTS['SEARCH']}?query={q}",
+                            f"GET /search?query={q}", {"action": "search", "query": q})
+
+    elif sub_state == "Anon_Sub_Error":
+        await report_action(http, user_id, event_type, "GET", API_BASE_URL + API_ENDPOINTS["ERROR_PAGE"],
+                            "GET /error", {"action": "trigger_error"})
+
+    # Anon_Sub_Initial, Anon_Sub_Done => no specific action
+
+
+async def do_anon_sub_fsm(http, user_id):
+    sub_state = "Anon_Sub_Initial"
+    while sub_state != "Anon_Sub_Done":
+        logging.info(f"[{user_id}] Anon Sub-FSM state = {sub_state}")
+        await perform_anon_sub_action(http, user_id, sub_state)
+
+        transitions = tg.ANON_SUB_TABLES.get(sub_state)
+        if not transitions:
+            logging.warning(f"[{user_id}] No next transitions from {sub_state} => break")
+            break
+
+        next_sub = tg.pick_next_state(transitions)
+        logging.info(f"[{user_id}] (AnonSub) {sub_state} -> {next_sub}")
+        sub_state = next_sub
+
+        await publish_event_message(user_id, "anon_sub_state_transition", {"current_state": sub_state})
+
+        await think()
+
+#################################
+# 로그인 하위 FSM
+#################################
+async def perform_logged_sub_action(http, user_id, sub_state, gender, age_segment):
+    event_type = "logged_sub_action"
+
+    if sub_state == "Login_Sub_ViewCart":
+        await report_action(http, user_id, event_type, "GET", API_BASE_URL + API_ENDPOINTS["CART_VIEW"],
+                            "GET /cart/view", {"action": "view_cart"})
+
+    elif sub_state == "Login_Sub_CheckoutHistory":
+        await report_action(http, user_id, event_type, "GET", API_BASE_URL + API_ENDPOINTS["CHECKOUT_HISTORY"],
+                            "GET /checkout_history", {"action": "view_checkout_history"})
+
+    elif sub_state == "Login_Sub_CartAdd":
+        pid = tg.pick_preferred_product_id(gender, age_segment)
+        qty = random.randint(1, 3)
+        await report_action(http, user_id, event_type, "POST", API_BASE_URL + API_ENDPOINTS["CART_ADD"],
+                            f"POST /cart/add (pid={pid}, qty={qty})",
+                            {"action": "add_to_cart", "product_id": pid, "quantity": qty},
+                            data={"id": pid, "quantity": str(qty)}, judged=True)
+
+    elif sub_state == "Login_Sub_CartRemove":
+        # 우선 장바구니 조회
+        try:
+            status, cart_data = await request(http, "GET", API_BASE_URL + API_ENDPOINTS["CART_VIEW"])
+        except Exception as e:
+            logging.error(f"[{user_id}] remove cart error: {e}")
+            await publish_event_message(user_id, event_type, {"action": "remove_from_cart", "status": "exception", "error": str(e)})
+            return
+
+        if status != 200:
+            logging.error(f"[{user_id}] GET /cart/view fail => {status}")
+            await publish_event_message(user_id, event_type, {"action": "view_cart_for_remove", "status": "failed", "status_code": status})
+            return
+
+        items = (cart_data or {}).get("cart_items", [])
+        if not items:
+            logging.info(f"[{user_id}] Cart empty => skip remove")
+            return
+
+        chosen_item = random.choice(items)
+        rid = chosen_item["product_id"]
+        rqty = random.randint(1, chosen_item["quantity"])
+        await report_action(http, user_id, event_type, "POST", API_BASE_URL + API_ENDPOINTS["CART_REMOVE"],
+                            f"POST /cart/remove (pid={rid}, qty={rqty})",
+                            {"action": "remove_from_cart", "product_id": rid, "quantity": rqty},
+                            data={"product_id": rid, "quantity": str(rqty)}, judged=True)
+
+    elif sub_state == "Login_Sub_Checkout":
+        await report_action(http, user_id, event_type, "POST", API_BASE_URL + API_ENDPOINTS["CHECKOUT"],
+                            "POST /checkout", {"action": "checkout"}, judged=True)
+
+    elif sub_state == "Login_Sub_AddReview":
+        pid = tg.pick_preferred_product_id(gender, age_segment)
+        rating = random.randint(1, 5)
+        await report_action(http, user_id, event_type, "POST", API_BASE_URL + API_ENDPOINTS["ADD_REVIEW"],
+                            f"POST /add_review (pid={pid},rating={rating})",
+                            {"action": "add_review", "product_id": pid, "rating": rating},
+                            data={"product_id": pid, "rating": str(rating)}, judged=True)
+
+    elif sub_state == "Login_Sub_Error":
+        await report_action(http, user_id, event_type, "GET", API_BASE_URL + API_ENDPOINTS["ERROR_PAGE"],
+                            "GET /error", {"action": "trigger_error"})
+
+
+async def do_logged_sub_fsm(http, user_id, gender, age_segment):
+    sub_state = "Login_Sub_Initial"
+    while sub_state != "Login_Sub_Done":
+        logging.info(f"[{user_id}] Logged Sub-FSM state = {sub_state}")
+        await perform_logged_sub_action(http, user_id, sub_state, gender, age_segment)
+
+        transitions = tg.LOGGED_SUB_TABLES.get(sub_state)
+        if not transitions:
+            logging.warning(f"[{user_id}] No next transitions from {sub_state} => break")
+            break
+
+        next_sub = tg.pick_next_state(transitions)
+        logging.info(f"[{user_id}] (LoggedSub) {sub_state} -> {next_sub}")
+        sub_state = next_sub
+
+        await publish_event_message(user_id, "logged_sub_state_transition", {"current_state": sub_state})
+
+        await think()
+
+#################################
+# 상위 상태 전이 (실제 API 호출로 성공/실패 반영)
+#################################
+async def do_top_level_action_and_confirm(http, current_state, proposed_next, user_id, gender, age_segment):
+    """
+    TrafficGenerator.do_top_level_action_and_confirm의 코루틴 버전
+    성공 => proposed_next 반환, 실패 => current_state로 롤백
+    """
+    if current_state == "Anon_NotRegistered" and proposed_next == "Anon_Registered":
+        ok = await try_register(http, user_id, gender, age_segment)
+        return "Anon_Registered" if ok else "Anon_NotRegistered"
+
+    if current_state == "Anon_Registered" and proposed_next == "Logged_In":
+        ok = await try_login(http, user_id)
+        return "Logged_In" if ok else "Anon_Registered"
+
+    if current_state == "Logged_In" and proposed_next == "Logged_Out":
+        ok = await try_logout(http, user_id)
+        return "Logged_Out" if ok else "Logged_In"
+
+    if current_state == "Logged_In" and proposed_next == "Unregistered":
+        ok = await try_delete_user(http, user_id)
+        return "Unregistered" if ok else "Logged_In"
+
+    if current_state == "Logged_Out" and proposed_next == "Anon_Registered":
+        return "Anon_Registered"
+
+    if current_state == "Logged_Out" and proposed_next == "Unregistered":
+        ok = await try_delete_user(http, user_id)
+        return "Unregistered" if ok else "Logged_Out"
+
+    return proposed_next
+
+#################################
+# 사용자 전체 로직
+#################################
+async def run_user_simulation(connector, user_idx, user_unique_id=None):
+    # 커넥션 풀은 공유하고, 쿠키는 사용자별로 분리 (IP 주소 호스트도 쿠키 저장하도록 unsafe=True)
+    async with aiohttp.ClientSession(connector=connector, connector_owner=False,
+                                     cookie_jar=aiohttp.CookieJar(unsafe=True)) as http:
+        gender = random.choice(["F", "M"])
+        age = random.randint(18, 70)
+        age_segment = tg.get_age_segment(age)
+
+        user_id = user_unique_id or f"user_{uuid.uuid4().hex[:6]}"
+        logging.info(f"[{user_id}] Start simulation. gender={gender}, age={age}")
+
+        current_state = "Anon_NotRegistered"
+        transition_count = 0
+
+        while True:
+            if transition_count >= ACTIONS_PER_USER:
+                logging.info(f"[{user_id}] Reached max transitions => end.")
+                await publish_event_message(user_id, "simulation", {"status": "max_transitions_reached"})
+                break
+
+            if current_state == "Done":
+                logging.info(f"[{user_id}] state=Done => end.")
+                await publish_event_message(user_id, "simulation", {"status": "done"})
+                break
+
+            possible_next = tg.STATE_TABLES.get(current_state)
+            if not possible_next:
+                logging.warning(f"[{user_id}] no transitions from {current_state} => end.")
+                await publish_event_message(user_id, "simulation", {"status": "no_next_candidates", "current_state": current_state})
+                break
+
+            proposed_next = tg.pick_next_state(possible_next)
+            logging.info(f"[{user_id}] (Top) {current_state} -> proposed={proposed_next}")
+
+            actual_next = await do_top_level_action_and_confirm(
+                http, current_state, proposed_next, user_id, gender, age_segment
+            )
+            if actual_next != current_state:
+                logging.info(f"[{user_id}] => confirmed next: {actual_next}")
+                await publish_event_message(user_id, "top_level_state_transition", {"from": current_state, "to": actual_next})
+                current_state = actual_next
+            else:
+                await publish_event_message(user_id, "top_level_state_transition_failed", {"current_state": current_state, "proposed_next": proposed_next})
+
+            # 하위 FSM
+            if current_state in ("Anon_NotRegistered", "Anon_Registered"):
+                await do_anon_sub_fsm(http, user_id)
+            elif current_state == "Logged_In":
+                await do_logged_sub_fsm(http, user_id, gender, age_segment)
+            elif current_state == "Logged_Out":
+                logging.info(f"[{user_id}] (Top) state=Logged_Out => no sub-FSM")
+                await publish_event_message(user_id, "sub_fsm", {"state": "Logged_Out"})
+            elif current_state == "Unregistered":
+                logging.info(f"[{user_id}] user unregistered => next=Done")
+                await publish_event_message(user_id, "unregister", {"status": "done"})
+                current_state = "Done"
+
+            transition_count += 1
+            await think()
+
+        logging.info(f"[{user_id}] Simulation ended. final={current_state}")
+
+
+async def user_task(connector, semaphore, idx, user_unique_id=None):
+    async with semaphore:
+        try:
+            await run_user_simulation(connector, idx, user_unique_id)
+        except Exception as e:
+            logging.error(f"[user_{idx}] simulation aborted: {e}")
+        await publish_simulation_complete(idx)
+
+
+def new_connector():
+    """
+    모든 사용자가 공유하는 커넥션 풀
+    """
+    return aiohttp.TCPConnector(limit=MAX_CONNECTIONS, limit_per_host=MAX_CONNECTIONS,
+                                keepalive_timeout=30)
+
+
+async def run_all_users(user_indices, user_id_prefix=None):
+    """
+    user_indices의 사용자들을 SPAWN_INTERVAL 간격으로 시작하고 모두 끝날 때까지 대기
+    동시에 실행되는 사용자 수는 MAX_THREADS로 제한
+    :param user_id_prefix: 지정하면 사용자 ID를 f"{prefix}{idx}"로 고정 (샤드 실행용)
+    """
+    connector = new_connector()
+    semaphore = asyncio.Semaphore(MAX_THREADS)
+    try:
+        tasks = []
+        for i in user_indices:
+            user_unique_id = f"{user_id_prefix}{i}" if user_id_prefix else None
+            tasks.append(asyncio.create_task(user_task(connector, semaphore, i, user_unique_id)))
+            if SPAWN_INTERVAL:
+                await asyncio.sleep(SPAWN_INTERVAL)
+        await asyncio.gather(*tasks)
+    finally:
+        await connector.close()
+
+
+def run_users(user_indices, user_id_prefix=None):
+    """
+    이벤트 루프를 띄워 사용자들을 실행하고, 남은 Pub/Sub 게시까지 끝난 뒤 반환
+    """
+    asyncio.run(run_all_users(user_indices, user_id_prefix))
+    tg.flush_publisher()
+    logging.info("All user coroutines finished.")
+
+
+def main():
+    # 초기 데이터 (스레드 엔진과 같은 캐시 사용)
+    tg.fetch_products(API_BASE_URL)
+    tg.fetch_categories(API_BASE_URL)
+
+    reporter = run_stats.PeriodicReporter(run_stats.stats, REPORT_INTERVAL).start()
+    started = time.monotonic()
+    run_users(range(NUM_USERS))
+    elapsed = time.monotonic() - started
+    reporter.stop()
+
+    print(run_stats.emit_report("Traffic run", run_stats.stats.snapshot(), elapsed, REPORT_FILE,
+                                extra={"publisher": tg.publisher_stats(), "http": tg.http_transport.stats()}))
+
+
+if __name__ == "__main__":
+    main()
+    print("Traffic generation completed. Check the log file for details.")
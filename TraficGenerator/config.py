@@ -39,6 +39,75 @@ LOG_LEVEL = getattr(logging, config['logging']['level'].upper(), logging.INFO)
 NUM_USERS = config['threads']['num_users']
 MAX_THREADS = config['threads']['max_threads']
 ACTIONS_PER_USER = config['threads']['actions_per_user']
+# 트래픽 생성 엔진: "thread"(기본, 사용자당 OS 스레드) 또는 "asyncio"(사용자당 코루틴, aiohttp 필요)
+ENGINE = config['threads'].get('engine', 'thread')
+# 사용자 시작 간격 (초)
+SPAWN_INTERVAL = config['threads'].get('spawn_interval', 0.05)
+# asyncio 엔진이 공유하는 HTTP 커넥션 풀 크기
+MAX_CONNECTIONS = config['threads'].get('max_connections', 1000)
+# 사용자를 나눠 실행할 워커 프로세스 수 (1: 단일 프로세스, 0: CPU 코어 수)
+# MAX_THREADS / MAX_CONNECTIONS는 프로세스마다 적용됨
+PROCESSES = config['threads'].get('processes', 1)
+# 난수 시드 (없으면 실행마다 임의, 샤드별로 seed + 샤드 번호 사용)
+RANDOM_SEED = config['threads'].get('seed')
+
+# 부하 모드 (config.yaml: load, 없으면 기존 closed-loop)
+# - closed: 사용자마다 응답을 기다린 뒤 TIME_SLEEP_RANGE만큼 쉬고 다음 요청 (기본)
+# - open:   스케줄러가 목표 도착률(rate, 초당)에 맞춰 세션 또는 FSM 단계를 시작
+LOAD_CONFIG = config.get('load') or {}
+LOAD_MODE = LOAD_CONFIG.get('mode', 'closed')
+# open 모드 단위: "sessions"(초당 새 사용자 세션 수) 또는 "steps"(초당 FSM 단계 수)
+LOAD_UNIT = LOAD_CONFIG.get('unit', 'sessions')
+# 도착 간격: "uniform"(등간격) 또는 "poisson"(지수 분포)
+LOAD_ARRIVALS = LOAD_CONFIG.get('arrivals', 'uniform')
+# sessions 단위: 동시에 진행 중인 세션 상한 (넘으면 시작하지 않고 dropped로 기록, 프로세스마다 적용)
+LOAD_MAX_IN_FLIGHT = LOAD_CONFIG.get('max_in_flight', 1000)
+# steps 단위: 단계를 수행하는 동시 사용자 수 (세션이 끝나면 새 사용자로 교체)
+LOAD_USERS = LOAD_CONFIG.get('users', NUM_USERS)
+# 도착률 프로파일 (순서대로 이어 붙임), 예:
+#   - {type: constant, rate: 50, duration: 60}
+#   - {type: ramp, from: 10, to: 200, duration: 120}
+#   - {type: step, from: 50, step: 25, every: 30, steps: 6}
+#   - {type: spike, base: 50, peak: 400, duration: 60, at: 20, length: 5}
+LOAD_PROFILE = LOAD_CONFIG.get('profile', [])
+
+# 실행 리포트 (config.yaml: report)
+REPORT_CONFIG = config.get('report') or {}
+# 주기 리포트 간격 (초, 직전 구간의 처리량 / 백분위 / 오류율을 로그에 기록, 0이면 끔)
+REPORT_INTERVAL = REPORT_CONFIG.get('interval', 10)
+# 종료 리포트 JSON 저장 경로 (빌드 간 비교용, 없으면 로그에만 기록)
+REPORT_FILE = REPORT_CONFIG.get('file')
+
+# Pub/Sub 이벤트 배치 게시 (config.yaml: publisher)
+PUBLISHER_CONFIG = config.get('publisher') or {}
+# 배치 하나의 최대 메시지 수 / 최대 크기(바이트)
+PUBLISH_MAX_MESSAGES = PUBLISHER_CONFIG.get('max_messages', 100)
+PUBLISH_MAX_BYTES = PUBLISHER_CONFIG.get('max_bytes', 1000000)
+# 첫 메시지 이후 배치를 채우려고 기다리는 최대 시간 (ms)
+PUBLISH_LINGER_MS = PUBLISHER_CONFIG.get('linger_ms', 50)
+# 보내기 전 버퍼 크기 (메시지 수), 가득 차면 게시 호출이 최대 block_timeout초 대기 후 버림
+PUBLISH_BUFFER_SIZE = PUBLISHER_CONFIG.get('buffer_size', 10000)
+PUBLISH_BLOCK_TIMEOUT = PUBLISHER_CONFIG.get('block_timeout', 1.0)
+# 5xx / 429 / 네트워크 오류 재시도 횟수와 첫 대기 시간 (ms, 재시도마다 2배)
+PUBLISH_MAX_RETRIES = PUBLISHER_CONFIG.get('max_retries', 3)
+PUBLISH_BACKOFF_MS = PUBLISHER_CONFIG.get('backoff_ms', 100)
+# 종료 시 남은 메시지를 보내며 기다리는 최대 시간 (초)
+PUBLISH_FLUSH_TIMEOUT = PUBLISHER_CONFIG.get('flush_timeout', 10)
+# 이벤트 본문 인코딩 (event_schema.ENCODINGS: "json"(기본, 기존 JSON 형식) / "struct"(바이너리) / "msgpack")
+# struct / msgpack은 본문을 event_schema로 디코딩하는 소비자(PullSubscription.py)만 읽을 수 있으므로 선택해서 사용
+PUBLISH_EVENT_ENCODING = PUBLISHER_CONFIG.get('event_encoding', 'json')
+
+# 요청 기록 (config.yaml: record, 기록한 파일은 traffic_replay.py로 다시 보냄)
+RECORD_CONFIG = config.get('record') or {}
+# 기록 파일 경로 (없으면 기록 안 함, .gz로 끝나면 gzip 압축, 샤드 실행이면 샤드마다 .shardN이 붙음)
+RECORD_FILE = RECORD_CONFIG.get('file')
+
+# 공용 HTTP 커넥션 풀 (config.yaml: http, http_transport.py에서 사용)
+# - api_pool_size: API 서버 연결 수 상한 (기본: 동시 사용자 상한 = max_threads, open 모드면 load.max_in_flight)
+# - pubsub_pool_size: Pub/Sub 연결 수 상한 (기본 4)
+# - pool_block: 연결이 모두 사용 중이면 기다림 (기본 true, false면 임시 연결을 열고 버림)
+# - keepalive: TCP keep-alive 사용 (기본 true)
+HTTP_CONFIG = config.get('http') or {}
 
 API_BASE_URL = config['api']['base_url']
 TIME_SLEEP_RANGE = (config['api']['time_sleep_range']['min'], config['api']['time_sleep_range']['max'])
@@ -0,0 +1,316 @@
+# event_schema.py
+# msgpack 인코딩을 쓰려면 pip install msgpack 필요 (json / struct는 표준 라이브러리만 사용)
+#
+# 트래픽 생성기 이벤트 스키마 (TrafficGenerator.py 게시 / PullSubscription.py 디코딩 공용)
+# 이벤트 하나 = (user_id, event_type, details dict)
+#
+# 메시지 속성
+#   schema:   스키마 버전 (SCHEMA_VERSION)
+#   encoding: 본문 인코딩 (ENCODINGS)
+#     json:    {"user_id", "event_type", "details"} JSON (기존 형식 그대로)
+#     struct:  바이너리 레이아웃 (아래), 반복되는 키 / 상태 이름 / 액션 이름을 1바이트 코드로 바꿈
+#     msgpack: [버전, 이벤트 코드, user_id, [키 코드, 값, ...]]
+#   (user_id / event_type 속성도 기존처럼 함께 붙여 본문을 풀지 않고 필터링할 수 있게 함)
+#
+# struct 레이아웃 (네트워크 바이트 순서)
+#   헤더    !BBB  버전, 이벤트 코드, user_id 길이  (이벤트 코드가 CODE_INLINE이면 헤더 뒤에 u8 길이 + 이벤트 이름)
+#   user_id utf-8
+#   details u8 필드 수, 필드마다 키 코드(u8, CODE_INLINE이면 u8 길이 + 키 이름) + 태그(u8) + 값
+#           TAG_INT !i / TAG_SYMBOL u8 심볼 코드 / TAG_STR !H 길이 + utf-8 / TAG_FLOAT !d / TAG_NONE, TAG_TRUE, TAG_FALSE 값 없음
+#           TAG_JSON !H 길이 + JSON (범위를 넘는 정수, dict / list 등 나머지 값)
+#
+# 코드 표(EVENT_TYPES / FIELDS / SYMBOLS)는 끝에 추가만 함 (순서를 바꾸거나 지우려면 SCHEMA_VERSION을 올리고 표를 새로 둠)
+# 표에 없는 이벤트 / 키 / 문자열 값은 이름을 그대로 실어 보내므로 표를 갱신하지 않아도 깨지지 않음
+
+import json
+import struct
+
+SCHEMA_VERSION = 1
+ENCODINGS = ("json", "struct", "msgpack")
+
+# 표에 없는 이름을 직접 싣는다는 표시
+CODE_INLINE = 0xFF
+
+EVENT_TYPES = (
+    "register", "login", "logout", "delete_user", "unregister", "simulation", "sub_fsm",
+    "top_level_state_transition", "top_level_state_transition_failed",
+    "anon_sub_state_transition", "anon_sub_action",
+    "logged_sub_state_transition", "logged_sub_action",
+)
+
+FIELDS = (
+    "status", "status_code", "error", "action", "product_id", "quantity", "current_state",
+    "from", "to", "proposed_next", "state", "category_name", "query", "rating",
+)
+
+SYMBOLS = (
+    # status
+    "success", "failed", "exception", "done", "max_transitions_reached", "invalid_state", "no_next_candidates",
+    # action
+    "access_main_page", "view_products", "view_product_detail", "view_categories", "view_category", "search",
+    "trigger_error", "view_cart", "view_checkout_history", "add_to_cart", "remove_from_cart",
+    "view_cart_for_remove", "checkout", "add_review",
+    # 상태 이름 (config.py의 상태 머신)
+    "Anon_NotRegistered", "Anon_Registered", "Logged_In", "Logged_Out", "Unregistered", "Done",
+    "Anon_Sub_Initial", "Anon_Sub_Main", "Anon_Sub_Products", "Anon_Sub_ViewProduct", "Anon_Sub_Categories",
+    "Anon_Sub_CategoryList", "Anon_Sub_Search", "Anon_Sub_Error", "Anon_Sub_Done",
+    "Login_Sub_Initial", "Login_Sub_ViewCart", "Login_Sub_CartAdd", "Login_Sub_CartRemove",
+    "Login_Sub_Checkout", "Login_Sub_CheckoutHistory", "Login_Sub_AddReview", "Login_Sub_Error",
+    "Login_Sub_Done",
+)
+
+EVENT_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+FIELD_CODES = {name: code for code, name in enumerate(FIELDS)}
+SYMBOL_CODES = {name: code for code, name in enumerate(SYMBOLS)}
+
+TAG_INT, TAG_SYMBOL, TAG_STR, TAG_FLOAT, TAG_NONE, TAG_TRUE, TAG_FALSE, TAG_JSON = range(8)
+
+_HEADER = struct.Struct("!BBB")
+_INT = struct.Struct("!i")
+_U16 = struct.Struct("!H")
+_FLOAT = struct.Struct("!d")
+
+# details 인코딩 / 디코딩 결과 캐시 (같은 상태 전이 / 액션 조합이 반복되므로 대부분 캐시에서 끝남)
+CACHE_SIZE = 4096
+_encode_cache = {}
+_decode_cache = {}
+
+
+class Event:
+    """
+    이벤트 하나 (메시지마다 만들어지므로 __slots__로 속성 dict를 만들지 않음)
+    """
+    __slots__ = ("user_id", "event_type", "details")
+
+    def __init__(self, user_id, event_type, details):
+        self.user_id = user_id
+        self.event_type = event_type
+        self.details = details
+
+    def to_dict(self):
+        """
+        기존 JSON 본문과 같은 형태의 dict
+        """
+        return {"user_id": self.user_id, "event_type": self.event_type, "details": self.details}
+
+    def __repr__(self):
+        return f"Event({self.user_id!r}, {self.event_type!r}, {self.details!r})"
+
+
+class EncodedEvent:
+    """
+    인코딩된 본문과 메시지 속성
+    """
+    __slots__ = ("data", "attributes")
+
+    def __init__(self, data, attributes):
+        self.data = data
+        self.attributes = attributes
+
+#################################
+# 인코딩
+#################################
+def encode_event(user_id, event_type, details, encoding="json"):
+    """
+    :param encoding: ENCODINGS 중 하나
+    :return: EncodedEvent (data는 bytes, base64 인코딩 전)
+    """
+    if encoding == "struct":
+        data = _encode_struct(user_id, event_type, details)
+    elif encoding == "json":
+        data = json.dumps({"user_id": user_id, "event_type": event_type, "details": details}).encode("utf-8")
+    elif encoding == "msgpack":
+        data = _encode_msgpack(user_id, event_type, details)
+    else:
+        raise ValueError(f"encoding must be one of {ENCODINGS}, got {encoding!r}")
+    attributes = {
+        "user_id": user_id,
+        "event_type": event_type,
+        "schema": str(SCHEMA_VERSION),
+        "encoding": encoding
+    }
+    return EncodedEvent(data, attributes)
+
+
+def _inline_name(name):
+    raw = name.encode("utf-8")
+    if len(raw) > 255:
+        raise ValueError(f"name too long for struct encoding: {name[:32]}...")
+    return bytes((CODE_INLINE, len(raw))) + raw
+
+
+def _encode_value(value):
+    if value is None:
+        return bytes((TAG_NONE,))
+    if value is True:
+        return bytes((TAG_TRUE,))
+    if value is False:
+        return bytes((TAG_FALSE,))
+    if isinstance(value, int) and -2 ** 31 <= value < 2 ** 31:
+        return bytes((TAG_INT,)) + _INT.pack(value)
+    if isinstance(value, float):
+        return bytes((TAG_FLOAT,)) + _FLOAT.pack(value)
+    if isinstance(value, str):
+        code = SYMBOL_CODES.get(value)
+        if code is not None:
+            return bytes((TAG_SYMBOL, code))
+        tag, raw = TAG_STR, value.encode("utf-8")
+    else:
+        tag, raw = TAG_JSON, json.dumps(value).encode("utf-8")
+    if len(raw) > 0xFFFF:
+        raise ValueError("details value too long for struct encoding")
+    return bytes((tag,)) + _U16.pack(len(raw)) + raw
+
+
+def _encode_details(event_type, details):
+    # 값의 타입도 키에 넣음 (True == 1, 4.0 == 4 라서 타입 없이는 다른 태그로 인코딩할 값이 같은 캐시를 씀)
+    key = (event_type, tuple((name, type(value), value) for name, value in details.items()))
+    try:
+        cached = _encode_cache.get(key)
+    except TypeError:
+        # dict / list처럼 해시할 수 없는 값은 캐시하지 않음
+        key, cached = None, None
+    if cached is not None:
+        return cached
+
+    if len(details) > 255:
+        raise ValueError("too many details fields for struct encoding")
+    code = EVENT_CODES.get(event_type)
+    inline_event = b"" if code is not None else _inline_name(event_type)[1:]
+    parts = [bytes((len(details),))]
+    for name, value in details.items():
+        field_code = FIELD_CODES.get(name)
+        parts.append(bytes((field_code,)) if field_code is not None else _inline_name(name))
+        parts.append(_encode_value(value))
+    # (이벤트 코드, 인라인 이벤트 이름, 필드 수 + 필드 바이트)
+    encoded = (CODE_INLINE if code is None else code, inline_event, b"".join(parts))
+    if key is not None:
+        if len(_encode_cache) >= CACHE_SIZE:
+            _encode_cache.clear()
+        _encode_cache[key] = encoded
+    return encoded
+
+
+def _encode_struct(user_id, event_type, details):
+    code, inline_event, body = _encode_details(event_type, details)
+    raw_user = user_id.encode("utf-8")
+    return _HEADER.pack(SCHEMA_VERSION, code, len(raw_user)) + inline_event + raw_user + body
+
+
+def _encode_msgpack(user_id, event_type, details):
+    try:
+        import msgpack
+    except ImportError as e:
+        raise ImportError("msgpack encoding requires msgpack (pip install msgpack)") from e
+    fields = []
+    for name, value in details.items():
+        fields.append(FIELD_CODES.get(name, name))
+        fields.append(value)
+    return msgpack.packb([SCHEMA_VERSION, EVENT_CODES.get(event_type, event_type), user_id, fields])
+
+#################################
+# 디코딩
+#################################
+def decode_event(data, encoding):
+    """
+    :param data: base64를 푼 본문 (bytes)
+    :param encoding: 메시지 속성의 encoding
+    :return: Event
+    """
+    if encoding == "struct":
+        return _decode_struct(data)
+    if encoding == "json":
+        body = json.loads(data)
+        return Event(body.get("user_id"), body.get("event_type"), body.get("details", {}))
+    if encoding == "msgpack":
+        return _decode_msgpack(data)
+    raise ValueError(f"Unknown event encoding: {encoding!r}")
+
+
+def _decode_struct(data):
+    version, event_code, user_length = _HEADER.unpack_from(data)
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported event schema version: {version}")
+    offset = _HEADER.size
+    if event_code == CODE_INLINE:
+        length = data[offset]
+        event_type = data[offset + 1:offset + 1 + length].decode("utf-8")
+        offset += 1 + length
+    else:
+        event_type = EVENT_TYPES[event_code]
+    user_id = data[offset:offset + user_length].decode("utf-8")
+    offset += user_length
+
+    # user_id를 뺀 나머지(이벤트 + details)는 반복이 많으므로 바이트 그대로 캐시 키로 씀
+    key = (event_type, data[offset:])
+    details = _decode_cache.get(key)
+    if details is None:
+        details = _decode_details(data, offset)
+        if len(_decode_cache) >= CACHE_SIZE:
+            _decode_cache.clear()
+        _decode_cache[key] = details
+    # 호출한 쪽에서 고쳐도 캐시가 바뀌지 않도록 복사본을 넘김
+    return Event(user_id, event_type, dict(details))
+
+
+def _decode_details(data, offset):
+    count = data[offset]
+    offset += 1
+    details = {}
+    for _ in range(count):
+        code = data[offset]
+        offset += 1
+        if code == CODE_INLINE:
+            length = data[offset]
+            name = data[offset + 1:offset + 1 + length].decode("utf-8")
+            offset += 1 + length
+        else:
+            name = FIELDS[code]
+        tag = data[offset]
+        offset += 1
+        if tag == TAG_SYMBOL:
+            value = SYMBOLS[data[offset]]
+            offset += 1
+        elif tag == TAG_INT:
+            value = _INT.unpack_from(data, offset)[0]
+            offset += _INT.size
+        elif tag == TAG_STR:
+            length = _U16.unpack_from(data, offset)[0]
+            offset += _U16.size
+            value = data[offset:offset + length].decode("utf-8")
+            offset += length
+        elif tag == TAG_JSON:
+            length = _U16.unpack_from(data, offset)[0]
+            offset += _U16.size
+            value = json.loads(data[offset:offset + length])
+            offset += length
+        elif tag == TAG_FLOAT:
+            value = _FLOAT.unpack_from(data, offset)[0]
+            offset += _FLOAT.size
+        elif tag == TAG_NONE:
+            value = None
+        elif tag == TAG_TRUE:
+            value = True
+        elif tag == TAG_FALSE:
+            value = False
+        else:
+            raise ValueError(f"Unknown value tag: {tag}")
+        details[name] = value
+    return details
+
+
+def _decode_msgpack(data):
+    try:
+        import msgpack
+    except ImportError as e:
+        raise ImportError("msgpack encoding requires msgpack (pip install msgpack)") from e
+    version, event_type, user_id, fields = msgpack.unpackb(data)
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported event schema version: {version}")
+    if isinstance(event_type, int):
+        event_type = EVENT_TYPES[event_type]
+    details = {}
+    for i in range(0, len(fields), 2):
+        name = fields[i]
+        details[FIELDS[name] if isinstance(name, int) else name] = fields[i + 1]
+    return Event(user_id, event_type, details)
@@ -0,0 +1,164 @@
+# http_transport.py
+#
+# 트래픽 생성기 공용 HTTP 커넥션 풀 (config.yaml: http)
+# - API 서버와 Pub/Sub 엔드포인트에 각각 어댑터(커넥션 풀) 하나를 두고, 모든 사용자 세션(TrackedSession)과
+#   Pub/Sub 게시기가 이를 공유한다. 쿠키는 세션마다 따로, TCP(Pub/Sub는 TLS까지) 연결만 공유한다.
+# - pool_block: 풀 크기만큼만 연결을 열고, 모두 사용 중이면 빈 연결을 기다린다.
+#   (막지 않으면 풀이 찼을 때 연결을 새로 열고 쓰고 버리므로, 사용자 수가 많으면 TIME_WAIT로 임시 포트가 고갈됨)
+# - 연결에 TCP keep-alive를 켜서 유휴 연결이 중간 장비에서 끊기는 것을 줄인다.
+# - stats(): 호스트별 요청 수 / 새 연결 수 / 재사용 수 (재사용률이 낮으면 풀 크기나 서버 keep-alive 설정 확인)
+
+import logging
+import os
+import socket
+import threading
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+# config.py 불러오기
+from config import *
+
+# 어댑터 하나가 유지하는 호스트별 풀 수 (호스트가 이보다 많으면 오래된 풀부터 닫히고 통계도 사라짐)
+POOLS_PER_ADAPTER = 16
+
+# 연결 소켓 옵션 (urllib3 기본 TCP_NODELAY + keep-alive)
+KEEPALIVE_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+
+class SharedAdapter(HTTPAdapter):
+    """
+    여러 세션이 공유하는 어댑터
+    세션을 닫아도(with TrackedSession() ...) 풀은 닫지 않고, shutdown()에서만 닫음
+    """
+    def __init__(self, name, pool_size, block=True, keepalive=True):
+        self.name = name
+        self.keepalive = keepalive
+        super().__init__(pool_connections=POOLS_PER_ADAPTER, pool_maxsize=pool_size, pool_block=block)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        if self.keepalive:
+            pool_kwargs.setdefault("socket_options", KEEPALIVE_SOCKET_OPTIONS)
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+
+    def close(self):
+        pass
+
+    def shutdown(self):
+        super().close()
+
+    def stats(self):
+        """
+        :return: {"host:port": {"requests", "connections", "reused", "idle"}}
+        """
+        result = {}
+        pools = self.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            entry = result.setdefault(f"{pool.host}:{pool.port}", {"requests": 0, "connections": 0, "reused": 0,
+                                                                   "idle": 0})
+            entry["requests"] += pool.num_requests
+            entry["connections"] += pool.num_connections
+            entry["reused"] += max(pool.num_requests - pool.num_connections, 0)
+            # 풀에 돌아와 있는 연결 (아직 열지 않은 자리는 None)
+            entry["idle"] += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+        return result
+
+
+def base_url(url):
+    """
+    "https://host:port/v1/..." -> "https://host:port/" (어댑터를 붙일 접두어)
+    """
+    scheme, _, rest = url.partition("://")
+    return f"{scheme}://{rest.split('/', 1)[0]}/"
+
+#################################
+# 프로세스 공용 어댑터
+#################################
+_settings = dict(HTTP_CONFIG)
+_adapters = {}
+_adapters_pid = None
+_adapters_lock = threading.Lock()
+
+
+def configure(**overrides):
+    """
+    풀 설정을 바꿈 (예: 재생기가 동시 스트림 수에 맞춰 api_pool_size 지정), 이미 만든 어댑터는 닫고 다시 만듦
+    """
+    _settings.update(overrides)
+    shutdown()
+
+
+def _api_pool_size():
+    size = _settings.get("api_pool_size")
+    if size:
+        return size
+    # 동시에 요청을 보낼 수 있는 사용자 수만큼
+    return LOAD_MAX_IN_FLIGHT if LOAD_MODE == "open" else MAX_THREADS
+
+
+def _adapter(name):
+    global _adapters_pid
+    with _adapters_lock:
+        # fork된 샤드 프로세스가 부모의 소켓을 이어 쓰지 않도록 프로세스마다 새로 만듦
+        if _adapters_pid != os.getpid():
+            _adapters.clear()
+            _adapters_pid = os.getpid()
+        adapter = _adapters.get(name)
+        if adapter is None:
+            pool_size = _api_pool_size() if name == "api" else _settings.get("pubsub_pool_size", 4)
+            block = _settings.get("pool_block", True)
+            adapter = SharedAdapter(name, pool_size, block=block, keepalive=_settings.get("keepalive", True))
+            _adapters[name] = adapter
+            logging.info(f"HTTP pool '{name}': maxsize={pool_size}, block={block}")
+        return adapter
+
+
+def api_adapter():
+    return _adapter("api")
+
+
+def pubsub_adapter():
+    return _adapter("pubsub")
+
+
+def mount(session):
+    """
+    세션의 API 서버 요청에 공용 어댑터를 붙임 (그 외 호스트는 세션 기본 어댑터)
+    Pub/Sub 게시기는 pubsub_adapter()를 직접 받음
+    """
+    session.mount(base_url(API_BASE_URL), api_adapter())
+    return session
+
+
+def stats():
+    """
+    :return: {"api": {host: {...}}, "pubsub": {host: {...}}}
+    """
+    with _adapters_lock:
+        adapters = dict(_adapters) if _adapters_pid == os.getpid() else {}
+    return {name: adapter.stats() for name, adapter in adapters.items()}
+
+
+def merge_stats(stats_list):
+    """
+    샤드별 stats()를 풀 / 호스트별로 합침
+    """
+    merged = {}
+    for entry in stats_list:
+        for name, hosts in entry.items():
+            for host, counters in hosts.items():
+                target = merged.setdefault(name, {}).setdefault(host, {})
+                for key, value in counters.items():
+                    target[key] = target.get(key, 0) + value
+    return merged
+
+
+def shutdown():
+    with _adapters_lock:
+        adapters = list(_adapters.values())
+        _adapters.clear()
+    for adapter in adapters:
+        adapter.shutdown()
@@ -0,0 +1,688 @@
+# offline_synth.py
+# pip install numpy 필요
+#
+# 오프라인 세션 합성기 (API 서버 없이 분석 파이프라인용 대량 데이터 생성)
+# TrafficGenerator.py와 같은 FSM(STATE_TRANSITIONS / ANON_SUB_TRANSITIONS / LOGGED_SUB_TRANSITIONS),
+# CATEGORY_PREFERENCE, SEARCH_KEYWORDS로 사용자 여정을 뽑되, 실제 요청과 think time 대기 없이 시각만 계산해 파일로 쓴다.
+#
+# - 상태 전이는 NumPy로 청크 안의 모든 사용자(하위 FSM은 모든 호출)를 한 번에 한 단계씩 뽑음
+# - 청크마다 파일을 따로 쓰므로 --processes로 여러 프로세스에서 나눠 생성 가능
+# - 출력 (out_dir 아래, 청크 번호별)
+#     events-00000.jsonl    Pub/Sub 이벤트 (PullSubscription의 decode_message / 싱크 레코드와 같은 형태)
+#     access-00000.jsonl    nginx custom_json 형식 접근 로그 (한 줄에 하나)
+#     db/<table>-00000.tsv  shopdb 테이블 적재용 (LOAD DATA 기본 형식: 탭 구분, NULL은 \N)
+#     load.sql              db/*.tsv를 shopdb에 적재하는 LOAD DATA LOCAL INFILE 문
+#                           (mysql --local-infile=1 -h $MYSQL_HOST -u $MYSQL_USER -p shopdb < load.sql)
+#
+# 단순화한 부분
+# - API 호출은 모두 성공으로 봄 (/error만 500), 응답 시간은 엔드포인트별 로그 정규 분포
+# - 세션은 로그인 구간마다 하나 (로그아웃하면 쿠키가 지워져 다음 요청부터 새 세션)
+# - cart_id는 청크마다 겹치지 않게 매기므로 빈 shopdb에 적재하는 것을 기준으로 함
+# - 탈퇴(/delete_user)는 최종 상태만 씀: users 행과 장바구니(ON DELETE CASCADE)는 남기지 않고,
+#   users_logs의 DELETED 행과 그 사용자의 열린 세션 logout_time만 남김 (API 서버와 같은 결과)
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# config.py 불러오기
+from config import *
+
+# 컴파일된 전이표(검증 포함)를 그대로 사용
+import TrafficGenerator as tg
+
+# 하위 FSM 한 번의 최대 단계 수 (실제 실행에는 제한이 없지만, 행렬 크기를 정하려고 둠)
+SUB_FSM_MAX_STEPS = 100
+
+# 엔드포인트별 응답 시간 중앙값(초)과 응답 크기(바이트)
+ENDPOINT_PROFILE = {
+    "/":                 (0.004, 512),
+    "/add_user":         (0.015, 64),
+    "/delete_user":      (0.015, 64),
+    "/login":            (0.012, 64),
+    "/logout":           (0.008, 64),
+    "/products":         (0.010, 2600),
+    "/product":          (0.012, 420),
+    "/categories":       (0.006, 180),
+    "/category":         (0.010, 900),
+    "/search":           (0.025, 700),
+    "/cart/add":         (0.014, 90),
+    "/cart/view":        (0.010, 350),
+    "/cart/remove":      (0.014, 90),
+    "/checkout":         (0.030, 80),
+    "/checkout_history": (0.020, 800),
+    "/add_review":       (0.012, 60),
+    "/error":            (0.002, 265),
+}
+# 응답 시간 로그 정규 분포의 sigma
+LATENCY_SIGMA = 0.5
+
+# API 서버가 없을 때 쓰는 상품 목록 (DataBase.sh 초기 데이터와 같음)
+SEED_PRODUCTS = [
+    ("101", 79.99, "Electronics"), ("102", 49.99, "Electronics"), ("103", 59.99, "Fashion"),
+    ("104", 39.99, "Fashion"), ("105", 9.99, "Home"), ("106", 29.99, "Electronics"),
+    ("107", 19.99, "Fashion"), ("108", 25.00, "Electronics"), ("109", 89.99, "Gaming"),
+    ("110", 299.00, "Gaming"), ("111", 35.00, "Books"), ("112", 12.99, "Books"),
+    ("113", 15.99, "Fashion"), ("114", 79.00, "Home"), ("115", 99.99, "Home"),
+    ("116", 129.99, "Home"), ("117", 49.99, "Fashion"), ("118", 699.99, "Electronics"),
+    ("119", 399.99, "Electronics"), ("120", 59.99, "Fashion"), ("121", 59.99, "Gaming"),
+    ("122", 24.99, "Books"), ("123", 14.99, "Books"), ("124", 19.99, "Fashion"),
+]
+
+# db/*.tsv 테이블별 컬럼 (load.sql의 컬럼 목록, 적재 순서 = 외래 키 순서)
+DB_TABLES = {
+    "users":       ("user_id", "name", "email", "gender", "age"),
+    "users_logs":  ("user_id", "event_type", "event_time"),
+    "sessions":    ("session_id", "user_id", "created_at", "login_time", "logout_time", "last_active"),
+    "search_logs": ("session_id", "search_query", "searched_at"),
+    "cart":        ("cart_id", "session_id", "user_id", "product_id", "quantity", "price", "added_at", "updated_at"),
+    "cart_logs":   ("cart_id", "session_id", "user_id", "product_id", "old_quantity", "new_quantity", "price",
+                    "event_type", "event_time"),
+    "orders":      ("order_id", "user_id", "session_id", "product_id", "price", "quantity", "order_time"),
+    "reviews":     ("review_id", "user_id", "session_id", "product_id", "rating", "review_time"),
+}
+
+# 청크마다 cart_id 구간을 나눔
+CART_IDS_PER_CHUNK = 10_000_000
+
+#################################
+# 벡터화된 Markov chain
+#################################
+class ChainMatrix:
+    """
+    tg.compile_transitions()로 만든 전이표 -> 상태 번호와 누적 확률 행렬
+    sample()은 아직 끝나지 않은 모든 체인을 한 단계씩 함께 진행
+    """
+    def __init__(self, tables, stop_states):
+        """
+        :param tables: 상태 -> tg.TransitionTable
+        :param stop_states: 도달하면 멈추는 상태 (다음 후보가 없는 상태도 멈춤)
+        """
+        self.states = list(tables)
+        self.index = {state: i for i, state in enumerate(self.states)}
+        size = len(self.states)
+        self.cum = np.ones((size, size))
+        self.terminal = np.zeros(size, dtype=bool)
+        for state, table in tables.items():
+            i = self.index[state]
+            if state in stop_states or not len(table):
+                self.terminal[i] = True
+                continue
+            weights = np.zeros(size)
+            for next_state, low, high in zip(table.states, [0.0] + table.cum_weights[:-1], table.cum_weights):
+                weights[self.index[next_state]] += high - low
+            self.cum[i] = np.cumsum(weights) / table.total
+        # 부동소수 오차로 마지막 값이 1보다 작아 범위를 벗어나지 않도록
+        self.cum[:, -1] = 1.0
+
+    def sample(self, start, max_steps, rng):
+        """
+        :param start: 시작 상태 번호 배열
+        :return: (체인 수, max_steps + 1) 상태 번호 행렬, 멈춘 뒤는 -1
+        """
+        count = len(start)
+        out = np.full((count, max_steps + 1), -1, dtype=np.int16)
+        current = np.asarray(start, dtype=np.int16).copy()
+        out[:, 0] = current
+        active = np.nonzero(~self.terminal[current])[0]
+        for step in range(1, max_steps + 1):
+            if not active.size:
+                break
+            u = rng.random(active.size)
+            nxt = (self.cum[current[active]] <= u[:, None]).sum(axis=1).astype(np.int16)
+            current[active] = nxt
+            out[active, step] = nxt
+            active = active[~self.terminal[nxt]]
+        return out
+
+
+def row_states(row, states):
+    """
+    sample() 결과 한 행 -> 상태 이름 리스트
+    """
+    return [states[i] for i in row.tolist() if i >= 0]
+
+#################################
+# 상품 / 선호 카테고리
+#################################
+def load_products(path=None):
+    """
+    :param path: /products 응답을 저장한 JSON 파일 (없으면 SEED_PRODUCTS)
+    :return: [(id, price, category), ...]
+    """
+    if not path:
+        return list(SEED_PRODUCTS)
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("products", [])
+    return [(str(p.get("id")), float(p.get("price", 0) or 0), p.get("category", "")) for p in data]
+
+
+def build_pools(products):
+    """
+    (gender, age_segment) -> 선호 카테고리 상품 번호 목록 (없으면 전체), tg.build_product_pools()와 같은 규칙
+    """
+    every = list(range(len(products)))
+    pools = {}
+    for gender, segments in CATEGORY_PREFERENCE.items():
+        for age_segment, cat_list in segments.items():
+            cats = set(cat_list)
+            pools[(gender, age_segment)] = [i for i, p in enumerate(products) if p[2] in cats] or every
+    return pools, every
+
+#################################
+# 청크 하나 합성
+#################################
+class ChunkWriter:
+    """
+    청크 하나의 출력 파일 (줄을 모아 두었다가 flush()에서 한 번에 씀)
+    """
+    def __init__(self, out_dir, chunk, outputs, compress):
+        suffix = f"-{chunk:05d}" + (".jsonl.gz" if compress else ".jsonl")
+        opener = (lambda path: gzip.open(path, "wt", encoding="utf-8", compresslevel=1)) if compress \
+            else (lambda path: open(path, "w", encoding="utf-8", buffering=1024 * 1024))
+        self.files = {}
+        self.buffers = {}
+        if "events" in outputs:
+            self.files["events"] = opener(os.path.join(out_dir, "events" + suffix))
+        if "access" in outputs:
+            self.files["access"] = opener(os.path.join(out_dir, "access" + suffix))
+        if "db" in outputs:
+            os.makedirs(os.path.join(out_dir, "db"), exist_ok=True)
+            for table in DB_TABLES:
+                path = os.path.join(out_dir, "db", f"{table}-{chunk:05d}.tsv")
+                self.files[table] = open(path, "w", encoding="utf-8", buffering=1024 * 1024)
+        for name in self.files:
+            self.buffers[name] = []
+        self.counts = {name: 0 for name in self.files}
+
+    def add(self, name, line):
+        buffer = self.buffers.get(name)
+        if buffer is not None:
+            buffer.append(line)
+
+    def row(self, table, *values):
+        buffer = self.buffers.get(table)
+        if buffer is not None:
+            buffer.append("\t".join("\\N" if v is None else str(v) for v in values) + "\n")
+
+    def flush(self):
+        for name, buffer in self.buffers.items():
+            if buffer:
+                self.files[name].write("".join(buffer))
+                self.counts[name] += len(buffer)
+                buffer.clear()
+
+    def close(self):
+        self.flush()
+        for f in self.files.values():
+            f.close()
+
+
+class TimeFormatter:
+    """
+    초 단위로 같은 시각 문자열은 다시 만들지 않음 (사용자 하나의 요청은 시간순이라 대부분 재사용)
+    """
+    __slots__ = ("second", "nginx", "iso", "db")
+
+    def __init__(self):
+        self.second = None
+
+    def update(self, ts):
+        second = int(ts)
+        if second != self.second:
+            t = time.gmtime(second)
+            self.second = second
+            self.nginx = time.strftime("%d/%b/%Y:%H:%M:%S +0000", t)
+            self.iso = time.strftime("%Y-%m-%dT%H:%M:%S", t)
+            self.db = time.strftime("%Y-%m-%d %H:%M:%S", t)
+
+
+class Journey:
+    """
+    사용자 한 명의 여정을 재생하며 요청 / 이벤트 / DB 행을 씀 (실제 요청 대신 시각만 진행)
+    """
+    __slots__ = ("ctx", "user_id", "gender", "age", "age_segment", "now", "ip", "session_id", "session_row",
+                 "cookie_session", "cookie_user", "cart", "fmt", "registered", "deleted", "user_row")
+
+    def __init__(self, ctx, user_id, gender, age, arrival):
+        self.ctx = ctx
+        self.user_id = user_id
+        self.gender = gender
+        self.age = age
+        self.age_segment = tg.get_age_segment(age)
+        self.now = arrival
+        self.ip = f"10.{ctx.rand.randrange(256)}.{ctx.rand.randrange(256)}.{ctx.rand.randrange(1, 255)}"
+        self.session_id = None
+        self.session_row = None
+        self.cookie_session = ""
+        self.cookie_user = ""
+        # product_id -> [cart_id, quantity, price, added_at]
+        self.cart = {}
+        self.fmt = TimeFormatter()
+        self.registered = False
+        self.deleted = False
+        # users 테이블 행 (탈퇴하지 않았으면 finish()에서 씀)
+        self.user_row = None
+
+    #################################
+    # 세션 / 요청 / 이벤트
+    #################################
+    def _session(self):
+        if self.session_id is None:
+            self.fmt.update(self.now)
+            self.session_id = self.ctx.new_uuid()
+            # [session_id, user_id, created_at, login_time, logout_time, last_active]
+            self.session_row = [self.session_id, None, self.fmt.db, None, None, self.fmt.db]
+        return self.session_id
+
+    def _end_session(self):
+        if self.session_row is not None:
+            self.ctx.out.row("sessions", *self.session_row)
+        self.session_id = None
+        self.session_row = None
+        self.cookie_session = ""
+        self.cart = {}
+
+    def request(self, method, endpoint, query="", status=200, product_id="", category=""):
+        """
+        요청 하나: 응답 시간만큼 시각을 진행하고 접근 로그 한 줄을 남김
+        """
+        ctx = self.ctx
+        median, size = ENDPOINT_PROFILE[endpoint]
+        latency = ctx.rand.lognormvariate(0, LATENCY_SIGMA) * median
+        self._session()
+        self.now += latency
+        self.fmt.update(self.now)
+        self.session_row[5] = self.fmt.db
+        if "access" in ctx.outputs:
+            uri = endpoint + ("?" + query if query else "")
+            ctx.out.add("access", json.dumps({
+                "timestamp": self.fmt.nginx,
+                "remote_addr": self.ip,
+                "request": f"{method} {uri} HTTP/1.1",
+                "status": str(status),
+                "body_bytes_sent": str(size),
+                "http_referer": "",
+                "http_user_agent": ctx.user_agent,
+                "session_id": self.cookie_session,
+                "user_id": self.cookie_user,
+                "request_time": f"{latency:.3f}",
+                "upstream_response_time": f"{latency * 0.95:.3f}",
+                "endpoint": endpoint,
+                "method": method,
+                "query_params": query,
+                "product_id": product_id,
+                "category": category,
+                "x_forwarded_for": "",
+                "host": ctx.host
+            }, ensure_ascii=False) + "\n")
+        # 첫 응답 이후부터 쿠키로 세션을 보냄
+        self.cookie_session = self.session_id
+
+    def event(self, event_type, details):
+        ctx = self.ctx
+        if "events" not in ctx.outputs:
+            return
+        self.fmt.update(self.now)
+        ctx.event_seq += 1
+        ctx.out.add("events", json.dumps({
+            "data": {"user_id": self.user_id, "event_type": event_type, "details": details},
+            "attributes": {"user_id": self.user_id, "event_type": event_type},
+            "message_id": f"synth-{ctx.chunk}-{ctx.event_seq}",
+            "publish_time": f"{self.fmt.iso}.{int(self.now % 1 * 1000):03d}Z"
+        }, ensure_ascii=False) + "\n")
+
+    def think(self):
+        self.now += self.ctx.rand.uniform(*TIME_SLEEP_RANGE)
+
+    #################################
+    # 상위 FSM 동작 (do_top_level_action_and_confirm과 같은 분기, 모두 성공)
+    #################################
+    def top_level_action(self, current, nxt):
+        out = self.ctx.out
+        if current == "Anon_NotRegistered" and nxt == "Anon_Registered":
+            self.request("POST", "/add_user", status=201)
+            self.registered = True
+            self.user_row = (self.user_id, f"TestUser_{self.user_id}", f"{self.user_id}@example.com",
+                             self.gender, self.age)
+            out.row("users_logs", self.user_id, "CREATED", self.fmt.db)
+            self.event("register", {"status": "success"})
+        elif current == "Anon_Registered" and nxt == "Logged_In":
+            self.request("POST", "/login")
+            self.cookie_user = self.user_id
+            self.session_row[1] = self.user_id
+            self.session_row[3] = self.fmt.db
+            self.event("login", {"status": "success"})
+        elif current == "Logged_In" and nxt == "Logged_Out":
+            self.request("POST", "/logout")
+            self.session_row[4] = self.fmt.db
+            self.event("logout", {"status": "success"})
+            # 쿠키가 지워져 다음 요청부터 새 세션
+            self.cookie_user = ""
+            self._end_session()
+        elif nxt == "Unregistered" and current in ("Logged_In", "Logged_Out"):
+            self.request("POST", "/delete_user")
+            self.deleted = True
+            out.row("users_logs", self.user_id, "DELETED", self.fmt.db)
+            # API 서버처럼 열린 세션은 로그아웃 처리하고, 장바구니는 users 행과 함께 지워짐 (ON DELETE CASCADE)
+            if self.session_row[1] == self.user_id and self.session_row[4] is None:
+                self.session_row[4] = self.fmt.db
+            self.cart = {}
+            self.event("delete_user", {"status": "success"})
+
+    #################################
+    # 하위 FSM 동작 (perform_*_sub_action과 같은 요청 / 이벤트)
+    #################################
+    def anon_action(self, state):
+        ctx = self.ctx
+        if state == "Anon_Sub_Main":
+            self.request("GET", "/")
+            self.event("anon_sub_action", {"action": "access_main_page", "status_code": 200})
+        elif state == "Anon_Sub_Products":
+            self.request("GET", "/products")
+            self.event("anon_sub_action", {"action": "view_products", "status_code": 200})
+        elif state == "Anon_Sub_ViewProduct":
+            pid = ctx.products[ctx.rand.randrange(len(ctx.products))][0]
+            self.request("GET", "/product", f"id={pid}", product_id=pid)
+            self.event("anon_sub_action", {"action": "view_product_detail", "product_id": pid, "status_code": 200})
+        elif state == "Anon_Sub_Categories":
+            self.request("GET", "/categories")
+            self.event("anon_sub_action", {"action": "view_categories", "status_code": 200})
+        elif state == "Anon_Sub_CategoryList":
+            cat = ctx.categories[ctx.rand.randrange(len(ctx.categories))]
+            self.request("GET", "/category", f"name={cat}", category=cat)
+            self.event("anon_sub_action", {"action": "view_category", "category_name": cat, "status_code": 200})
+        elif state == "Anon_Sub_Search":
+            q = self._search()
+            self.event("anon_sub_action", {"action": "search", "query": q, "status_code": 200})
+        elif state == "Anon_Sub_Error":
+            self.request("GET", "/error", status=500)
+            self.event("anon_sub_action", {"action": "trigger_error", "status_code": 500})
+
+    def _search(self):
+        ctx = self.ctx
+        q = SEARCH_KEYWORDS[ctx.rand.randrange(len(SEARCH_KEYWORDS))]
+        self.request("GET", "/search", "query=" + q.replace(" ", "%20"))
+        ctx.out.row("search_logs", self.session_id, q, self.fmt.db)
+        return q
+
+    def logged_action(self, state):
+        ctx = self.ctx
+        out = ctx.out
+        if state == "Login_Sub_ViewCart":
+            self.request("GET", "/cart/view")
+            self.event("logged_sub_action", {"action": "view_cart", "status_code": 200})
+        elif state == "Login_Sub_CheckoutHistory":
+            self.request("GET", "/checkout_history")
+            self.event("logged_sub_action", {"action": "view_checkout_history", "status_code": 200})
+        elif state == "Login_Sub_CartAdd":
+            pid, price = self._preferred_product()
+            qty = ctx.rand.randint(1, 3)
+            self.request("POST", "/cart/add")
+            item = self.cart.get(pid)
+            if item:
+                old = item[1]
+                item[1] += qty
+                out.row("cart_logs", item[0], self.session_id, self.user_id, pid, old, item[1], price, "UPDATED",
+                        self.fmt.db)
+            else:
+                ctx.cart_seq += 1
+                self.cart[pid] = [ctx.cart_seq, qty, price, self.fmt.db]
+                out.row("cart_logs", ctx.cart_seq, self.session_id, self.user_id, pid, 0, qty, price, "ADDED",
+                        self.fmt.db)
+            self.event("logged_sub_action", {"action": "add_to_cart", "product_id": pid, "quantity": qty,
+                                             "status": "success"})
+        elif state == "Login_Sub_CartRemove":
+            self.request("GET", "/cart/view")
+            if self.cart:
+                pid = list(self.cart)[ctx.rand.randrange(len(self.cart))]
+                item = self.cart[pid]
+                qty = ctx.rand.randint(1, item[1])
+                self.request("POST", "/cart/remove")
+                old = item[1]
+                item[1] -= qty
+                out.row("cart_logs", item[0], self.session_id, self.user_id, pid, old, item[1], item[2],
+                        "REMOVED" if item[1] == 0 else "UPDATED", self.fmt.db)
+                if item[1] == 0:
+                    del self.cart[pid]
+                self.event("logged_sub_action", {"action": "remove_from_cart", "product_id": pid, "quantity": qty,
+                                                 "status": "success"})
+        elif state == "Login_Sub_Checkout":
+            self.request("POST", "/checkout")
+            for pid, (cart_id, qty, price, _) in self.cart.items():
+                out.row("orders", ctx.new_uuid(), self.user_id, self.session_id, pid, price, qty, self.fmt.db)
+                out.row("cart_logs", cart_id, self.session_id, self.user_id, pid, qty, 0, price, "CHECKED_OUT",
+                        self.fmt.db)
+            self.cart = {}
+            self.event("logged_sub_action", {"action": "checkout", "status": "success"})
+        elif state == "Login_Sub_AddReview":
+            pid, _ = self._preferred_product()
+            rating = ctx.rand.randint(1, 5)
+            self.request("POST", "/add_review")
+            out.row("reviews", ctx.new_uuid(), self.user_id, self.session_id, pid, rating, self.fmt.db)
+            self.event("logged_sub_action", {"action": "add_review", "product_id": pid, "rating": rating,
+                                             "status": "success"})
+        elif state == "Login_Sub_Error":
+            self.request("GET", "/error", status=500)
+            self.event("logged_sub_action", {"action": "trigger_error", "status_code": 500})
+
+    def _preferred_product(self):
+        ctx = self.ctx
+        pool = ctx.pools.get((self.gender, self.age_segment), ctx.every_product)
+        product = ctx.products[pool[ctx.rand.randrange(len(pool))]]
+        return product[0], product[1]
+
+    def finish(self):
+        ctx = self.ctx
+        # 탈퇴한 사용자는 users 행도 장바구니도 남기지 않음 (/delete_user가 지운 뒤의 상태)
+        if not self.deleted:
+            if self.user_row is not None:
+                ctx.out.row("users", *self.user_row)
+            for pid, (cart_id, qty, price, added_at) in self.cart.items():
+                ctx.out.row("cart", cart_id, self.session_id, self.user_id, pid, qty, price, added_at, self.fmt.db)
+        self._end_session()
+
+
+class ChunkContext:
+    """
+    청크 하나를 합성하는 동안 공유하는 난수 / 출력 / 상품 정보
+    """
+    def __init__(self, chunk, seed, outputs, out, products, host):
+        self.chunk = chunk
+        self.rand = random.Random(seed)
+        self.outputs = outputs
+        self.out = out
+        self.products = products
+        self.categories = sorted({p[2] for p in products})
+        self.pools, self.every_product = build_pools(products)
+        self.host = host
+        self.user_agent = "python-requests/2.31.0"
+        self.event_seq = 0
+        self.cart_seq = chunk * CART_IDS_PER_CHUNK
+
+    def new_uuid(self):
+        return str(uuid.UUID(int=self.rand.getrandbits(128), version=4))
+
+
+def synthesize_chunk(chunk, users, seed, start_ts, duration, out_dir, outputs, compress, products, host,
+                     user_id_prefix):
+    """
+    사용자 users명의 여정을 합성해 청크 파일로 씀 (프로세스 풀에서 실행)
+    :return: 파일별 줄 수
+    """
+    rng = np.random.default_rng(seed)
+    out = ChunkWriter(out_dir, chunk, outputs, compress)
+    ctx = ChunkContext(chunk, seed, outputs, out, products, host)
+
+    # 1) 상위 FSM: 모든 사용자를 한 번에 (Done / Unregistered에서 멈춤, 최대 ACTIONS_PER_USER 단계)
+    top = ChainMatrix(tg.STATE_TABLES, {"Done", "Unregistered"})
+    top_paths = top.sample(np.full(users, top.index["Anon_NotRegistered"]), ACTIONS_PER_USER, rng)
+
+    # 2) 하위 FSM: 상위 경로에서 하위 FSM에 들어가는 횟수만큼 한 번에
+    anon = ChainMatrix(tg.ANON_SUB_TABLES, {"Anon_Sub_Done"})
+    logged = ChainMatrix(tg.LOGGED_SUB_TABLES, {"Login_Sub_Done"})
+    anon_codes = [top.index[s] for s in ("Anon_NotRegistered", "Anon_Registered")]
+    logged_code = top.index["Logged_In"]
+    # 0번 열은 시작 상태라 하위 FSM을 돌리지 않음
+    visited = top_paths[:, 1:]
+    anon_count = int(np.isin(visited, anon_codes).sum())
+    logged_count = int((visited == logged_code).sum())
+    anon_paths = anon.sample(np.full(anon_count, anon.index["Anon_Sub_Initial"]), SUB_FSM_MAX_STEPS, rng)
+    logged_paths = logged.sample(np.full(logged_count, logged.index["Login_Sub_Initial"]), SUB_FSM_MAX_STEPS, rng)
+
+    # 3) 사용자 속성 / 도착 시각
+    genders = rng.choice(np.array(["F", "M"]), users)
+    ages = rng.integers(18, 71, users)
+    arrivals = start_ts + np.sort(rng.random(users)) * duration
+
+    # 4) 경로를 재생하며 기록
+    anon_next = 0
+    logged_next = 0
+    for i in range(users):
+        user = Journey(ctx, f"{user_id_prefix}{chunk}_{i}", str(genders[i]), int(ages[i]), float(arrivals[i]))
+        path = row_states(top_paths[i], top.states)
+        for step in range(1, len(path)):
+            current, nxt = path[step - 1], path[step]
+            user.top_level_action(current, nxt)
+            if nxt != current:
+                user.event("top_level_state_transition", {"from": current, "to": nxt})
+            else:
+                user.event("top_level_state_transition_failed", {"current_state": current, "proposed_next": nxt})
+
+            if nxt in ("Anon_NotRegistered", "Anon_Registered"):
+                sub_path = row_states(anon_paths[anon_next], anon.states)
+                anon_next += 1
+                for sub_step in range(len(sub_path) - 1):
+                    user.anon_action(sub_path[sub_step])
+                    user.event("anon_sub_state_transition", {"current_state": sub_path[sub_step + 1]})
+                    user.think()
+            elif nxt == "Logged_In":
+                sub_path = row_states(logged_paths[logged_next], logged.states)
+                logged_next += 1
+                for sub_step in range(len(sub_path) - 1):
+                    user.logged_action(sub_path[sub_step])
+                    user.event("logged_sub_state_transition", {"current_state": sub_path[sub_step + 1]})
+                    user.think()
+            elif nxt == "Logged_Out":
+                user.event("sub_fsm", {"state": "Logged_Out"})
+            elif nxt == "Unregistered":
+                user.event("unregister", {"status": "done"})
+            user.think()
+
+        # run_user_simulation과 같은 종료 이벤트 (단계 수 상한 검사가 Done 검사보다 먼저)
+        steps = len(path) - 1
+        status = "max_transitions_reached" if steps >= ACTIONS_PER_USER else "done"
+        user.event("simulation", {"status": status})
+        user.finish()
+        if i % 1000 == 999:
+            out.flush()
+
+    out.close()
+    return out.counts
+
+
+def write_load_sql(out_dir, chunks):
+    """
+    db/*.tsv를 외래 키 순서대로 적재하는 load.sql
+    """
+    db_dir = os.path.abspath(os.path.join(out_dir, "db"))
+    lines = [
+        "-- mysql --local-infile=1 -h $MYSQL_HOST -u $MYSQL_USER -p shopdb < load.sql",
+        "USE shopdb;",
+        "SET FOREIGN_KEY_CHECKS = 0;",
+    ]
+    for table, columns in DB_TABLES.items():
+        for chunk in range(chunks):
+            path = os.path.join(db_dir, f"{table}-{chunk:05d}.tsv")
+            lines.append(f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE {table} ({', '.join(columns)});")
+    lines.append("SET FOREIGN_KEY_CHECKS = 1;")
+    with open(os.path.join(out_dir, "load.sql"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+#################################
+# 실행
+#################################
+def run(users, out_dir, chunk_size=50_000, processes=1, seed=None, start_ts=None, duration=86400,
+        outputs=("events", "access", "db"), compress=False, products_file=None, host=None, user_id_prefix="synth_"):
+    """
+    :param users: 합성할 사용자(여정) 수
+    :param chunk_size: 청크 하나의 사용자 수 (청크마다 파일을 따로 씀)
+    :param processes: 청크를 나눠 만들 프로세스 수
+    :param seed: 난수 시드 (같으면 같은 결과, 청크마다 seed에서 파생)
+    :param start_ts: 첫 도착 시각 (epoch 초, 기본은 지금부터 duration 전)
+    :param duration: 도착 시각을 퍼뜨릴 구간 (초)
+    :param outputs: "events" / "access" / "db" 중 쓸 것
+    :return: 파일별 줄 수 합계
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if start_ts is None:
+        start_ts = time.time() - duration
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+    if host is None:
+        host = API_BASE_URL.split("://")[-1].split("/")[0]
+    products = load_products(products_file)
+
+    chunks = (users + chunk_size - 1) // chunk_size
+    seeds = np.random.SeedSequence(seed).generate_state(chunks)
+    jobs = []
+    for chunk in range(chunks):
+        count = min(chunk_size, users - chunk * chunk_size)
+        # 청크마다 도착 구간을 나눠 전체가 시간순으로 이어지게 함
+        chunk_start = start_ts + duration * chunk * chunk_size / users
+        chunk_duration = duration * count / users
+        jobs.append((chunk, count, int(seeds[chunk]), chunk_start, chunk_duration, out_dir, tuple(outputs), compress,
+                     products, host, user_id_prefix))
+
+    totals = {}
+    if processes > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(synthesize_chunk, *zip(*jobs)))
+    else:
+        results = [synthesize_chunk(*job) for job in jobs]
+    for counts in results:
+        for name, count in counts.items():
+            totals[name] = totals.get(name, 0) + count
+
+    if "db" in outputs:
+        write_load_sql(out_dir, chunks)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline session synthesizer (no API server)")
+    parser.add_argument("--users", type=int, default=NUM_USERS, help="합성할 사용자(여정) 수")
+    parser.add_argument("--out", default="./synth", help="출력 디렉터리")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="청크 하나의 사용자 수")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="청크를 나눠 만들 프로세스 수")
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED, help="난수 시드")
+    parser.add_argument("--start", type=float, help="첫 도착 시각 (epoch 초, 기본: 지금 - duration)")
+    parser.add_argument("--duration", type=float, default=86400, help="도착 시각을 퍼뜨릴 구간 (초)")
+    parser.add_argument("--outputs", default="events,access,db", help="events / access / db 중 쓸 것 (쉼표 구분)")
+    parser.add_argument("--gzip", action="store_true", help="events / access 파일을 gzip으로 압축")
+    parser.add_argument("--products", help="/products 응답을 저장한 JSON 파일 (기본: DataBase.sh 초기 상품)")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    totals = run(args.users, args.out, chunk_size=args.chunk_size, processes=args.processes, seed=args.seed,
+                 start_ts=args.start, duration=args.duration, outputs=args.outputs.split(","),
+                 compress=args.gzip, products_file=args.products)
+    elapsed = time.monotonic() - started
+    summary = ", ".join(f"{name}={count}" for name, count in sorted(totals.items()))
+    logging.info(f"Offline synth: {args.users} users in {elapsed:.1f}s -> {args.out} ({summary})")
+    print(f"{args.users} users in {elapsed:.1f}s -> {args.out}")
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
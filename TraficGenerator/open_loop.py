@@ -0,0 +1,343 @@
+# open_loop.py
+#
+# open-loop(도착률 목표) 부하 모드 (config.yaml: load.mode = "open")
+# closed-loop에서는 서버가 느려지면 사용자도 응답을 기다리느라 요청을 덜 보내서 지연 급증 구간이 가려진다.
+# open-loop에서는 스케줄러가 서버 응답과 무관하게 정해진 시각에 일을 시작한다.
+#   - unit: sessions  초당 rate개의 새 사용자 세션 시작 (세션 내부는 기존 FSM + think time)
+#   - unit: steps     load.users명의 사용자가 think time 대신 공용 스케줄의 다음 슬롯을 받아 FSM 단계 진행
+# 예정 시각 대비 실제 시작 지연은 run_stats.schedule에 기록한다 (동시 세션 상한 초과로 못 보낸 건 "dropped").
+
+import asyncio
+import itertools
+import logging
+import math
+import random
+import threading
+import time
+
+# config.py 불러오기
+from config import *
+
+import run_stats
+import TrafficGenerator as tg
+
+
+class ScheduleExhausted(Exception):
+    """
+    steps 모드에서 스케줄이 끝나 더 받을 슬롯이 없음 (사용자 세션 종료 신호)
+    """
+
+#################################
+# 도착률 프로파일
+#################################
+def build_segments(profile, rate_scale=1.0):
+    """
+    load.profile 항목들을 (구간 길이, 시작 rate, 끝 rate) 선형 구간 목록으로 변환
+    :param rate_scale: rate 배율 (샤드 실행 시 1 / 프로세스 수)
+    """
+    segments = []
+    for i, phase in enumerate(profile):
+        kind = phase.get("type")
+        try:
+            if kind == "constant":
+                parts = [(phase["duration"], phase["rate"], phase["rate"])]
+            elif kind == "ramp":
+                parts = [(phase["duration"], phase["from"], phase["to"])]
+            elif kind == "step":
+                parts = [
+                    (phase["every"], phase["from"] + n * phase["step"], phase["from"] + n * phase["step"])
+                    for n in range(phase["steps"])
+                ]
+            elif kind == "spike":
+                before = phase["at"]
+                after = phase["duration"] - phase["at"] - phase["length"]
+                if before < 0 or after < 0:
+                    raise ValueError("spike must fit inside duration")
+                parts = [
+                    (before, phase["base"], phase["base"]),
+                    (phase["length"], phase["peak"], phase["peak"]),
+                    (after, phase["base"], phase["base"])
+                ]
+            else:
+                raise ValueError(f"unknown type {kind!r}")
+        except KeyError as e:
+            raise ValueError(f"load.profile[{i}] ({kind}): missing {e}") from None
+        except ValueError as e:
+            raise ValueError(f"load.profile[{i}]: {e}") from None
+
+        for duration, start_rate, end_rate in parts:
+            if duration < 0 or start_rate < 0 or end_rate < 0:
+                raise ValueError(f"load.profile[{i}]: duration/rate must be >= 0")
+            if duration > 0:
+                segments.append((float(duration), start_rate * rate_scale, end_rate * rate_scale))
+    return segments
+
+
+def _solve_offset(amount, duration, start_rate, end_rate):
+    """
+    구간 시작부터 누적 도착 수가 amount가 되는 시점 (선형 rate의 적분을 역산)
+    """
+    slope = (end_rate - start_rate) / duration
+    if abs(slope) < 1e-12:
+        return amount / start_rate
+    # start_rate * t + slope / 2 * t^2 = amount
+    disc = max(start_rate * start_rate + 2 * slope * amount, 0.0)
+    return (math.sqrt(disc) - start_rate) / slope
+
+
+class RateSchedule:
+    """
+    프로파일에 따른 도착 시각(실행 시작 기준 초) 생성기
+    - uniform: 누적 도착 수가 1, 2, 3, ...이 되는 시각
+    - poisson: 누적 도착 수 간격이 지수 분포 (같은 평균 rate, 실제 트래픽처럼 몰림)
+    """
+    def __init__(self, profile, arrivals="uniform", rate_scale=1.0):
+        if arrivals not in ("uniform", "poisson"):
+            raise ValueError(f"load.arrivals must be 'uniform' or 'poisson', got {arrivals!r}")
+        self.segments = build_segments(profile, rate_scale)
+        self.arrivals = arrivals
+
+    @property
+    def duration(self):
+        return sum(duration for duration, _, _ in self.segments)
+
+    @property
+    def expected_arrivals(self):
+        return sum((start_rate + end_rate) / 2 * duration for duration, start_rate, end_rate in self.segments)
+
+    def _gap(self):
+        return random.expovariate(1.0) if self.arrivals == "poisson" else 1.0
+
+    def __iter__(self):
+        target = self._gap()
+        seg_start = 0.0
+        done = 0.0
+        for duration, start_rate, end_rate in self.segments:
+            area = (start_rate + end_rate) / 2 * duration
+            while target <= done + area:
+                yield seg_start + _solve_offset(target - done, duration, start_rate, end_rate)
+                target += self._gap()
+            done += area
+            seg_start += duration
+
+#################################
+# steps 모드: 공용 슬롯 배분
+#################################
+class StepPacer:
+    """
+    여러 사용자가 공유하는 FSM 단계 스케줄
+    think()마다 다음 슬롯을 받아 그 시각까지 기다리고, 이미 지났으면 바로 진행하며 지연을 기록
+    """
+    def __init__(self, schedule, started):
+        self._slots = iter(schedule)
+        self._started = started
+        self._lock = threading.Lock()
+
+    def next_slot(self):
+        with self._lock:
+            offset = next(self._slots, None)
+        if offset is None:
+            raise ScheduleExhausted()
+        return self._started + offset
+
+    def wait(self):
+        scheduled_at = self.next_slot()
+        delay = scheduled_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        run_stats.schedule.record("steps", time.monotonic() - scheduled_at)
+
+    async def wait_async(self):
+        scheduled_at = self.next_slot()
+        delay = scheduled_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        run_stats.schedule.record("steps", time.monotonic() - scheduled_at)
+
+#################################
+# 스레드 엔진
+#################################
+def _session_thread(idx, user_unique_id, scheduled_at, slots):
+    try:
+        run_stats.schedule.record("sessions", time.monotonic() - scheduled_at)
+        tg.run_user_simulation(idx, user_unique_id)
+        tg.publish_simulation_complete(idx)
+    except Exception as e:
+        logging.error(f"[user_{idx}] simulation aborted: {e}")
+    finally:
+        slots.release()
+
+
+def run_sessions_threaded(schedule, user_id_prefix=None):
+    slots = threading.Semaphore(LOAD_MAX_IN_FLIGHT)
+    started = time.monotonic()
+    for idx, offset in enumerate(schedule):
+        scheduled_at = started + offset
+        delay = scheduled_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if not slots.acquire(blocking=False):
+            # 동시 세션 상한: 기다리면 closed-loop가 되므로 보내지 않고 기록만 함
+            run_stats.schedule.record("sessions", time.monotonic() - scheduled_at, error="dropped")
+            continue
+        user_unique_id = f"{user_id_prefix}{idx}" if user_id_prefix else None
+        threading.Thread(target=_session_thread, args=(idx, user_unique_id, scheduled_at, slots)).start()
+
+    # 슬롯을 모두 회수할 수 있으면 진행 중인 세션이 모두 끝난 것
+    for _ in range(LOAD_MAX_IN_FLIGHT):
+        slots.acquire()
+
+
+def _step_worker(pacer, counter, user_id_prefix):
+    while True:
+        try:
+            # 세션 시작도 한 단계로 취급
+            pacer.wait()
+            idx = next(counter)
+            tg.run_user_simulation(idx, f"{user_id_prefix}{idx}" if user_id_prefix else None)
+        except ScheduleExhausted:
+            return
+        except Exception as e:
+            logging.error(f"[step worker] simulation aborted: {e}")
+            continue
+        tg.publish_simulation_complete(idx)
+
+
+def run_steps_threaded(schedule, users, user_id_prefix=None):
+    pacer = StepPacer(schedule, time.monotonic())
+    tg.step_pacer = pacer
+    counter = itertools.count()
+    workers = [threading.Thread(target=_step_worker, args=(pacer, counter, user_id_prefix)) for _ in range(users)]
+    try:
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+    finally:
+        tg.step_pacer = None
+
+#################################
+# asyncio 엔진
+#################################
+async def _session_task(connector, idx, user_unique_id, scheduled_at):
+    import async_engine
+    run_stats.schedule.record("sessions", time.monotonic() - scheduled_at)
+    try:
+        await async_engine.run_user_simulation(connector, idx, user_unique_id)
+    except Exception as e:
+        logging.error(f"[user_{idx}] simulation aborted: {e}")
+    await async_engine.publish_simulation_complete(idx)
+
+
+async def run_sessions_async(schedule, user_id_prefix=None):
+    import async_engine
+    connector = async_engine.new_connector()
+    in_flight = set()
+    try:
+        started = time.monotonic()
+        for idx, offset in enumerate(schedule):
+            scheduled_at = started + offset
+            delay = scheduled_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(in_flight) >= LOAD_MAX_IN_FLIGHT:
+                run_stats.schedule.record("sessions", time.monotonic() - scheduled_at, error="dropped")
+                continue
+            user_unique_id = f"{user_id_prefix}{idx}" if user_id_prefix else None
+            task = asyncio.create_task(_session_task(connector, idx, user_unique_id, scheduled_at))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        if in_flight:
+            await asyncio.gather(*in_flight)
+    finally:
+        await connector.close()
+
+
+async def _step_task(connector, pacer, counter, user_id_prefix):
+    import async_engine
+    while True:
+        try:
+            await pacer.wait_async()
+            idx = next(counter)
+            await async_engine.run_user_simulation(connector, idx, f"{user_id_prefix}{idx}" if user_id_prefix else None)
+        except ScheduleExhausted:
+            return
+        except Exception as e:
+            logging.error(f"[step worker] simulation aborted: {e}")
+            continue
+        await async_engine.publish_simulation_complete(idx)
+
+
+async def run_steps_async(schedule, users, user_id_prefix=None):
+    import async_engine
+    connector = async_engine.new_connector()
+    pacer = StepPacer(schedule, time.monotonic())
+    async_engine.step_pacer = pacer
+    counter = itertools.count()
+    try:
+        await asyncio.gather(*(_step_task(connector, pacer, counter, user_id_prefix) for _ in range(users)))
+    finally:
+        async_engine.step_pacer = None
+        await connector.close()
+
+#################################
+# 실행
+#################################
+def run(rate_scale=1.0, users=None, user_id_prefix=None):
+    """
+    현재 프로세스에서 open-loop 부하 실행 (상품/카테고리 캐시는 미리 채워 둬야 함)
+    :param rate_scale: 프로파일 rate 배율 (샤드 실행 시 1 / 프로세스 수)
+    :param users: steps 모드 동시 사용자 수 (기본 LOAD_USERS)
+    :param user_id_prefix: 지정하면 사용자 ID를 f"{prefix}{idx}"로 고정 (샤드 실행용)
+    :return: RateSchedule
+    """
+    if LOAD_UNIT not in ("sessions", "steps"):
+        raise ValueError(f"load.unit must be 'sessions' or 'steps', got {LOAD_UNIT!r}")
+    schedule = RateSchedule(LOAD_PROFILE, LOAD_ARRIVALS, rate_scale)
+    if not schedule.segments:
+        raise ValueError("load.profile is empty")
+    users = users if users is not None else LOAD_USERS
+
+    logging.info(f"Open-loop run: unit={LOAD_UNIT}, engine={ENGINE}, arrivals={LOAD_ARRIVALS}, "
+                 f"duration={schedule.duration:.1f}s, expected={schedule.expected_arrivals:.0f}")
+
+    if ENGINE == "asyncio":
+        if LOAD_UNIT == "sessions":
+            asyncio.run(run_sessions_async(schedule, user_id_prefix))
+        else:
+            asyncio.run(run_steps_async(schedule, users, user_id_prefix))
+    elif LOAD_UNIT == "sessions":
+        run_sessions_threaded(schedule, user_id_prefix)
+    else:
+        run_steps_threaded(schedule, users, user_id_prefix)
+    tg.flush_publisher()
+    return schedule
+
+
+def main():
+    tg.fetch_products(API_BASE_URL)
+    tg.fetch_categories(API_BASE_URL)
+
+    reporter = run_stats.PeriodicReporter(run_stats.stats, REPORT_INTERVAL).start()
+    started = time.monotonic()
+    schedule = run()
+    elapsed = time.monotonic() - started
+    reporter.stop()
+
+    lag_snapshot = run_stats.schedule.snapshot()
+    text = run_stats.emit_report("Open-loop run", run_stats.stats.snapshot(), elapsed, REPORT_FILE, extra={
+        "schedule": dict(run_stats.build_report(lag_snapshot, elapsed),
+                         unit=LOAD_UNIT, arrivals=LOAD_ARRIVALS,
+                         target=schedule.expected_arrivals, duration=schedule.duration),
+        "publisher": tg.publisher_stats(),
+        "http": tg.http_transport.stats()
+    })
+    lag = run_stats.format_report(lag_snapshot, elapsed, title="schedule lag")
+    logging.info(f"Open-loop schedule: target {schedule.expected_arrivals:.0f} {LOAD_UNIT} "
+                 f"over {schedule.duration:.1f}s ({LOAD_ARRIVALS})\n{lag}")
+    print(text)
+    print(lag)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,32 @@ import logging
 import requests
 import base64
 
+from pubsub_publisher import BatchPublisher
+
 class PubSubLogHandler(logging.Handler):
     """
     Python logging Handler that sends log records to a Kakao Cloud Pub/Sub topic.
+
+    batching=False (default): every record is published with a blocking request on the caller's thread.
+    batching=True: emit() only enqueues the record; a background BatchPublisher thread sends
+    multi-message publish bodies (max_messages / max_bytes per request, at least every flush_interval seconds).
     """
     def __init__(self, domain_id, project_id, topic_name,
                  credential_id, credential_secret,
                  pubsub_endpoint="https://pub-sub.kr-central-2.kakaocloud.com",
-                 level=logging.NOTSET):
+                 level=logging.NOTSET,
+                 batching=False, max_messages=500, max_bytes=1_000_000, flush_interval=1.0,
+                 queue_size=10000, overflow="drop_oldest", block_timeout=0.1, flush_timeout=5.0):
+        """
+        batching=True일 때만 쓰는 옵션
+        :param max_messages: publish 요청 하나에 담을 최대 레코드 수
+        :param max_bytes: publish 요청 하나의 최대 크기 (대략치)
+        :param flush_interval: 레코드가 큐에 머무는 최대 시간 (초)
+        :param queue_size: 큐에 쌓아 둘 수 있는 최대 레코드 수
+        :param overflow: 큐가 가득 찼을 때 정책 ("drop_oldest" / "drop_newest" / "block")
+        :param block_timeout: overflow="block"일 때 emit()이 기다리는 최대 시간 (초)
+        :param flush_timeout: flush() / close()가 기다리는 최대 시간 (초)
+        """
         super().__init__(level)
         self.domain_id = domain_id
         self.project_id = project_id
@@ -19,6 +37,7 @@ class PubSubLogHandler(logging.Handler):
         self.credential_id = credential_id
         self.credential_secret = credential_secret
         self.pubsub_endpoint = pubsub_endpoint
+        self.flush_timeout = flush_timeout
 
         # 미리 만든 publish URL
         self.publish_url = (
@@ -26,26 +45,53 @@ class PubSubLogHandler(logging.Handler):
             f"/projects/{self.project_id}/topics/{self.topic_name}/publish"
         )
 
+        # 직접 전송 모드: 레코드마다 새 연결을 열지 않도록 keep-alive 세션 재사용
+        self.session = requests.Session()
+
+        # 큐 모드: 백그라운드 스레드가 모아서 전송
+        self.publisher = None
+        if batching:
+            self.publisher = BatchPublisher(
+                self.publish_url, credential_id, credential_secret,
+                max_messages=max_messages,
+                max_bytes=max_bytes,
+                linger=flush_interval,
+                buffer_size=queue_size,
+                overflow=overflow,
+                block_timeout=block_timeout,
+                name="pubsub-log-handler"
+            )
+            # 게시기 자신의 로그가 다시 이 핸들러로 들어오면 끝없이 게시하거나(block 정책이면) 교착되므로 제외
+            self.addFilter(lambda record: not record.name.startswith("pubsub_publisher"))
+
+    def _build_message(self, record: logging.LogRecord):
+        # 1) 로그 메시지 포맷팅
+        log_msg = self.format(record)
+        # ex) 2025-01-08 06:22:20,138 - INFO - [user_xxx] GET /cart/view => 200
+
+        # 2) Base64 인코딩
+        data_b64 = base64.b64encode(log_msg.encode("utf-8")).decode("utf-8")
+
+        return {
+            "data": data_b64,
+            "attributes": {
+                "source": "traffic_generator_logger",
+                "loglevel": record.levelname
+            }
+        }
+
     def emit(self, record: logging.LogRecord):
         try:
-            # 1) 로그 메시지 포맷팅
-            log_msg = self.format(record)
-            # ex) 2025-01-08 06:22:20,138 - INFO - [user_xxx] GET /cart/view => 200
+            message = self._build_message(record)
 
-            # 2) Base64 인코딩
-            data_b64 = base64.b64encode(log_msg.encode("utf-8")).decode("utf-8")
+            # 큐 모드: 큐에 넣고 바로 반환 (가득 차면 overflow 정책대로 처리)
+            if self.publisher is not None:
+                self.publisher.publish(message)
+                return
 
             # 3) Request Body
             body = {
-                "messages": [
-                    {
-                        "data": data_b64,
-                        "attributes": {
-                            "source": "traffic_generator_logger",
-                            "loglevel": record.levelname
-                        }
-                    }
-                ]
+                "messages": [message]
             }
 
             # 4) 인증 헤더
@@ -56,7 +102,7 @@ class PubSubLogHandler(logging.Handler):
             }
 
             # 5) Pub/Sub Publish 호출
-            resp = requests.post(self.publish_url, headers=headers, json=body)
+            resp = self.session.post(self.publish_url, headers=headers, json=body)
             resp.raise_for_status()
             # 만약 응답 상태/내용까지 로그로 남기고 싶으면 아래처럼:
             # print(f"PubSub publish success: {resp.json()}")
@@ -64,3 +110,27 @@ class PubSubLogHandler(logging.Handler):
         except Exception:
             # Handler 내부에서 예외 발생 시 logging 시스템 전체가 죽지 않도록 예외 무시 or 출력
             self.handleError(record)
+
+    def flush(self, timeout=None):
+        """
+        큐에 쌓인 레코드를 보낼 때까지 대기 (최대 timeout초, 기본 flush_timeout)
+        :return: 시간 안에 모두 처리했으면 True
+        """
+        if self.publisher is None:
+            return True
+        return self.publisher.flush(self.flush_timeout if timeout is None else timeout)
+
+    def close(self):
+        # 남은 레코드를 최대 flush_timeout초 동안 보내고 백그라운드 스레드 종료
+        try:
+            if self.publisher is not None:
+                self.publisher.close(self.flush_timeout)
+            self.session.close()
+        finally:
+            super().close()
+
+    def stats(self):
+        """
+        큐 모드 카운터 (sent / dropped / failed / enqueued / buffered 등), 직접 전송 모드면 빈 dict
+        """
+        return self.publisher.stats() if self.publisher is not None else {}
@@ -0,0 +1,268 @@
+# pubsub_publisher.py
+# pip install requests 필요
+#
+# Pub/Sub 배치 게시기
+# 호출 스레드는 메시지를 버퍼에 넣고 바로 돌아가고, 백그라운드 스레드가 메시지를 모아
+# 개수(max_messages) / 크기(max_bytes) / 대기 시간(linger) 중 먼저 닿는 기준으로 한 번에 publish 한다.
+# - HTTP는 keep-alive 세션 하나를 재사용 (adapter를 넘기면 그 커넥션 풀을 공유)
+# - 5xx / 429 / 네트워크 오류는 지수 백오프로 재시도, 그 외 4xx는 바로 실패 처리
+# - 버퍼가 가득 차면 overflow 정책에 따라 처리 (모두 dropped로 셈)
+#     block:       block_timeout까지 기다림(backpressure), 그래도 자리가 없으면 새 메시지를 버림 (기본)
+#     drop_oldest: 가장 오래된 메시지를 버리고 새 메시지를 넣음
+#     drop_newest: 새 메시지를 버림
+# - flush()는 버퍼와 전송 중인 배치가 모두 끝날 때까지 기다림 (close()는 flush 후 스레드 종료)
+
+import collections
+import json
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+# 메시지 하나에 붙는 JSON 구조 오버헤드 (대략치, 배치 크기 계산용)
+MESSAGE_OVERHEAD_BYTES = 32
+
+
+def message_size(message):
+    """
+    publish 요청 본문에서 메시지 하나가 차지하는 대략적인 바이트 수
+    :param message: {"data": base64 문자열, "attributes": {...}}
+    """
+    size = len(message["data"]) + MESSAGE_OVERHEAD_BYTES
+    for key, value in message.get("attributes", {}).items():
+        size += len(key) + len(str(value)) + 6
+    return size
+
+
+class BatchPublisher:
+    """
+    백그라운드 스레드에서 메시지를 모아 보내는 Pub/Sub publisher
+    """
+    def __init__(self, publish_url, credential_id, credential_secret,
+                 max_messages=100, max_bytes=1_000_000, linger=0.05,
+                 buffer_size=10000, overflow="block", block_timeout=1.0,
+                 max_retries=3, backoff=0.1, request_timeout=10,
+                 name="pubsub-publisher", adapter=None):
+        """
+        :param publish_url: .../topics/{topic}/publish
+        :param max_messages: 배치 하나의 최대 메시지 수
+        :param max_bytes: 배치 하나의 최대 크기 (대략치)
+        :param linger: 첫 메시지 이후 배치를 채우려고 기다리는 최대 시간 (초)
+        :param buffer_size: 보내기 전 버퍼에 둘 수 있는 최대 메시지 수
+        :param overflow: 버퍼가 가득 찼을 때의 정책 (OVERFLOW_POLICIES)
+        :param block_timeout: overflow="block"일 때 publish()가 기다리는 최대 시간 (초)
+        :param max_retries: 배치 하나의 최대 재시도 횟수
+        :param backoff: 첫 재시도 대기 시간 (초, 재시도마다 2배 + 임의 지터)
+        :param adapter: 다른 세션과 공유할 requests 어댑터 (없으면 연결 하나짜리 전용 어댑터)
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.publish_url = publish_url
+        self.headers = {
+            "Credential-ID": credential_id,
+            "Credential-Secret": credential_secret,
+            "Content-Type": "application/json"
+        }
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.linger = linger
+        self.buffer_size = buffer_size
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.request_timeout = request_timeout
+
+        self._buffer = collections.deque()
+        self._buffered_bytes = 0
+        # 버퍼에 있거나 전송 중인 메시지 수 (flush 완료 판단용)
+        self._pending = 0
+        self._flush_requested = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._counters = {
+            "enqueued": 0,
+            "sent": 0,
+            "batches": 0,
+            "failed": 0,
+            "dropped": 0,
+            "retries": 0,
+            "blocked": 0
+        }
+
+        self._session = requests.Session()
+        self._session.mount(publish_url.split("/v1/")[0], adapter or HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    #################################
+    # 호출 스레드 쪽
+    #################################
+    def publish(self, message, timeout=None):
+        """
+        메시지를 버퍼에 넣음 (버퍼가 가득 차면 overflow 정책대로 처리)
+        :param message: {"data": base64 문자열, "attributes": {...}}
+        :param timeout: overflow="block"일 때 기다리는 최대 시간 (초, None이면 block_timeout, 0이면 기다리지 않음)
+        :return: 버퍼에 넣었으면 True, 버렸으면 False
+        """
+        size = message_size(message)
+        with self._lock:
+            if not self._closed and len(self._buffer) >= self.buffer_size and self.overflow == "drop_oldest":
+                _, old_size = self._buffer.popleft()
+                self._buffered_bytes -= old_size
+                self._pending -= 1
+                self._counters["dropped"] += 1
+
+            if not self._closed and len(self._buffer) >= self.buffer_size and self.overflow == "block":
+                self._counters["blocked"] += 1
+                deadline = time.monotonic() + (self.block_timeout if timeout is None else timeout)
+                while not self._closed and len(self._buffer) >= self.buffer_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._not_full.wait(remaining)
+
+            if self._closed or len(self._buffer) >= self.buffer_size:
+                self._counters["dropped"] += 1
+                return False
+
+            self._buffer.append((message, size))
+            self._buffered_bytes += size
+            self._pending += 1
+            self._counters["enqueued"] += 1
+            self._not_empty.notify()
+            return True
+
+    def full(self):
+        """
+        버퍼가 가득 찼는지 (스레드를 멈출 수 없는 호출 쪽이 직접 기다릴 때 사용)
+        """
+        with self._lock:
+            return len(self._buffer) >= self.buffer_size
+
+    def flush(self, timeout=None):
+        """
+        버퍼와 전송 중인 배치가 모두 끝날(전송 또는 실패 처리) 때까지 대기 (linger는 건너뜀)
+        :return: 시간 안에 모두 끝났으면 True
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._flush_requested += 1
+            self._not_empty.notify()
+            try:
+                while self._pending and self._thread.is_alive():
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        break
+                    self._idle.wait(remaining)
+                return self._pending == 0
+            finally:
+                self._flush_requested -= 1
+
+    def close(self, timeout=None):
+        """
+        남은 메시지를 보내고(최대 timeout초) 백그라운드 스레드 종료
+        :return: 시간 안에 남은 메시지를 모두 처리했으면 True
+        """
+        flushed = self.flush(timeout)
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify()
+            self._not_full.notify_all()
+        self._thread.join(timeout)
+        self._session.close()
+        return flushed
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, buffered=len(self._buffer), pending=self._pending)
+
+    #################################
+    # 백그라운드 스레드 쪽
+    #################################
+    def _batch_ready(self, first_at):
+        return (len(self._buffer) >= self.max_messages
+                or self._buffered_bytes >= self.max_bytes
+                or time.monotonic() - first_at >= self.linger
+                or self._flush_requested
+                or self._closed)
+
+    def _take_batch(self):
+        """
+        버퍼에서 배치 하나를 꺼냄 (버퍼가 비고 close 됐으면 None)
+        """
+        with self._lock:
+            while not self._buffer and not self._closed:
+                self._not_empty.wait()
+            if not self._buffer:
+                return None
+
+            first_at = time.monotonic()
+            while not self._batch_ready(first_at):
+                self._not_empty.wait(max(self.linger - (time.monotonic() - first_at), 0.001))
+
+            batch = []
+            batch_bytes = 0
+            while self._buffer and len(batch) < self.max_messages:
+                message, size = self._buffer[0]
+                if batch and batch_bytes + size > self.max_bytes:
+                    break
+                self._buffer.popleft()
+                self._buffered_bytes -= size
+                batch.append(message)
+                batch_bytes += size
+            self._not_full.notify(len(batch))
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            ok = self._send(batch)
+            with self._lock:
+                self._pending -= len(batch)
+                self._counters["batches"] += 1
+                self._counters["sent" if ok else "failed"] += len(batch)
+                if not self._pending:
+                    self._idle.notify_all()
+
+    def _send(self, batch):
+        """
+        배치 하나를 publish (재시도 포함)
+        :return: 성공 여부
+        """
+        body = json.dumps({"messages": batch})
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                with self._lock:
+                    self._counters["retries"] += 1
+                time.sleep(self.backoff * (2 ** (attempt - 1)) * (1 + random.random()))
+            try:
+                resp = self._session.post(self.publish_url, headers=self.headers, data=body,
+                                          timeout=self.request_timeout)
+            except Exception as e:
+                logger.warning(f"Exception while publishing {len(batch)} messages (attempt {attempt + 1}): {e}")
+                continue
+
+            if resp.status_code in (200, 201):
+                logger.info(f"Published {len(batch)} messages successfully.")
+                return True
+            if resp.status_code != 429 and resp.status_code < 500:
+                logger.error(f"Failed to publish {len(batch)} messages: {resp.status_code}, Response: {resp.text}")
+                return False
+            logger.warning(f"Publish returned {resp.status_code} (attempt {attempt + 1}), retrying")
+
+        logger.error(f"Giving up publishing {len(batch)} messages after {self.max_retries + 1} attempts")
+        return False
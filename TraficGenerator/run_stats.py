@@ -0,0 +1,332 @@
+# run_stats.py
+# 트래픽 생성기 요청 통계 (엔드포인트별 요청 수 / 지연 시간 히스토그램 / 오류)
+#
+# 기록은 고정된 수(SHARD_COUNT)의 샤드 중 스레드에 배정된 하나에만 쓰고(샤드별 락), 조회 시 모든 샤드를 합친다.
+# (사용자 / 세션마다 스레드를 띄워도 샤드 수와 snapshot() 비용은 늘지 않음)
+# snapshot()은 dict/숫자로만 이루어져 프로세스 간에 주고받아 merge_snapshots()로 합칠 수 있다.
+#
+# 지연 시간은 HDR 히스토그램과 같은 log-linear 버킷(마이크로초 단위, 상대 오차 1% 미만)으로 센다.
+# 버킷 카운트는 더하기만 하면 합쳐지므로 스레드 / 프로세스 결과를 정확도 손실 없이 합칠 수 있다.
+
+import itertools
+import json
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+# 리포트에 출력하는 백분위
+PERCENTILES = (50, 90, 99, 99.9)
+
+# 통계 샤드 수 (스레드는 처음 기록할 때 순서대로 하나씩 배정받아 나눠 씀)
+SHARD_COUNT = 64
+
+#################################
+# 키 / 오류 분류
+#################################
+def endpoint_key(method, url):
+    """
+    통계 집계 키 (쿼리 문자열 제외)
+    예: ("GET", "http://host/product?id=101") -> "GET /product"
+    """
+    return f"{method.upper()} {urlparse(url).path or '/'}"
+
+
+def classify_error(status=None, exc=None):
+    """
+    오류 유형 분류 (정상 응답이면 None)
+    """
+    if exc is not None:
+        return type(exc).__name__
+    if status is None:
+        return None
+    if status >= 500:
+        return "http_5xx"
+    if status >= 400:
+        return "http_4xx"
+    return None
+
+#################################
+# 지연 시간 히스토그램 (HDR 방식 log-linear 버킷)
+#################################
+# 128us 미만은 1us 단위, 그 이상은 2의 거듭제곱 구간마다 64개 버킷으로 나눔
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+
+def bucket_index(latency):
+    """
+    지연 시간(초) -> 버킷 번호
+    """
+    value = int(latency * 1_000_000)
+    if value < SUB_BUCKET_COUNT:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return shift * SUB_BUCKET_HALF + (value >> shift)
+
+
+def bucket_value(index):
+    """
+    버킷 번호 -> 대표 지연 시간(초, 버킷 구간의 중앙값)
+    """
+    if index < SUB_BUCKET_COUNT:
+        return index / 1_000_000
+    shift = index // SUB_BUCKET_HALF - 1
+    low = (index - shift * SUB_BUCKET_HALF) << shift
+    return (low + ((1 << shift) - 1) / 2) / 1_000_000
+
+
+def percentile(histogram, pct):
+    """
+    히스토그램에서 백분위 지연 시간(초), 비어 있으면 0.0
+    """
+    total = sum(histogram.values())
+    if not total:
+        return 0.0
+    rank = max(1, -(-total * pct // 100))
+    seen = 0
+    for index in sorted(histogram, key=int):
+        seen += histogram[index]
+        if seen >= rank:
+            return bucket_value(int(index))
+    return bucket_value(int(max(histogram, key=int)))
+
+#################################
+# 통계 수집
+#################################
+def _new_entry():
+    return {
+        "count": 0,
+        "errors": {},
+        "latency_sum": 0.0,
+        "latency_max": 0.0,
+        "histogram": {}
+    }
+
+
+class RunStats:
+    """
+    프로세스 내 요청 통계
+    - record(): 현재 스레드에 배정된 샤드에만 기록 (같은 샤드를 쓰는 스레드끼리만 락을 나눔)
+    - snapshot(): 모든 샤드를 합친 결과
+    """
+    def __init__(self, shards=SHARD_COUNT):
+        self._local = threading.local()
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+        self._next_shard = itertools.count()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            # 스레드당 한 번만 배정 (끝난 스레드의 기록은 샤드에 그대로 남음)
+            shard = self._local.shard = self._shards[next(self._next_shard) % len(self._shards)]
+        return shard
+
+    def record(self, endpoint, latency, status=None, exc=None, error=None):
+        """
+        :param endpoint: endpoint_key()로 만든 키
+        :param latency: 지연 시간 (초)
+        :param status: HTTP 상태 코드
+        :param exc: 요청 중 발생한 예외
+        :param error: 오류 유형을 직접 지정 (status / exc로 분류하지 않을 때)
+        """
+        index = bucket_index(latency)
+        error = error or classify_error(status, exc)
+        shard, lock = self._shard()
+        with lock:
+            entry = shard.get(endpoint)
+            if entry is None:
+                entry = shard[endpoint] = _new_entry()
+
+            entry["count"] += 1
+            entry["latency_sum"] += latency
+            if latency > entry["latency_max"]:
+                entry["latency_max"] = latency
+            histogram = entry["histogram"]
+            histogram[index] = histogram.get(index, 0) + 1
+
+            if error:
+                entry["errors"][error] = entry["errors"].get(error, 0) + 1
+
+    def snapshot(self):
+        shards = []
+        for shard, lock in self._shards:
+            with lock:
+                shards.append({
+                    endpoint: dict(entry, errors=dict(entry["errors"]), histogram=dict(entry["histogram"]))
+                    for endpoint, entry in shard.items()
+                })
+        return merge_snapshots(shards)
+
+
+def merge_snapshots(snapshots):
+    """
+    여러 snapshot(스레드 샤드 또는 프로세스 결과)을 하나로 합침
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for endpoint, entry in snapshot.items():
+            target = merged.setdefault(endpoint, _new_entry())
+            target["count"] += entry["count"]
+            target["latency_sum"] += entry["latency_sum"]
+            target["latency_max"] = max(target["latency_max"], entry["latency_max"])
+            for error, count in entry["errors"].items():
+                target["errors"][error] = target["errors"].get(error, 0) + count
+            # JSON을 거친 snapshot은 버킷 번호가 문자열
+            for index, count in entry["histogram"].items():
+                index = int(index)
+                target["histogram"][index] = target["histogram"].get(index, 0) + count
+    return merged
+
+
+def diff_snapshots(current, previous):
+    """
+    current - previous (주기 리포트의 구간 통계)
+    구간 최대 지연은 히스토그램의 가장 큰 버킷 값으로 대신함
+    """
+    window = {}
+    for endpoint, entry in current.items():
+        before = previous.get(endpoint, _new_entry())
+        count = entry["count"] - before["count"]
+        if count <= 0:
+            continue
+        histogram = {}
+        for index, n in entry["histogram"].items():
+            n -= before["histogram"].get(index, 0)
+            if n > 0:
+                histogram[index] = n
+        errors = {}
+        for error, n in entry["errors"].items():
+            n -= before["errors"].get(error, 0)
+            if n > 0:
+                errors[error] = n
+        window[endpoint] = {
+            "count": count,
+            "errors": errors,
+            "latency_sum": entry["latency_sum"] - before["latency_sum"],
+            "latency_max": bucket_value(max(histogram)) if histogram else 0.0,
+            "histogram": histogram
+        }
+    return window
+
+#################################
+# 리포트 (텍스트 / JSON)
+#################################
+def summarize(entry, elapsed):
+    """
+    엔드포인트 하나의 요약 (지연 시간은 ms, 처리량은 초당 요청 수)
+    """
+    count = entry["count"]
+    errors = sum(entry["errors"].values())
+    summary = {
+        "count": count,
+        "errors": errors,
+        "error_rate": errors / count if count else 0.0,
+        "throughput": count / elapsed if elapsed > 0 else 0.0,
+        "mean_ms": entry["latency_sum"] / count * 1000 if count else 0.0,
+        "max_ms": entry["latency_max"] * 1000
+    }
+    # 버킷 대표값이 실제 최대값을 넘지 않도록 자름
+    for pct in PERCENTILES:
+        summary[f"p{pct:g}_ms"] = min(percentile(entry["histogram"], pct), entry["latency_max"]) * 1000
+    summary["error_types"] = dict(entry["errors"])
+    return summary
+
+
+def build_report(snapshot, elapsed):
+    """
+    JSON 리포트 dict (엔드포인트별 요약 + 전체 합계)
+    """
+    total = merge_snapshots([{"TOTAL": entry} for entry in snapshot.values()]).get("TOTAL", _new_entry())
+    return {
+        "elapsed": elapsed,
+        "endpoints": {endpoint: summarize(snapshot[endpoint], elapsed) for endpoint in sorted(snapshot)},
+        "total": summarize(total, elapsed)
+    }
+
+
+def format_report(snapshot, elapsed, title="endpoint"):
+    """
+    엔드포인트별 요약 표 (텍스트)
+    :param elapsed: 실행 시간 (초), 처리량 계산용
+    :param title: 첫 번째 열 제목
+    """
+    report = build_report(snapshot, elapsed)
+    header = f"{title:<28}{'count':>9}{'errors':>8}{'err %':>8}{'req/s':>10}{'mean':>9}"
+    header += "".join(f"{f'p{pct:g}':>9}" for pct in PERCENTILES) + f"{'max':>9}  (ms)"
+    lines = [header]
+    for endpoint, summary in report["endpoints"].items():
+        lines.append(_format_row(endpoint, summary))
+    lines.append(_format_row("TOTAL", report["total"]))
+
+    error_types = report["total"]["error_types"]
+    if error_types:
+        lines.append("errors: " + ", ".join(f"{error}={count}" for error, count in sorted(error_types.items())))
+    return "\n".join(lines)
+
+
+def _format_row(endpoint, summary):
+    row = (f"{endpoint:<28}{summary['count']:>9}{summary['errors']:>8}{summary['error_rate'] * 100:>8.2f}"
+           f"{summary['throughput']:>10.2f}{summary['mean_ms']:>9.2f}")
+    row += "".join(f"{summary[f'p{pct:g}_ms']:>9.2f}" for pct in PERCENTILES)
+    return row + f"{summary['max_ms']:>9.2f}"
+
+
+def emit_report(label, snapshot, elapsed, report_file=None, extra=None):
+    """
+    실행 종료 리포트: 텍스트 표와 JSON을 로그에 남기고, report_file이 있으면 JSON 파일로 저장
+    :param extra: JSON 리포트에 함께 넣을 항목 (샤드 정보, 스케줄 지연 등)
+    :return: 텍스트 표
+    """
+    text = format_report(snapshot, elapsed)
+    report = dict(build_report(snapshot, elapsed), label=label, **(extra or {}))
+    logging.info(f"{label} finished in {elapsed:.1f}s\n{text}")
+    logging.info(f"{label} report: {json.dumps(report)}")
+    if report_file:
+        with open(report_file, "w") as f:
+            json.dump(report, f, indent=2)
+    return text
+
+
+class PeriodicReporter:
+    """
+    interval초마다 직전 구간의 통계(처리량 / 백분위 / 오류율)를 텍스트와 JSON으로 로그에 남기는 스레드
+    """
+    def __init__(self, stats, interval, label="traffic"):
+        self.stats = stats
+        self.interval = interval
+        self.label = label
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="run-stats-reporter", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        previous = {}
+        last = time.monotonic()
+        while not self._stop.wait(self.interval):
+            current = self.stats.snapshot()
+            now = time.monotonic()
+            window = diff_snapshots(current, previous)
+            if window:
+                report = dict(build_report(window, now - last), label=self.label, interval=True)
+                logging.info(f"[{self.label}] last {now - last:.1f}s\n{format_report(window, now - last)}")
+                logging.info(f"[{self.label}] interval report: {json.dumps(report)}")
+            previous, last = current, now
+
+
+# 프로세스 전역 통계 (TrafficGenerator / async_engine 공용)
+stats = RunStats()
+
+# open-loop 스케줄 지연 (예정 시각 대비 실제 시작 지연, 키: "sessions" / "steps", 오류: "dropped")
+schedule = RunStats()
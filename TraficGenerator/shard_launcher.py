@@ -0,0 +1,158 @@
+# shard_launcher.py
+#
+# NUM_USERS를 여러 워커 프로세스(샤드)로 나눠 실행하는 런처 (config.yaml: threads.processes)
+# - 샤드마다 연속된 사용자 인덱스 구간, 별도 난수 시드(seed + 샤드 번호), 고유 사용자 ID 접두어 사용
+# - 각 샤드는 threads.engine에 설정된 엔진(thread / asyncio)으로 자기 구간을 실행
+# - 부모 프로세스가 샤드별 요청 통계를 합쳐 하나의 리포트로 출력
+# - open-loop 모드(load.mode: open)에서는 샤드마다 프로파일 rate의 1/프로세스 수를 담당
+
+import logging
+import multiprocessing
+import os
+import random
+import time
+import uuid
+
+# config.py 불러오기
+from config import *
+
+import run_stats
+# 공용 HTTP 커넥션 풀 통계 (샤드별 결과를 합침)
+import http_transport
+
+#################################
+# 샤드 분할
+#################################
+def shard_ranges(num_users, shards):
+    """
+    0..num_users-1을 shards개의 연속 구간으로 나눔 (앞 샤드부터 1명씩 더 배정)
+    :return: [range, ...]
+    """
+    base, extra = divmod(num_users, shards)
+    ranges = []
+    start = 0
+    for i in range(shards):
+        size = base + (1 if i < extra else 0)
+        ranges.append(range(start, start + size))
+        start += size
+    return ranges
+
+#################################
+# 샤드 실행 (워커 프로세스)
+#################################
+def run_shard(shard_idx, user_range, seed, run_tag, rate_scale=1.0):
+    """
+    워커 프로세스에서 한 샤드의 사용자들을 실행
+    :return: 샤드 결과 dict (요청 통계 snapshot 포함)
+    """
+    import TrafficGenerator as tg
+
+    random.seed(seed)
+    user_id_prefix = f"user_{run_tag}s{shard_idx}_"
+    logging.info(f"[shard {shard_idx}] pid={os.getpid()} users={user_range.start}..{user_range.stop - 1} seed={seed}")
+
+    # 요청 기록은 샤드마다 별도 파일 (재생할 때 샤드 파일을 모두 넘기면 시각을 맞춰 합침)
+    if RECORD_FILE:
+        import traffic_replay
+        traffic_replay.start_recording(traffic_replay.shard_path(RECORD_FILE, shard_idx), shard=shard_idx)
+
+    tg.fetch_products(API_BASE_URL)
+    tg.fetch_categories(API_BASE_URL)
+
+    # 주기 리포트는 샤드마다 자기 구간만 기록 (전체 합계는 종료 리포트에서)
+    reporter = run_stats.PeriodicReporter(run_stats.stats, REPORT_INTERVAL, label=f"shard {shard_idx}").start()
+    started = time.monotonic()
+    if LOAD_MODE == "open":
+        import open_loop
+        open_loop.run(rate_scale, len(user_range), user_id_prefix)
+    elif ENGINE == "asyncio":
+        import async_engine
+        async_engine.run_users(user_range, user_id_prefix)
+    else:
+        tg.run_users(user_range, user_id_prefix)
+    elapsed = time.monotonic() - started
+    reporter.stop()
+
+    if RECORD_FILE:
+        traffic_replay.stop_recording()
+    logging.info(f"[shard {shard_idx}] finished in {elapsed:.1f}s")
+    return {
+        "shard": shard_idx,
+        "pid": os.getpid(),
+        "users": len(user_range),
+        "seed": seed,
+        "elapsed": elapsed,
+        "stats": run_stats.stats.snapshot(),
+        "schedule": run_stats.schedule.snapshot(),
+        "publisher": tg.publisher_stats(),
+        "http": http_transport.stats()
+    }
+
+#################################
+# 리포트
+#################################
+def merge_counters(counters):
+    """
+    샤드별 카운터 dict를 키별로 합침
+    """
+    merged = {}
+    for counter in counters:
+        for key, value in counter.items():
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def build_report(results, elapsed):
+    """
+    샤드 결과를 합친 리포트 dict
+    """
+    return {
+        "processes": len(results),
+        "users": sum(result["users"] for result in results),
+        "elapsed": elapsed,
+        "shards": [
+            {key: result[key] for key in ("shard", "pid", "users", "seed", "elapsed")}
+            for result in results
+        ],
+        "stats": run_stats.merge_snapshots([result["stats"] for result in results]),
+        "schedule": run_stats.merge_snapshots([result["schedule"] for result in results]),
+        "publisher": merge_counters([result["publisher"] for result in results]),
+        "http": http_transport.merge_stats([result["http"] for result in results])
+    }
+
+
+def main():
+    # open-loop steps 모드는 LOAD_USERS를, 그 외에는 NUM_USERS를 샤드에 나눔
+    num_users = LOAD_USERS if LOAD_MODE == "open" else NUM_USERS
+    processes = PROCESSES or os.cpu_count()
+    processes = max(1, min(processes, num_users))
+    base_seed = RANDOM_SEED if RANDOM_SEED is not None else random.randrange(2 ** 31)
+    run_tag = uuid.uuid4().hex[:4]
+
+    ranges = shard_ranges(num_users, processes)
+    logging.info(f"Launching {processes} shard(s) for {num_users} users "
+                 f"(engine={ENGINE}, load={LOAD_MODE}, base_seed={base_seed})")
+
+    started = time.monotonic()
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.starmap(
+            run_shard,
+            [(i, user_range, base_seed + i, run_tag, 1.0 / processes) for i, user_range in enumerate(ranges)]
+        )
+    elapsed = time.monotonic() - started
+
+    report = build_report(results, elapsed)
+    extra = {key: report[key] for key in ("processes", "users", "shards", "publisher", "http")}
+    if report["schedule"]:
+        extra["schedule"] = dict(run_stats.build_report(report["schedule"], elapsed), unit=LOAD_UNIT)
+    text = run_stats.emit_report("Sharded run", report["stats"], elapsed, REPORT_FILE, extra=extra)
+
+    print(f"{processes} shard(s), {report['users']} users, {elapsed:.1f}s")
+    for shard in report["shards"]:
+        print(f"  shard {shard['shard']}: pid={shard['pid']} users={shard['users']} "
+              f"seed={shard['seed']} elapsed={shard['elapsed']:.1f}s")
+    print(text)
+    if report["schedule"]:
+        lag = run_stats.format_report(report["schedule"], elapsed, title="schedule lag")
+        logging.info(f"Sharded run schedule lag ({LOAD_UNIT})\n{lag}")
+        print(lag)
@@ -0,0 +1,306 @@
+# traffic_replay.py
+#
+# 트래픽 생성기가 보낸 요청을 파일로 기록하고(config.yaml: record.file), 기록한 요청을 그대로 다시 보내는 재생기
+# FSM 실행은 전역 random / uuid4 사용자 ID / 스레드 실행 순서에 따라 매번 달라지므로,
+# API 서버 성능을 빌드 간에 비교할 때는 한 번 기록한 요청 흐름을 재생해서 같은 부하를 건다.
+#
+# 기록 파일 (JSON lines, .gz로 끝나면 gzip)
+#   1행: 헤더 {"format": "tg-record", "version": 1, "started": epoch 초, "base_url", "concurrency", "engine", "load"}
+#   이후: [시작 후 경과 초, 스트림 번호, method, 경로(+쿼리), form 데이터 또는 null, 응답 상태 코드 또는 null]
+#   스트림 = 요청을 보낸 HTTP 세션 하나 (사용자 한 명, 쿠키를 공유하는 요청 묶음)
+#
+# 재생
+#   python traffic_replay.py record.jsonl.gz [record.shard1.jsonl.gz ...] --speed 1|N|max
+#   - 스트림마다 세션 하나로 순서대로 보내고(쿠키 유지), 각 요청은 기록된 시각 / speed에 시작 (max면 대기 없음)
+#   - 동시에 실행하는 스트림 수는 기록 당시 동시 사용자 상한(헤더 concurrency, 파일 여러 개면 합계)
+#   - 예정 시각 대비 시작 지연은 run_stats.schedule("requests"), 기록과 다른 상태 코드는 리포트의 replay.status_mismatch
+
+import argparse
+import atexit
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+# config.py 불러오기
+from config import *
+
+import run_stats
+import http_transport
+
+RECORD_FORMAT = "tg-record"
+RECORD_VERSION = 1
+
+JSON_HEADERS = {"Accept": "application/json"}
+
+#################################
+# 기록
+#################################
+def open_text(path, mode):
+    """
+    .gz로 끝나면 gzip, 아니면 일반 텍스트 파일
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    return open(path, mode, encoding="utf-8", buffering=1024 * 1024)
+
+
+def shard_path(path, shard_idx):
+    """
+    샤드별 기록 파일 경로 (예: record.jsonl.gz -> record.shard1.jsonl.gz)
+    """
+    directory, name = os.path.split(path)
+    stem, dot, ext = name.partition(".")
+    return os.path.join(directory, f"{stem}.shard{shard_idx}{dot}{ext}")
+
+
+class RequestRecorder:
+    """
+    요청 기록기 (여러 스레드 / 코루틴에서 호출, 한 줄씩 락을 잡고 씀)
+    """
+    def __init__(self, path, base_url, concurrency, **meta):
+        self.path = path
+        self.base_url = base_url.rstrip("/")
+        self.count = 0
+        self._lock = threading.Lock()
+        # HTTP 세션 객체 -> 스트림 번호 (세션이 사라지면 항목도 사라짐)
+        self._streams = weakref.WeakKeyDictionary()
+        self._next_stream = 0
+        self._started = time.perf_counter()
+        self._file = open_text(path, "w")
+        header = dict(format=RECORD_FORMAT, version=RECORD_VERSION, started=time.time(),
+                      base_url=self.base_url, concurrency=concurrency, **meta)
+        self._file.write(json.dumps(header) + "\n")
+
+    def _stream(self, owner):
+        stream = self._streams.get(owner)
+        if stream is None:
+            stream = self._next_stream
+            self._next_stream += 1
+            self._streams[owner] = stream
+        return stream
+
+    def record(self, owner, method, url, data, started, status):
+        """
+        :param owner: 요청을 보낸 HTTP 세션 (requests.Session / aiohttp.ClientSession)
+        :param started: 요청 시작 시각 (time.perf_counter)
+        :param status: 응답 상태 코드 (예외면 None)
+        """
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        if isinstance(data, dict):
+            data = {key: str(value) for key, value in data.items()}
+        offset = round(started - self._started, 4)
+        with self._lock:
+            if self._file is None:
+                return
+            line = json.dumps([offset, self._stream(owner), method.upper(), path or "/", data, status],
+                              separators=(",", ":"), ensure_ascii=False)
+            self._file.write(line + "\n")
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                logging.info(f"Recorded {self.count} requests to {self.path}")
+
+
+# 프로세스 전역 기록기 (None이면 기록 안 함)
+recorder = None
+
+
+def start_recording(path, **meta):
+    """
+    지금부터 TrackedSession / async_engine 요청을 path에 기록 (프로세스 종료 시 파일을 닫음)
+    """
+    global recorder
+    if LOAD_MODE == "open":
+        concurrency = LOAD_MAX_IN_FLIGHT
+    else:
+        concurrency = MAX_THREADS
+    recorder = RequestRecorder(path, API_BASE_URL, concurrency, engine=ENGINE, load=LOAD_MODE, **meta)
+    atexit.register(stop_recording)
+    logging.info(f"Recording requests to {path}")
+    return recorder
+
+
+def stop_recording():
+    global recorder
+    if recorder is not None:
+        recorder.close()
+        recorder = None
+
+
+def record_request(owner, method, url, data, started, status):
+    """
+    기록 중이면 요청 한 건을 기록 (아니면 아무것도 안 함)
+    """
+    if recorder is not None:
+        recorder.record(owner, method, url, data, started, status)
+
+#################################
+# 기록 읽기
+#################################
+def load_recordings(paths):
+    """
+    기록 파일들을 읽어 스트림 목록으로 변환
+    파일마다 헤더의 started(epoch 초)로 시각을 맞춰, 여러 샤드 파일을 하나의 흐름으로 합침
+    :return: (헤더 목록, [[(경과 초, method, 경로, 데이터, 상태 코드), ...], ...]) 스트림은 첫 요청 시각순
+    """
+    headers = []
+    records = []
+    for path in paths:
+        with open_text(path, "r") as f:
+            header = json.loads(f.readline())
+            if header.get("format") != RECORD_FORMAT:
+                raise ValueError(f"{path}: not a traffic record file")
+            if header.get("version") != RECORD_VERSION:
+                raise ValueError(f"{path}: unsupported record version {header.get('version')}")
+            headers.append(header)
+            records.append([json.loads(line) for line in f if line.strip()])
+
+    base = min(header["started"] for header in headers)
+    streams = {}
+    for file_idx, (header, rows) in enumerate(zip(headers, records)):
+        shift = header["started"] - base
+        for offset, stream, method, path, data, status in rows:
+            streams.setdefault((file_idx, stream), []).append((offset + shift, method, path, data, status))
+
+    ordered = []
+    for requests_ in streams.values():
+        # 기록은 응답이 끝난 순서로 쓰이므로 시작 시각순으로 정렬
+        requests_.sort(key=lambda item: item[0])
+        ordered.append(requests_)
+    ordered.sort(key=lambda requests_: requests_[0][0])
+    return headers, ordered
+
+#################################
+# 재생
+#################################
+class ReplayCounters:
+    """
+    재생 결과 카운터 (여러 스레드에서 증가)
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = {"requests": 0, "errors": 0, "status_mismatch": 0}
+
+    def add(self, key, amount=1):
+        with self._lock:
+            self.values[key] += amount
+
+
+def rename_user(data, suffix):
+    """
+    form 데이터의 user_id 뒤에 suffix를 붙임 (이미 기록 때 만든 사용자가 남아 있는 DB에 다시 재생할 때)
+    """
+    if suffix and data and "user_id" in data:
+        data = dict(data, user_id=f"{data['user_id']}_{suffix}")
+    return data
+
+
+def replay_stream(requests_, base_url, speed, started, counters, user_suffix=None):
+    """
+    스트림 하나를 세션 하나로 순서대로 재생 (스레드 풀 워커에서 실행)
+    :param speed: 재생 배속 (None이면 대기 없이 최대 속도)
+    :param started: 재생 시작 시각 (time.monotonic)
+    """
+    import TrafficGenerator as tg
+
+    with tg.TrackedSession() as session:
+        for offset, method, path, data, status in requests_:
+            if speed:
+                scheduled_at = started + offset / speed
+                delay = scheduled_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                run_stats.schedule.record("requests", time.monotonic() - scheduled_at)
+            counters.add("requests")
+            try:
+                resp = session.request(method, base_url + path, data=rename_user(data, user_suffix),
+                                       headers=JSON_HEADERS)
+                replayed = resp.status_code
+            except Exception as e:
+                logging.debug(f"Replay {method} {path} failed: {e}")
+                counters.add("errors")
+                replayed = None
+            if replayed != status:
+                counters.add("status_mismatch")
+
+
+def replay(paths, base_url=None, speed=1.0, concurrency=None, user_suffix=None):
+    """
+    기록 파일들을 재생
+    :param speed: 배속 (1: 기록과 같은 간격, N: N배 빠르게, None: 대기 없이 최대 속도)
+    :param concurrency: 동시에 재생할 스트림 수 (기본: 기록 헤더 concurrency 합계)
+    :return: (재생 카운터, 걸린 시간(초), 헤더 목록)
+    """
+    headers, streams = load_recordings(paths)
+    base_url = (base_url or API_BASE_URL).rstrip("/")
+    if concurrency is None:
+        concurrency = sum(header.get("concurrency") or MAX_THREADS for header in headers)
+    concurrency = max(1, min(concurrency, len(streams) or 1))
+    logging.info(f"Replaying {sum(len(s) for s in streams)} requests in {len(streams)} streams "
+                 f"to {base_url} (speed={speed or 'max'}, concurrency={concurrency})")
+
+    # 동시 스트림마다 API 서버 연결 하나
+    http_transport.configure(api_pool_size=concurrency)
+
+    counters = ReplayCounters()
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="replay") as pool:
+        futures = [pool.submit(replay_stream, requests_, base_url, speed, started, counters, user_suffix)
+                   for requests_ in streams]
+        for future in futures:
+            future.result()
+    return counters.values, time.monotonic() - started, headers
+
+
+def parse_speed(value):
+    """
+    "max" -> None, 그 외는 양수 배속
+    """
+    if value == "max":
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be > 0 or 'max'")
+    return speed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded traffic against the API server")
+    parser.add_argument("records", nargs="+", help="기록 파일 (샤드 실행이면 샤드 파일을 모두)")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="배속: 1(기록 간격 그대로), N, max")
+    parser.add_argument("--base-url", help="재생 대상 API 서버 (기본: config.yaml api.base_url)")
+    parser.add_argument("--concurrency", type=int, help="동시 재생 스트림 수 (기본: 기록 당시 동시 사용자 상한)")
+    parser.add_argument("--user-suffix", help="user_id 뒤에 붙일 문자열 (기록한 사용자가 DB에 남아 있을 때)")
+    parser.add_argument("--report", default=REPORT_FILE, help="종료 리포트 JSON 저장 경로")
+    args = parser.parse_args()
+
+    # 로깅 설정과 TrackedSession은 TrafficGenerator와 공유 (TrafficGenerator가 이 모듈을 불러오므로 여기서 늦게 불러옴)
+    import TrafficGenerator
+
+    reporter = run_stats.PeriodicReporter(run_stats.stats, REPORT_INTERVAL, label="replay").start()
+    counters, elapsed, headers = replay(args.records, args.base_url, args.speed, args.concurrency,
+                                        args.user_suffix)
+    reporter.stop()
+
+    extra = {"replay": dict(counters, speed=args.speed or "max", records=args.records), "http": http_transport.stats()}
+    lag_snapshot = run_stats.schedule.snapshot()
+    if lag_snapshot:
+        extra["schedule"] = run_stats.build_report(lag_snapshot, elapsed)
+    print(run_stats.emit_report("Replay", run_stats.stats.snapshot(), elapsed, args.report, extra=extra))
+    print(f"replayed {counters['requests']} requests in {elapsed:.1f}s "
+          f"(errors={counters['errors']}, status_mismatch={counters['status_mismatch']})")
+    if lag_snapshot:
+        print(run_stats.format_report(lag_snapshot, elapsed, title="schedule lag"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+# message_sink.py
+# Parquet 싱크를 쓰려면 pip install pyarrow 필요
+#
+# Pull 한 메시지를 로컬 파일로 내보내는 싱크 단계
+# - JsonlSink: 한 줄에 메시지 하나 (JSON Lines, gzip 압축 선택)
+# - ParquetSink: 컬럼 형식 (snappy / zstd / gzip 압축 선택)
+# - 파일은 크기(rotate_bytes) 또는 시간(rotate_seconds) 기준으로 교체(rotation)
+#   쓰는 중인 파일은 "*.part" 이름으로 두고, 닫을 때 최종 이름으로 바꿔 분석 쪽은 완성된 파일만 보게 함
+# - fsync 정책 (commit()이 True를 돌려주는 시점 = 여기까지 쓴 메시지를 Ack 해도 되는 시점)
+#     batch:  commit()마다 flush + fsync (디스크에 기록된 뒤 Ack, 기본)
+#     rotate: 파일을 닫을 때만 fsync (파일 교체 전까지 Ack 보류)
+#     none:   commit()마다 OS 버퍼까지만 flush (프로세스가 죽어도 남지만 전원 장애에는 잃을 수 있음)
+# - SinkStage: 여러 처리 스레드가 넣은 메시지를 모아 한 번에 쓰고, commit이 끝난 메시지의 ackId를 콜백으로 넘김
+#   쓰기에 실패하면 기록을 확인하지 못한 ackId를 실패 콜백으로 넘기고(Nack), 쓰던 파일은 "*.failed"로 버림
+#   기록 완료를 기다리는 ackId가 너무 많거나 오래되면 교체 주기 전이라도 파일을 닫아 Ack 가능하게 함
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+
+FSYNC_POLICIES = ("batch", "rotate", "none")
+
+# Parquet 컬럼 순서 (attributes는 JSON 문자열로 저장)
+PARQUET_COLUMNS = ("message_id", "publish_time", "data", "attributes")
+
+
+def fsync_dir(path):
+    """
+    파일 이름 변경(rename)이 디스크에 남도록 디렉터리도 fsync
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class RotatingFileSink:
+    """
+    파일 교체 / 이름 규칙 / fsync 정책 공통 부분 (포맷별 쓰기는 하위 클래스)
+    파일 이름: {directory}/{prefix}-{YYYYmmdd-HHMMSS}-{순번}{extension}
+    """
+    extension = ""
+
+    def __init__(self, directory, prefix="messages", rotate_bytes=64 * 1024 * 1024, rotate_seconds=300,
+                 fsync="batch"):
+        """
+        :param directory: 파일을 쓸 디렉터리 (없으면 만듦)
+        :param rotate_bytes: 파일 하나의 최대 크기 (바이트, 압축 후 기준)
+        :param rotate_seconds: 파일 하나를 열어 두는 최대 시간 (초)
+        :param fsync: fsync 정책 (FSYNC_POLICIES)
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.directory = directory
+        self.prefix = prefix
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+
+        self._path = None
+        self._opened_at = None
+        self._sequence = 0
+        self.counters = {"records": 0, "files": 0, "commits": 0, "fsyncs": 0, "abandoned": 0}
+
+    #################################
+    # 포맷별 구현
+    #################################
+    def _open(self, path):
+        raise NotImplementedError
+
+    def _write(self, records):
+        raise NotImplementedError
+
+    def _flush(self, sync):
+        """
+        지금까지 쓴 내용을 OS까지 내려보냄 (sync=True면 fsync까지)
+        :return: 파일을 닫지 않고도 기록이 보장되면 True (Parquet처럼 닫아야 완성되는 포맷은 False)
+        """
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+    def _abandon(self):
+        """
+        쓰기 오류 뒤 파일 핸들을 정리 (오류는 무시, 내용이 완성되지 않아도 됨)
+        """
+        raise NotImplementedError
+
+    def _size(self):
+        raise NotImplementedError
+
+    #################################
+    # 공통
+    #################################
+    def write(self, records):
+        """
+        :param records: decode_message() 결과(dict) 리스트
+        """
+        if not records:
+            return
+        if self._path is None:
+            self._open_next()
+        self._write(records)
+        self.counters["records"] += len(records)
+        if self._size() >= self.rotate_bytes:
+            self.rotate()
+
+    def commit(self):
+        """
+        지금까지 write()한 메시지를 fsync 정책에 맞게 내려보냄 (시간 기준 교체도 여기서 확인)
+        :return: 지금까지 쓴 메시지가 모두 기록 완료되었으면 True (Ack 가능)
+        """
+        self.counters["commits"] += 1
+        if self._path is None:
+            return True
+        if time.monotonic() - self._opened_at >= self.rotate_seconds:
+            self.rotate()
+            return True
+        if self.fsync == "rotate":
+            return False
+        sync = self.fsync == "batch"
+        durable = self._flush(sync)
+        if sync and durable:
+            self.counters["fsyncs"] += 1
+        return durable
+
+    def rotate(self):
+        """
+        현재 파일을 닫아(fsync 후) 최종 이름으로 바꿈, 다음 write()에서 새 파일을 엶
+        """
+        if self._path is None:
+            return
+        self._close()
+        final_path = self._path[:-len(".part")]
+        os.replace(self._path, final_path)
+        if self.fsync != "none":
+            fsync_dir(self.directory)
+            self.counters["fsyncs"] += 1
+        logging.info(f"Sink file closed: {final_path}")
+        self._path = None
+
+    def close(self):
+        self.rotate()
+
+    def abandon(self):
+        """
+        쓰기에 실패한 파일을 버림: 핸들을 닫고 "*.failed"로 이름을 바꿈, 다음 write()에서 새 파일을 엶
+        (이미 Ack 한 메시지가 들어 있을 수 있으므로 지우지 않음)
+        """
+        if self._path is None:
+            return
+        self._abandon()
+        failed_path = self._path[:-len(".part")] + ".failed"
+        try:
+            os.replace(self._path, failed_path)
+            logging.warning(f"Sink file abandoned: {failed_path}")
+        except OSError as e:
+            logging.error(f"Failed to set aside sink file {self._path}: {e}")
+        self.counters["abandoned"] += 1
+        self._path = None
+
+    def _open_next(self):
+        self._sequence += 1
+        name = f"{self.prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{self._sequence:05d}{self.extension}"
+        self._path = os.path.join(self.directory, name + ".part")
+        self._opened_at = time.monotonic()
+        self._open(self._path)
+        self.counters["files"] += 1
+
+
+class JsonlSink(RotatingFileSink):
+    """
+    JSON Lines 파일 싱크 (compression="gzip"이면 .jsonl.gz)
+    """
+    def __init__(self, directory, compression=None, **kwargs):
+        if compression not in (None, "none", "gzip"):
+            raise ValueError(f"JSONL compression must be 'gzip' or None, got {compression!r}")
+        self.compression = compression if compression != "none" else None
+        self.extension = ".jsonl.gz" if self.compression else ".jsonl"
+        super().__init__(directory, **kwargs)
+        self._raw = None
+        self._stream = None
+
+    def _open(self, path):
+        self._raw = open(path, "wb", buffering=1024 * 1024)
+        self._stream = gzip.GzipFile(fileobj=self._raw, mode="wb") if self.compression else self._raw
+
+    def _write(self, records):
+        # 한 번에 인코딩해서 한 번에 씀
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        self._stream.write(lines.encode("utf-8"))
+
+    def _flush(self, sync):
+        # gzip은 flush()가 Z_SYNC_FLUSH라 여기까지의 내용을 완성된 블록으로 내보냄
+        self._stream.flush()
+        if self._stream is not self._raw:
+            self._raw.flush()
+        if sync:
+            os.fsync(self._raw.fileno())
+        return True
+
+    def _close(self):
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.flush()
+        if self.fsync != "none":
+            os.fsync(self._raw.fileno())
+        self._raw.close()
+        self._raw = self._stream = None
+
+    def _abandon(self):
+        for stream in (self._stream, self._raw):
+            try:
+                if stream is not None:
+                    stream.close()
+            except Exception:
+                pass
+        self._raw = self._stream = None
+
+    def _size(self):
+        return self._raw.tell()
+
+
+class ParquetSink(RotatingFileSink):
+    """
+    Parquet 파일 싱크
+    - write()는 메모리의 컬럼 버퍼에 모으고, row_group_size 행마다 row group 하나로 씀
+    - Parquet 파일은 닫아서 footer를 써야 읽을 수 있으므로 파일이 닫힐 때(rotate) 기록 완료로 봄
+      (fsync 정책과 관계없이 commit()은 교체 시점에만 True)
+    """
+    extension = ".parquet"
+
+    def __init__(self, directory, compression="snappy", row_group_size=10000, **kwargs):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("ParquetSink requires pyarrow (pip install pyarrow)") from e
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.compression = compression or "none"
+        self.row_group_size = row_group_size
+        self.schema = pyarrow.schema([(column, pyarrow.string()) for column in PARQUET_COLUMNS])
+        super().__init__(directory, **kwargs)
+        self._writer = None
+        self._file = None
+        self._columns = None
+
+    def _open(self, path):
+        self._file = open(path, "wb")
+        self._writer = self._pq.ParquetWriter(self._file, self.schema, compression=self.compression)
+        self._columns = {column: [] for column in PARQUET_COLUMNS}
+
+    def _write(self, records):
+        columns = self._columns
+        for record in records:
+            columns["message_id"].append(record.get("message_id"))
+            columns["publish_time"].append(record.get("publish_time"))
+            data = record.get("data")
+            # event_schema 이벤트는 dict로 디코딩되므로 JSON 문자열로 저장
+            columns["data"].append(data if isinstance(data, str) else json.dumps(data, ensure_ascii=False))
+            columns["attributes"].append(json.dumps(record.get("attributes", {}), ensure_ascii=False))
+        if len(columns["message_id"]) >= self.row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self):
+        if not self._columns["message_id"]:
+            return
+        table = self._pa.table(self._columns, schema=self.schema)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        self._columns = {column: [] for column in PARQUET_COLUMNS}
+
+    def _flush(self, sync):
+        return False
+
+    def _close(self):
+        self._write_row_group()
+        self._writer.close()
+        self._file.flush()
+        if self.fsync != "none":
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._writer = self._file = self._columns = None
+
+    def _abandon(self):
+        for handle in (self._writer, self._file):
+            try:
+                if handle is not None:
+                    handle.close()
+            except Exception:
+                pass
+        self._writer = self._file = self._columns = None
+
+    def _size(self):
+        # 아직 row group으로 쓰지 않은 행은 크기에 넣지 않음
+        return self._file.tell()
+
+
+def create_sink(kind, directory, compression=None, fsync="batch", **kwargs):
+    """
+    :param kind: "jsonl" / "parquet"
+    """
+    if kind == "jsonl":
+        return JsonlSink(directory, compression=compression, fsync=fsync, **kwargs)
+    if kind == "parquet":
+        return ParquetSink(directory, compression=compression or "snappy", fsync=fsync, **kwargs)
+    raise ValueError(f"Unknown sink type: {kind!r}")
+
+#################################
+# 싱크 단계 (모아 쓰기 + 기록 완료 후 Ack)
+#################################
+class SinkStage:
+    """
+    처리 스레드가 put()한 메시지를 별도 스레드에서 max_records개 또는 flush_interval초마다 모아 쓰고,
+    싱크가 기록 완료를 알린(commit() == True) 메시지의 ackId만 on_durable 콜백으로 넘김
+    (fsync="rotate"나 Parquet처럼 파일을 닫아야 완료되는 경우 교체 시점까지 ackId를 보류)
+    - 쓰기에 실패하면 아직 기록 완료가 아닌 ackId를 모두 on_failed 콜백으로 넘기고 파일을 버림
+    - 보류 중인 ackId가 max_uncommitted개를 넘거나 가장 오래된 것이 max_uncommitted_age초를 넘으면
+      파일을 일찍 교체해서 기록 완료로 만듦 (흐름 제어 상한 / ack deadline 안에 Ack 되도록)
+    """
+    def __init__(self, sink, on_durable, on_failed=None, max_records=1000, flush_interval=1.0,
+                 max_uncommitted=None, max_uncommitted_age=None):
+        """
+        :param sink: RotatingFileSink
+        :param on_durable: ackId 리스트를 받는 함수 (Ack 전송)
+        :param on_failed: 기록하지 못한 ackId 리스트를 받는 함수 (Nack / 흐름 제어 해제, None이면 ack deadline 이후 재전송)
+        :param max_records: 한 번에 쓰는 최대 메시지 수
+        :param flush_interval: 메시지가 쓰이기 전 기다리는 최대 시간 (초)
+        :param max_uncommitted: 기록 완료를 기다리는 ackId 상한 (넘으면 파일 교체, None이면 제한 없음)
+        :param max_uncommitted_age: put() 후 기록 완료까지 기다리는 최대 시간 (초, 넘으면 파일 교체, None이면 제한 없음)
+        """
+        self.sink = sink
+        self.on_durable = on_durable
+        self.on_failed = on_failed
+        self.max_records = max_records
+        self.flush_interval = flush_interval
+        self.max_uncommitted = max_uncommitted
+        self.max_uncommitted_age = max_uncommitted_age
+        self._records = []
+        self._ack_ids = []
+        # _records 중 가장 먼저 put()된 시각
+        self._records_since = None
+        # 파일에는 썼지만 아직 기록 완료가 아닌 ackId (와 그중 가장 먼저 put()된 시각)
+        self._uncommitted = []
+        self._uncommitted_since = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self.counters = {"written": 0, "durable": 0, "write_errors": 0, "forced_rotations": 0}
+        self._thread = threading.Thread(target=self._run, name="sink-stage", daemon=True)
+        self._thread.start()
+
+    def put(self, record, ack_id):
+        with self._cond:
+            if not self._records:
+                self._records_since = time.monotonic()
+            self._records.append(record)
+            self._ack_ids.append(ack_id)
+            if len(self._records) >= self.max_records:
+                self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return len(self._records) + len(self._uncommitted)
+
+    def close(self, timeout=None):
+        # 남은 메시지를 쓰고 파일을 닫은 뒤(기록 완료) 스레드 종료
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._records) >= self.max_records or self._closed,
+                                    self.flush_interval)
+                records, self._records = self._records, []
+                ack_ids, self._ack_ids = self._ack_ids, []
+                since, self._records_since = self._records_since, None
+                closed = self._closed
+            self._write(records, ack_ids, since, closed)
+            if closed:
+                return
+
+    def _must_rotate(self):
+        if not self._uncommitted:
+            return False
+        if self.max_uncommitted is not None and len(self._uncommitted) >= self.max_uncommitted:
+            return True
+        return (self.max_uncommitted_age is not None
+                and time.monotonic() - self._uncommitted_since >= self.max_uncommitted_age)
+
+    def _write(self, records, ack_ids, since, closing):
+        if ack_ids and not self._uncommitted:
+            self._uncommitted_since = since
+        self._uncommitted.extend(ack_ids)
+        try:
+            self.sink.write(records)
+            self.counters["written"] += len(records)
+            if closing:
+                self.sink.close()
+                durable = True
+            else:
+                durable = self.sink.commit()
+                if not durable and self._must_rotate():
+                    # 교체 시점까지 기다리면 흐름 제어가 막히거나 ack deadline이 지나므로 지금 파일을 닫음
+                    self.sink.rotate()
+                    self.counters["forced_rotations"] += 1
+                    durable = True
+        except Exception as e:
+            # 기록 완료를 확인하지 못한 메시지(같은 파일에 앞서 쓴 것 포함)는 Ack 하지 않고 실패 콜백으로 넘김
+            failed, self._uncommitted = self._uncommitted, []
+            self.counters["write_errors"] += len(failed)
+            logging.error(f"Sink write failed, {len(failed)} message(s) not durable: {e}")
+            self.sink.abandon()
+            if self.on_failed is not None and failed:
+                self.on_failed(failed)
+            return
+        if durable and self._uncommitted:
+            ack_ids, self._uncommitted = self._uncommitted, []
+            self.counters["durable"] += len(ack_ids)
+            self.on_durable(ack_ids)
@@ -0,0 +1,204 @@
+# pubsub_bench.py
+#
+# Pub/Sub 게시 -> Pull -> Ack 처리량 / 지연 벤치마크
+# - 기본은 pubsub_emulator.PubSubEmulator를 프로세스 안에서 띄워 실제 Pub/Sub 없이 측정 (--endpoint로 외부 서버 지정 가능)
+# - 게시: 트래픽 생성기와 같은 pubsub_publisher.BatchPublisher (publisher_threads개 스레드가 publish() 호출)
+# - 소비: PullSubscription.StreamingConsumer (Pull 루프 + 워커 풀 + 배치 Ack + lease 연장)
+# - 지연: 게시 호출 -> 핸들러 도착 (메시지 속성 bench_ts 기준, run_stats 히스토그램)
+#         게시 수신 -> Ack 도착 (에뮬레이터가 집계, 프로세스 안 에뮬레이터일 때만)
+#
+# 예) python pubsub_bench.py --messages 100000 --size 200 --pullers 4 --workers 8
+#     python pubsub_bench.py --latency 0.005 --error-rate 0.01 --report bench.json
+
+import argparse
+import base64
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+import requests
+
+import PullSubscription
+import run_stats
+from pubsub_emulator import PubSubEmulator
+from pubsub_publisher import BatchPublisher
+
+AUTH_HEADERS = {"Credential-ID": "bench", "Credential-Secret": "bench", "Content-Type": "application/json"}
+
+#################################
+# 준비
+#################################
+def resource_url(endpoint, kind, name, domain_id="bench", project_id="bench"):
+    return f"{endpoint}/v1/domains/{domain_id}/projects/{project_id}/{kind}/{name}"
+
+
+def create_resources(endpoint, topic, subscription, ack_deadline, max_delivery_attempt):
+    """
+    CreaeteTopic.py / CreateSubscription.py와 같은 요청으로 토픽과 구독 생성
+    """
+    resp = requests.put(resource_url(endpoint, "topics", topic), headers=AUTH_HEADERS,
+                        data=json.dumps({"topic": {"description": "bench", "messageRetentionDuration": "600s"}}))
+    resp.raise_for_status()
+    resp = requests.put(resource_url(endpoint, "subscriptions", subscription), headers=AUTH_HEADERS,
+                        data=json.dumps({"subscription": {"topic": topic, "ackDeadlineSeconds": ack_deadline,
+                                                          "messageRetentionDuration": "600s",
+                                                          "maxDeliveryAttempt": max_delivery_attempt}}))
+    resp.raise_for_status()
+
+
+def point_consumer_at(endpoint):
+    """
+    PullSubscription의 Pub/Sub 접속 정보를 벤치 대상으로 바꿈
+    """
+    PullSubscription.PUBSUB_ENDPOINT_URL = endpoint
+    PullSubscription.PUBSUB_DOMAIN_ID = "bench"
+    PullSubscription.PUBSUB_PROJECT_ID = "bench"
+    PullSubscription.PUBSUB_CREDENTIAL_ID = AUTH_HEADERS["Credential-ID"]
+    PullSubscription.PUBSUB_CREDENTIAL_SECRET = AUTH_HEADERS["Credential-Secret"]
+
+#################################
+# 게시 / 소비
+#################################
+def publish_loop(publisher, count, payload, rate, started):
+    """
+    게시 스레드 하나: count개를 rate(초당, 0이면 최대 속도)에 맞춰 publish()
+    """
+    for i in range(count):
+        if rate:
+            delay = started + i / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        publisher.publish({"data": payload, "attributes": {"bench_ts": repr(time.time())}})
+
+
+class LatencyHandler:
+    """
+    StreamingConsumer 핸들러: 게시 호출 -> 도착 지연을 기록
+    """
+    def __init__(self):
+        self.latency = run_stats.RunStats()
+
+    def __call__(self, decoded):
+        sent = float(decoded["attributes"].get("bench_ts", 0))
+        self.latency.record("publish->handler", time.time() - sent)
+
+
+def run(messages=10000, size=200, publisher_threads=2, rate=0, max_messages=100, linger=0.01,
+        pullers=4, workers=8, wait_time="1s", ack_deadline=10, max_delivery_attempt=5,
+        endpoint=None, latency=0.0, jitter=0.0, error_rate=0.0, timeout=300):
+    """
+    벤치마크 한 번 실행
+    :param rate: 전체 게시율 (초당, 0이면 최대 속도)
+    :param endpoint: 외부 Pub/Sub 서버 (없으면 프로세스 안 에뮬레이터)
+    :return: 리포트 dict
+    """
+    emulator = None
+    if endpoint is None:
+        emulator = PubSubEmulator(latency=latency, jitter=jitter, error_rate=error_rate).start()
+        endpoint = emulator.endpoint
+    tag = uuid.uuid4().hex[:6]
+    topic, subscription = f"bench-topic-{tag}", f"bench-sub-{tag}"
+    create_resources(endpoint, topic, subscription, ack_deadline, max_delivery_attempt)
+    point_consumer_at(endpoint)
+
+    handler = LatencyHandler()
+    consumer = PullSubscription.StreamingConsumer(subscription, handler=handler, pullers=pullers, workers=workers,
+                                                  wait_time=wait_time, ack_deadline=ack_deadline,
+                                                  report_interval=0)
+    publisher = BatchPublisher(resource_url(endpoint, "topics", topic) + "/publish",
+                               AUTH_HEADERS["Credential-ID"], AUTH_HEADERS["Credential-Secret"],
+                               max_messages=max_messages, linger=linger, name="bench-publisher")
+    payload = base64.b64encode(os.urandom(size)).decode("utf-8")
+
+    consumer.start()
+    started = time.monotonic()
+    per_thread = [messages // publisher_threads + (1 if i < messages % publisher_threads else 0)
+                  for i in range(publisher_threads)]
+    threads = [threading.Thread(target=publish_loop,
+                                args=(publisher, count, payload, rate / publisher_threads, started),
+                                name=f"bench-publish-{i}")
+               for i, count in enumerate(per_thread)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    publisher.flush()
+    publish_elapsed = time.monotonic() - started
+    publisher_stats = publisher.stats()
+
+    # 게시에 성공한 메시지를 모두 Ack 할 때까지 (재전송으로 중복 처리된 것도 셈)
+    deadline = time.monotonic() + timeout
+    while consumer.stats()["acked"] < publisher_stats["sent"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    elapsed = time.monotonic() - started
+    consumer.stop()
+    publisher.close()
+
+    consumer_stats = consumer.stats()
+    report = {
+        "messages": messages,
+        "size": size,
+        "elapsed": elapsed,
+        "publish": dict(publisher_stats, elapsed=publish_elapsed,
+                        rate=publisher_stats["sent"] / publish_elapsed if publish_elapsed else 0.0),
+        "consume": {key: consumer_stats[key] for key in
+                    ("pulled", "processed", "acked", "ack_failed", "nacked", "pull_requests", "empty_pulls")},
+        "end_to_end_rate": consumer_stats["acked"] / elapsed if elapsed else 0.0,
+        "latency": run_stats.build_report(handler.latency.snapshot(), elapsed),
+    }
+    if emulator is not None:
+        server = emulator.stats()
+        report["server"] = {key: value for key, value in server.items() if key not in ("subscriptions", "ack_latency")}
+        report["latency"]["endpoints"].update(
+            {"publish->ack": run_stats.build_report(server["ack_latency"], elapsed)["total"]})
+        emulator.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pub/Sub publish -> pull -> ack benchmark")
+    parser.add_argument("--messages", type=int, default=10000, help="게시할 메시지 수")
+    parser.add_argument("--size", type=int, default=200, help="메시지 본문 크기 (바이트, base64 인코딩 전)")
+    parser.add_argument("--publisher-threads", type=int, default=2, help="publish()를 호출하는 스레드 수")
+    parser.add_argument("--rate", type=float, default=0, help="전체 게시율 (초당, 0이면 최대 속도)")
+    parser.add_argument("--batch", type=int, default=100, help="publish 요청 하나의 최대 메시지 수")
+    parser.add_argument("--linger", type=float, default=0.01, help="배치를 채우려고 기다리는 최대 시간 (초)")
+    parser.add_argument("--pullers", type=int, default=4, help="동시 Pull 루프 수")
+    parser.add_argument("--workers", type=int, default=8, help="메시지 처리 스레드 수")
+    parser.add_argument("--ack-deadline", type=int, default=10, help="구독 ackDeadlineSeconds")
+    parser.add_argument("--max-delivery-attempt", type=int, default=5, help="구독 maxDeliveryAttempt")
+    parser.add_argument("--endpoint", help="외부 Pub/Sub 서버 (예: 단독 실행한 pubsub_emulator.py), 없으면 프로세스 안 에뮬레이터")
+    parser.add_argument("--latency", type=float, default=0.0, help="에뮬레이터 요청 지연 (초)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="에뮬레이터 임의 지연 상한 (초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="에뮬레이터 오류 주입 확률 (0~1)")
+    parser.add_argument("--timeout", type=float, default=300, help="모든 메시지를 받을 때까지 기다리는 최대 시간 (초)")
+    parser.add_argument("--report", help="리포트 JSON 저장 경로")
+    args = parser.parse_args()
+
+    report = run(messages=args.messages, size=args.size, publisher_threads=args.publisher_threads, rate=args.rate,
+                 max_messages=args.batch, linger=args.linger, pullers=args.pullers, workers=args.workers,
+                 ack_deadline=args.ack_deadline, max_delivery_attempt=args.max_delivery_attempt,
+                 endpoint=args.endpoint, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                 timeout=args.timeout)
+    logging.info(f"Pub/Sub bench report: {json.dumps(report)}")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+    publish, consume = report["publish"], report["consume"]
+    print(f"published {publish['sent']}/{report['messages']} in {publish['elapsed']:.2f}s "
+          f"({publish['rate']:.0f} msg/s, {publish['batches']} batches, retries {publish['retries']}, "
+          f"failed {publish['failed']})")
+    print(f"acked {consume['acked']} in {report['elapsed']:.2f}s ({report['end_to_end_rate']:.0f} msg/s end-to-end, "
+          f"pulls {consume['pull_requests']}, nacked {consume['nacked']}, ack_failed {consume['ack_failed']})")
+    print(f"{'latency':<24} {'count':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  (ms)")
+    for name, summary in report["latency"]["endpoints"].items():
+        print(f"{name:<24} {summary['count']:>8} {summary['p50_ms']:>8.2f} {summary['p90_ms']:>8.2f} "
+              f"{summary['p99_ms']:>8.2f} {summary['max_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,488 @@
+# pubsub_emulator.py
+#
+# 로컬 Pub/Sub 대역 서버 (Kakao Cloud Pub/Sub REST API 중 이 저장소가 쓰는 부분만, 메모리에 저장)
+# 실제 엔드포인트 없이 PullSubscription.py / pubsub_publisher.py / PubSubLogHandler / CreaeteTopic.py /
+# CreateSubscription.py를 돌려 보거나 처리량을 재려고 쓴다. (pubsub_bench.py가 프로세스 안에서 띄워 사용)
+#
+#   PUT    .../topics/{topic}                          토픽 생성 {"topic": {...}}
+#   POST   .../topics/{topic}/publish                  {"messages": [{"data", "attributes"}]} -> {"messageIds": [...]}
+#   PUT    .../subscriptions/{sub}                     구독 생성 {"subscription": {"topic", "ackDeadlineSeconds", "maxDeliveryAttempt"}}
+#   POST   .../subscriptions/{sub}/pull                {"maxMessages", "waitTime": "3s"} -> {"receivedMessages": [...]}
+#   POST   .../subscriptions/{sub}/acknowledge         {"ackIds": [...]}
+#   POST   .../subscriptions/{sub}/modifyAckDeadline   {"ackIds": [...], "ackDeadlineSeconds": n} (0이면 Nack, 바로 재전송)
+#   GET / DELETE .../topics/{topic}, .../subscriptions/{sub}
+#   GET    /_stats                                     카운터 (published / delivered / acked / dead_lettered ...)
+#   (경로 앞부분은 상관없음: http://127.0.0.1:8085/v1/... 또는 http://127.0.0.1:8085/pubsub/v1/...)
+#
+# 동작
+# - 게시한 메시지는 그 시점에 토픽에 연결된 구독마다 복사됨 (구독 생성 전 메시지는 전달되지 않음)
+# - Pull한 메시지는 ackDeadlineSeconds 안에 Ack 하지 않으면 다시 전달, 전달 횟수가 maxDeliveryAttempt를 넘으면 버림(dead_lettered)
+# - waitTime 동안 메시지가 없으면 빈 응답 (long polling)
+# - 지연 / 오류 주입: 요청마다 latency(+ 0~jitter)초 늦게 응답, error_rate 확률로 error_status 응답 (처리는 하지 않음)
+# - Credential-ID 헤더가 없으면 401
+#
+# 단독 실행: python pubsub_emulator.py --port 8085 [--latency 0.005 --error-rate 0.01]
+
+import argparse
+import base64
+import collections
+import heapq
+import itertools
+import json
+import logging
+import random
+import re
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 지연 시간 히스토그램 (트래픽 생성기와 같은 집계)
+import run_stats
+
+# 요청 경로: .../v1/domains/{domain}/projects/{project}/{topics|subscriptions}/{name}[/{action}]
+RESOURCE_PATH = re.compile(r"/v1/domains/([^/]+)/projects/([^/]+)/(topics|subscriptions)/([^/:]+)(?:[/:](\w+))?$")
+
+# 구독 생성 시 기본값
+DEFAULT_ACK_DEADLINE = 10
+DEFAULT_MAX_DELIVERY_ATTEMPT = 5
+# Pull 한 번의 최대 메시지 수 (서비스 제한, 넘으면 400) / 최대 대기 시간 (초)
+MAX_PULL_MESSAGES = 100
+MAX_WAIT_TIME = 30.0
+
+
+class EmulatorError(Exception):
+    """
+    HTTP 오류 응답으로 바뀌는 예외
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_duration(value, default=0.0):
+    """
+    "3s" / "0.5s" / 3 -> 초
+    """
+    if value is None or value == "":
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    return float(str(value).rstrip("s"))
+
+
+def format_time(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+#################################
+# 토픽 / 구독 상태
+#################################
+class Subscription:
+    """
+    구독 하나의 대기열과 lease (모든 상태는 cond의 락으로 보호)
+    """
+    def __init__(self, name, topic, ack_deadline=DEFAULT_ACK_DEADLINE,
+                 max_delivery_attempt=DEFAULT_MAX_DELIVERY_ATTEMPT, retention="432000s"):
+        self.name = name
+        self.topic = topic
+        self.ack_deadline = ack_deadline
+        self.max_delivery_attempt = max_delivery_attempt
+        self.retention = retention
+        self.cond = threading.Condition()
+        # 전달 대기 메시지: [message_id, data, attributes, publish_ts, delivery_count]
+        self.ready = collections.deque()
+        # ackId -> (메시지, deadline)
+        self.leases = {}
+        # (deadline, ackId) 힙 (연장 / Ack 된 항목은 꺼낼 때 leases와 비교해 건너뜀)
+        self.deadlines = []
+        self.counters = {"delivered": 0, "redelivered": 0, "acked": 0, "nacked": 0, "extended": 0,
+                         "expired": 0, "dead_lettered": 0, "ack_unknown": 0}
+
+    def info(self):
+        return {"name": self.name, "topic": self.topic, "ackDeadlineSeconds": self.ack_deadline,
+                "maxDeliveryAttempt": self.max_delivery_attempt, "messageRetentionDuration": self.retention}
+
+    def enqueue(self, messages):
+        with self.cond:
+            for message in messages:
+                self.ready.append(list(message))
+            self.cond.notify_all()
+
+    def _expire(self, now):
+        """
+        deadline이 지난 lease를 대기열 앞으로 되돌림 (락을 잡은 상태에서 호출)
+        """
+        while self.deadlines and self.deadlines[0][0] <= now:
+            deadline, ack_id = heapq.heappop(self.deadlines)
+            lease = self.leases.get(ack_id)
+            if lease is None or lease[1] != deadline:
+                continue
+            del self.leases[ack_id]
+            self.ready.appendleft(lease[0])
+            self.counters["expired"] += 1
+
+    def pull(self, max_messages, wait_time, ack_ids):
+        """
+        :return: receivedMessages 목록 (waitTime 동안 메시지가 없으면 빈 목록)
+        """
+        end = time.monotonic() + wait_time
+        received = []
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                while self.ready and len(received) < max_messages:
+                    message = self.ready.popleft()
+                    if message[4] >= self.max_delivery_attempt:
+                        self.counters["dead_lettered"] += 1
+                        continue
+                    message[4] += 1
+                    if message[4] > 1:
+                        self.counters["redelivered"] += 1
+                    self.counters["delivered"] += 1
+                    ack_id = f"{self.name}-{next(ack_ids)}"
+                    deadline = now + self.ack_deadline
+                    self.leases[ack_id] = (message, deadline)
+                    heapq.heappush(self.deadlines, (deadline, ack_id))
+                    received.append({
+                        "ackId": ack_id,
+                        "message": {"data": message[1], "attributes": message[2], "messageId": message[0],
+                                    "publishTime": format_time(message[3])},
+                        "deliveryAttempt": message[4]
+                    })
+                if received or now >= end:
+                    return received
+                # 다음 deadline 만료 또는 새 메시지까지 대기
+                timeout = end - now
+                if self.deadlines:
+                    timeout = min(timeout, max(self.deadlines[0][0] - now, 0.001))
+                self.cond.wait(timeout)
+
+    def acknowledge(self, ack_ids):
+        """
+        :return: Ack 된 메시지의 게시 시각 목록 (지연 시간 집계용)
+        """
+        published = []
+        with self.cond:
+            for ack_id in ack_ids:
+                lease = self.leases.pop(ack_id, None)
+                if lease is None:
+                    self.counters["ack_unknown"] += 1
+                    continue
+                published.append(lease[0][3])
+                self.counters["acked"] += 1
+        return published
+
+    def modify_ack_deadline(self, ack_ids, seconds):
+        with self.cond:
+            now = time.monotonic()
+            for ack_id in ack_ids:
+                lease = self.leases.get(ack_id)
+                if lease is None:
+                    self.counters["ack_unknown"] += 1
+                    continue
+                if seconds <= 0:
+                    # Nack: 바로 다시 전달
+                    del self.leases[ack_id]
+                    self.ready.appendleft(lease[0])
+                    self.counters["nacked"] += 1
+                else:
+                    deadline = now + seconds
+                    self.leases[ack_id] = (lease[0], deadline)
+                    heapq.heappush(self.deadlines, (deadline, ack_id))
+                    self.counters["extended"] += 1
+            self.cond.notify_all()
+
+    def backlog(self):
+        with self.cond:
+            return {"ready": len(self.ready), "leased": len(self.leases)}
+
+
+class PubSubEmulator:
+    """
+    메모리 Pub/Sub 서버 (ThreadingHTTPServer, 요청마다 스레드 하나, HTTP/1.1 keep-alive)
+    """
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503,
+                 auto_create=False):
+        """
+        :param port: 0이면 빈 포트 (start() 후 self.port / self.endpoint로 확인)
+        :param latency: 요청마다 더하는 지연 (초)
+        :param jitter: latency에 더하는 0~jitter초 임의 지연
+        :param error_rate: 처리하지 않고 error_status로 응답할 확률 (0~1)
+        :param auto_create: 없는 토픽에 게시하거나 없는 구독에서 Pull하면 같은 이름으로 만듦
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.auto_create = auto_create
+        self.topics = {}
+        self.subscriptions = {}
+        self._lock = threading.Lock()
+        self._message_ids = itertools.count(1)
+        self._ack_ids = itertools.count(1)
+        self.counters = {"requests": 0, "published": 0, "publish_requests": 0, "pull_requests": 0,
+                         "injected_errors": 0}
+        # 게시 -> Ack 지연 히스토그램 (키: 구독 이름)
+        self.ack_latency = run_stats.RunStats()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self.endpoint = f"http://{self.host}:{self.port}"
+        self._thread = None
+
+    #################################
+    # 실행
+    #################################
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="pubsub-emulator", daemon=True)
+        self._thread.start()
+        logging.info(f"Pub/Sub emulator listening on {self.endpoint}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    #################################
+    # 리소스
+    #################################
+    def create_topic(self, name, body=None):
+        topic = dict((body or {}).get("topic") or {}, name=name)
+        with self._lock:
+            if name in self.topics:
+                raise EmulatorError(409, f"topic {name} already exists")
+            self.topics[name] = topic
+        return topic
+
+    def create_subscription(self, name, body=None):
+        spec = (body or {}).get("subscription") or {}
+        topic = spec.get("topic")
+        with self._lock:
+            if name in self.subscriptions:
+                raise EmulatorError(409, f"subscription {name} already exists")
+            if topic not in self.topics:
+                if not self.auto_create:
+                    raise EmulatorError(404, f"topic {topic} not found")
+                self.topics[topic] = {"name": topic}
+            subscription = Subscription(name, topic,
+                                        ack_deadline=int(spec.get("ackDeadlineSeconds") or DEFAULT_ACK_DEADLINE),
+                                        max_delivery_attempt=int(spec.get("maxDeliveryAttempt")
+                                                                 or DEFAULT_MAX_DELIVERY_ATTEMPT),
+                                        retention=spec.get("messageRetentionDuration", "432000s"))
+            self.subscriptions[name] = subscription
+        return subscription.info()
+
+    def _topic(self, name):
+        with self._lock:
+            if name not in self.topics:
+                if not self.auto_create:
+                    raise EmulatorError(404, f"topic {name} not found")
+                self.topics[name] = {"name": name}
+            return [s for s in self.subscriptions.values() if s.topic == name]
+
+    def _subscription(self, name):
+        with self._lock:
+            subscription = self.subscriptions.get(name)
+            if subscription is None:
+                if not self.auto_create:
+                    raise EmulatorError(404, f"subscription {name} not found")
+                self.topics.setdefault(name, {"name": name})
+                subscription = self.subscriptions[name] = Subscription(name, name)
+            return subscription
+
+    def publish(self, topic, messages):
+        """
+        :param messages: [{"data": base64 문자열, "attributes": {...}}]
+        :return: messageId 목록
+        """
+        subscriptions = self._topic(topic)
+        now = time.time()
+        records = []
+        for message in messages:
+            data = message.get("data", "")
+            # 잘못된 base64는 실제 서비스처럼 400
+            try:
+                base64.b64decode(data, validate=True)
+            except Exception:
+                raise EmulatorError(400, "message data must be base64")
+            records.append((str(next(self._message_ids)), data, message.get("attributes") or {}, now, 0))
+        for subscription in subscriptions:
+            subscription.enqueue(records)
+        with self._lock:
+            self.counters["published"] += len(records)
+            self.counters["publish_requests"] += 1
+        return [record[0] for record in records]
+
+    def acknowledge(self, name, ack_ids):
+        published = self._subscription(name).acknowledge(ack_ids)
+        now = time.time()
+        for ts in published:
+            self.ack_latency.record(name, now - ts)
+
+    #################################
+    # 통계
+    #################################
+    def stats(self):
+        """
+        :return: 서버 카운터 + 구독별 카운터 / 대기열 + 구독별 게시 -> Ack 지연 (run_stats snapshot)
+        """
+        with self._lock:
+            result = dict(self.counters)
+            subscriptions = list(self.subscriptions.values())
+        result["subscriptions"] = {s.name: dict(s.counters, **s.backlog()) for s in subscriptions}
+        for s in subscriptions:
+            for key, value in s.counters.items():
+                result[key] = result.get(key, 0) + value
+        result["ack_latency"] = self.ack_latency.snapshot()
+        return result
+
+    #################################
+    # HTTP
+    #################################
+    def handle(self, method, path, headers, body):
+        """
+        요청 하나 처리
+        :return: (상태 코드, 응답 dict)
+        """
+        if path == "/_stats":
+            return 200, self.stats()
+        with self._lock:
+            self.counters["requests"] += 1
+        delay = self.latency + (random.random() * self.jitter if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if self.error_rate and random.random() < self.error_rate:
+            with self._lock:
+                self.counters["injected_errors"] += 1
+            return self.error_status, {"error": {"code": self.error_status, "message": "injected error"}}
+        if not headers.get("Credential-ID"):
+            return 401, {"error": {"code": 401, "message": "missing Credential-ID"}}
+
+        match = RESOURCE_PATH.search(path.split("?", 1)[0])
+        if not match:
+            return 404, {"error": {"code": 404, "message": f"unknown path {path}"}}
+        _, _, kind, name, action = match.groups()
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {"error": {"code": 400, "message": "invalid JSON body"}}
+
+        try:
+            if kind == "topics":
+                if action is None and method == "PUT":
+                    return 201, self.create_topic(name, payload)
+                if action is None and method == "GET":
+                    with self._lock:
+                        if name not in self.topics:
+                            raise EmulatorError(404, f"topic {name} not found")
+                        return 200, self.topics[name]
+                if action is None and method == "DELETE":
+                    with self._lock:
+                        self.topics.pop(name, None)
+                    return 200, {}
+                if action == "publish" and method == "POST":
+                    return 200, {"messageIds": self.publish(name, payload.get("messages") or [])}
+            else:
+                if action is None and method == "PUT":
+                    return 201, self.create_subscription(name, payload)
+                if action is None and method == "GET":
+                    return 200, self._subscription(name).info()
+                if action is None and method == "DELETE":
+                    with self._lock:
+                        self.subscriptions.pop(name, None)
+                    return 200, {}
+                if action == "pull" and method == "POST":
+                    with self._lock:
+                        self.counters["pull_requests"] += 1
+                    try:
+                        max_messages = int(payload.get("maxMessages") or 1)
+                    except (TypeError, ValueError):
+                        raise EmulatorError(400, "maxMessages must be an integer")
+                    # 실제 서비스처럼 제한을 넘는 요청은 줄이지 않고 거절
+                    if not 1 <= max_messages <= MAX_PULL_MESSAGES:
+                        raise EmulatorError(400, f"maxMessages must be between 1 and {MAX_PULL_MESSAGES}")
+                    wait_time = min(parse_duration(payload.get("waitTime")), MAX_WAIT_TIME)
+                    received = self._subscription(name).pull(max_messages, wait_time, self._ack_ids)
+                    return 200, {"receivedMessages": received}
+                if action == "acknowledge" and method == "POST":
+                    self.acknowledge(name, payload.get("ackIds") or [])
+                    return 200, {}
+                if action == "modifyAckDeadline" and method == "POST":
+                    seconds = int(payload.get("ackDeadlineSeconds") or 0)
+                    self._subscription(name).modify_ack_deadline(payload.get("ackIds") or [], seconds)
+                    return 200, {}
+        except EmulatorError as e:
+            return e.status, {"error": {"code": e.status, "message": str(e)}}
+        return 405, {"error": {"code": 405, "message": f"{method} {kind}/{action or ''} not supported"}}
+
+    def _handler_class(self):
+        emulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # 헤더와 본문을 따로 쓰므로 Nagle + delayed ACK로 keep-alive 요청마다 수십 ms씩 멈추지 않게 함
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, payload = emulator.handle(self.command, self.path, self.headers, body)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_PUT = do_POST = do_DELETE = _dispatch
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+#################################
+# 단독 실행
+#################################
+def main():
+    parser = argparse.ArgumentParser(description="Local Pub/Sub REST emulator")
+    parser.add_argument("--host", default="127.0.0.1", help="바인드 주소")
+    parser.add_argument("--port", type=int, default=8085, help="포트")
+    parser.add_argument("--latency", type=float, default=0.0, help="요청마다 더하는 지연 (초)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="지연에 더하는 0~jitter초 임의 지연")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="주입할 오류 응답 확률 (0~1)")
+    parser.add_argument("--error-status", type=int, default=503, help="주입할 오류 응답 상태 코드")
+    parser.add_argument("--auto-create", action="store_true", help="없는 토픽 / 구독을 자동으로 생성")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    emulator = PubSubEmulator(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                              error_rate=args.error_rate, error_status=args.error_status,
+                              auto_create=args.auto_create)
+    emulator.start()
+    print(f"Pub/Sub emulator: {emulator.endpoint} (set PUBSUB_ENDPOINT_URL to this)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping emulator...")
+    finally:
+        emulator.stop()
+        print(json.dumps(emulator.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()